@@ -105,9 +105,17 @@ class APIService {
         try await createProfile(name: name, genres: genres, movies: movies)
     }
 
-    func fetchRecommendations(for userId: String) async throws -> [MovieDTO] {
+    // Pass the previous page's cursor to continue the same server-side feed.
+    func fetchRecommendations(for userId: String, cursor: String? = nil) async throws -> (movies: [MovieDTO], nextCursor: String?) {
         guard let encodedUserId = userId.addingPercentEncoding(withAllowedCharacters: .urlPathAllowed),
-              let url = URL(string: "\(baseURL)/users/\(encodedUserId)/recommendations?language=en") else {
+              var components = URLComponents(string: "\(baseURL)/users/\(encodedUserId)/recommendations") else {
+            throw APIError.invalidURL
+        }
+        components.queryItems = [URLQueryItem(name: "language", value: "en")]
+        if let cursor = cursor {
+            components.queryItems?.append(URLQueryItem(name: "cursor", value: cursor))
+        }
+        guard let url = components.url else {
             throw APIError.invalidURL
         }
 
@@ -120,7 +128,8 @@ class APIService {
             }
             
             let movies = try JSONDecoder().decode([MovieDTO].self, from: data)
-            return movies
+            let nextCursor = (response as? HTTPURLResponse)?.value(forHTTPHeaderField: "X-Next-Cursor")
+            return (movies, nextCursor)
         } catch {
             print("Decoding error or network error: \(error)")
             throw error
@@ -128,9 +137,9 @@ class APIService {
     }
     
     // Convenience method for domain objects
-    func getRecommendations(for userId: String) async throws -> [Movie] {
-        let dtos = try await fetchRecommendations(for: userId)
-        return dtos.compactMap { dto in
+    func getRecommendations(for userId: String, cursor: String? = nil) async throws -> (movies: [Movie], nextCursor: String?) {
+        let page = try await fetchRecommendations(for: userId, cursor: cursor)
+        let movies: [Movie] = page.movies.compactMap { dto in
             guard let backdropPath = dto.backdrop_path, !backdropPath.isEmpty else { return nil }
             return Movie(
                 tmdbId: Int(dto.movie_id) ?? 0,
@@ -142,6 +151,7 @@ class APIService {
                 dateWatched: Date()
             )
         }
+        return (movies, page.nextCursor)
     }
 
     func fetchUserProfile(for userId: String) async throws -> UserProfileDTO {
@@ -27,6 +27,7 @@ class UserState: ObservableObject {
     @AppStorage("authenticatedUserId") private var currentUserId: String = "Shamik"
     private var ratingSessionCount = 0
     private var shownMovieIds: Set<Int> = []
+    private var feedCursor: String? // Next page of the server-side feed, if any
     
     private var isLoading = false
     private var isProcessingQueue = false
@@ -317,7 +318,13 @@ class UserState: ObservableObject {
         
         print("[LiveRecs] Fetching recommendations (Live Refill: \(isLiveRefill))...")
         do {
-            let fetchedMovies = try await APIService.shared.getRecommendations(for: currentUserId)
+            // Live refills continue the current feed; a fresh load starts a new one
+            let page = try await APIService.shared.getRecommendations(
+                for: currentUserId,
+                cursor: isLiveRefill ? feedCursor : nil
+            )
+            let fetchedMovies = page.movies
+            self.feedCursor = page.nextCursor
             
             if isLiveRefill {
                 print("[LiveRecs] Received \(fetchedMovies.count) candidates.")
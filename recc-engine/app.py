@@ -1,23 +1,32 @@
-import json
 import os
+import secrets
 import time
 import logging
-from typing import Optional, List
-import numpy as np
+from contextlib import asynccontextmanager
+from typing import Dict, Optional, List
 from logging.handlers import RotatingFileHandler
 
-import jwt
-import requests
-import portalocker
-from jwt.algorithms import RSAAlgorithm
+# Everything below is reported as the "imports" startup phase
+_import_started = time.time()
 
-from fastapi import FastAPI, HTTPException, Query, Path, Request
+import numpy as np
+from fastapi import FastAPI, HTTPException, Query, Path, Request, Response
 from pydantic import BaseModel
 from dotenv import load_dotenv
 
-from tmdb_api import TMDBClient
+from apple_jwks import JWKSCache, JWKSUnavailable
+from tmdb_api import AsyncTMDBClient
+from cache import LRUCache
+from executors import io_pool, search_pool
+from movie_details import MovieDetailsResolver
+import batch_recs
+import executors
+import scoring
+import startup
 import user
 
+IMPORT_DURATION = time.time() - _import_started
+
 # Configure logging with rotating file handler
 os.makedirs("logs", exist_ok=True)
 log_filename = "logs/server.log"
@@ -34,9 +43,84 @@ logger = logging.getLogger("recc-engine")
 logger.info("Starting server. Logging to %s", log_filename)
 
 load_dotenv()
-tmdb_client = TMDBClient(os.getenv("TMDB_BEARER"))
+tmdb_async = AsyncTMDBClient(
+    os.getenv("TMDB_BEARER"),
+    max_concurrency=int(os.getenv("TMDB_MAX_CONCURRENCY", 20)),
+)
+movie_resolver = MovieDetailsResolver(tmdb_async)
+apple_keys = JWKSCache()
+
+# Reranked candidate lists per (user, genres, language, min_year). Refreshing
+# the feed slices pages from here instead of re-running the search.
+CANDIDATE_LIST_SIZE = 200
+rec_cache = LRUCache(
+    maxsize=int(os.getenv("RECC_REC_CACHE_SIZE", 1024)),
+    ttl=float(os.getenv("RECC_REC_CACHE_TTL", 300)),
+)
+
+
+# Feed sessions: the ranked list a client is scrolling through, keyed by the
+# token in its cursor. Kept apart from rec_cache so syncing shown movies
+# mid-scroll doesn't reshuffle the pages the client is walking.
+feed_sessions = LRUCache(
+    maxsize=int(os.getenv("RECC_FEED_SESSIONS", 4096)),
+    ttl=float(os.getenv("RECC_FEED_SESSION_TTL", 1800)),
+)
+
+
+# Bumped on every invalidation, so a search that started before a rating or
+# sync doesn't cache its (now stale) list when it finishes
+rec_generations: Dict[str, int] = {}
+
+
+def invalidate_recommendations(user_id: str):
+    rec_generations[user_id] = rec_generations.get(user_id, 0) + 1
+    rec_cache.invalidate(lambda key: key[0] == user_id)
+
+
+def load_apple_keys():
+    if not apple_keys.refresh():
+        raise RuntimeError(f"Could not fetch signing keys from {apple_keys.url}")
+
+
+def warm_up_catalog():
+    user.get_catalog().ensure_fresh()
+
 
-app = FastAPI(title="Recc Engine API")
+def warm_up_search_index():
+    user.get_search_backend().ensure_fresh()
+
+
+# Startup phases of the current app instance, reported by /healthz and /readyz
+warm_up = startup.Startup()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Start serving right away and load the heavy subsystems in the background.
+    # Routes that need one before its phase runs load it on demand.
+    global warm_up
+    warm_up = startup.Startup()
+    warm_up.record("imports", IMPORT_DURATION)
+    warm_up.add("profile_store", user.get_profile_store)
+    warm_up.add("chroma", user.open_collections)
+    warm_up.add("catalog", warm_up_catalog)
+    warm_up.add("search_index", warm_up_search_index)
+    warm_up.add("embedding_model", user.warm_up_embedding_model)
+    # Sign-in falls back to fetching keys on demand, so this one is optional
+    warm_up.add("apple_jwks", load_apple_keys, required=False)
+    warm_up.start()
+    yield
+    warm_up.stop()
+    await tmdb_async.aclose()
+    movie_resolver.close()
+    executors.shutdown()
+    user.close_encoder()
+    user.close_profile_store()
+    user.close_chroma_client()
+
+
+app = FastAPI(title="Recc Engine API", lifespan=lifespan)
 
 
 @app.middleware("http")
@@ -78,30 +162,23 @@ class AppleAuthRequest(BaseModel):
 
 
 @app.post("/auth/apple")
-def apple_auth(request: AppleAuthRequest):
+async def apple_auth(request: AppleAuthRequest):
     """
     Verifies Apple Identity Token and issues a session token.
     Creates a user profile if one doesn't exist.
     """
-    try:
-        # 1. Verify Apple Token
-        apple_keys_url = "https://appleid.apple.com/auth/keys"
-
-        # Fetch Apple's public keys
-        key_payload = requests.get(apple_keys_url).json()
-        keys = key_payload.get("keys", [])
+    # Imported on first sign-in rather than at startup (pulls in cryptography)
+    import jwt
 
-        # Get the kid from the header
+    try:
+        # 1. Verify Apple Token against Apple's cached public keys
         header = jwt.get_unverified_header(request.identityToken)
         kid = header.get("kid")
-        alg = header.get("alg")
 
-        # Find the matching key
-        key = next((k for k in keys if k["kid"] == kid), None)
-        if not key:
+        entry = await io_pool.run(apple_keys.get_key, kid)
+        if not entry:
             raise HTTPException(status_code=401, detail="Invalid token: key not found")
-
-        public_key = RSAAlgorithm.from_jwk(json.dumps(key))
+        public_key, alg = entry
 
         # Decode and verify signature
         # We don't verify 'aud' strictly here as per request context, but in production we should.
@@ -119,54 +196,44 @@ def apple_auth(request: AppleAuthRequest):
         # 2. Get or Create User
         # Use user_sub as the unique user ID
         user_id = user_sub
-        file_path = f"users/{user_id}.json"
-        lock_file = f"users/{user_id}.lock"
 
-        # Ensure 'users' directory exists
-        os.makedirs("users", exist_ok=True)
-
-        profile = None
+        # Parse name if provided
+        name_part = "User"
+        if request.fullName:
+            given = request.fullName.get("givenName", "")
+            family = request.fullName.get("familyName", "")
+            # Combine if present
+            parts = [p for p in [given, family] if p]
+            if parts:
+                name_part = " ".join(parts)
+
+        # Default profile structure, stored only if the user doesn't exist yet
+        new_profile = {
+            "id": user_id,
+            "name": name_part,
+            "email": request.email or payload.get("email"),
+            "genres": [],
+            "data": {
+                "liked": [],
+                "disliked": [],
+                "neutral": [],
+                "watchlist": [],
+                "history": [],
+                "shown": [],
+            },
+            "keywords": {},
+            "personas": [],
+        }
 
         # Atomic creation/read
-        with portalocker.Lock(lock_file, timeout=5):
-            if os.path.exists(file_path):
-                try:
-                    profile = user.load_user_profile(file_path)
-                except Exception as e:
-                    logger.error(f"Failed to load profile for {user_id}: {e}")
-                    # If corrupt, maybe re-create? Or fail. Let's fail safe.
-                    raise HTTPException(status_code=500, detail="Profile load error")
-            else:
-                # Create new profile
-                # Parse name if provided
-                name_part = "User"
-                if request.fullName:
-                    given = request.fullName.get("givenName", "")
-                    family = request.fullName.get("familyName", "")
-                    # Combine if present
-                    parts = [p for p in [given, family] if p]
-                    if parts:
-                        name_part = " ".join(parts)
-
-                # Create default profile structure
-                profile = {
-                    "id": user_id,
-                    "name": name_part,
-                    "email": request.email or payload.get("email"),
-                    "genres": [],
-                    "data": {
-                        "liked": [],
-                        "disliked": [],
-                        "neutral": [],
-                        "watchlist": [],
-                        "history": [],
-                        "shown": [],
-                    },
-                    "keywords": {},
-                    "personas": [],
-                }
-                user.save_user_profile(file_path, profile)
+        try:
+            if await io_pool.run(user.create_profile, user_id, new_profile):
                 logger.info(f"Created new user profile: {user_id}")
+            profile = await io_pool.run(user.load_profile, user_id)
+        except Exception as e:
+            logger.error(f"Failed to load profile for {user_id}: {e}")
+            # If corrupt, maybe re-create? Or fail. Let's fail safe.
+            raise HTTPException(status_code=500, detail="Profile load error")
 
         # 3. Generate Session Token
         secret_key = os.getenv("JWT_SECRET_KEY", "dev-secret")
@@ -185,6 +252,11 @@ def apple_auth(request: AppleAuthRequest):
             "needs_onboarding": len(profile.get("personas", [])) == 0,
         }
 
+    except HTTPException:
+        raise
+    except JWKSUnavailable as e:
+        logger.error(f"Auth error: {e}")
+        raise HTTPException(status_code=503, detail="Sign in with Apple is unavailable")
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError as e:
@@ -199,7 +271,7 @@ class BatchMovieRequest(BaseModel):
 
 
 @app.post("/movies/batch", response_model=List[Recommendation])
-def get_movies_batch(request: BatchMovieRequest):
+async def get_movies_batch(request: BatchMovieRequest):
     """
     Fetches full movie details for a list of IDs.
     Used for hydrating user profiles on the client.
@@ -208,20 +280,18 @@ def get_movies_batch(request: BatchMovieRequest):
         # Deduplicate IDs
         unique_ids = list(set(request.movie_ids))
 
-        # Fetch from TMDB (via wrapper)
-        tmdb_results = tmdb_client.movie_details_batch(unique_ids)
+        # Resolve from memory, the local catalog and the disk cache first;
+        # only ids none of them know go to TMDB
+        details = await movie_resolver.get_many(unique_ids)
 
         movies = []
-        for data in tmdb_results:
-            # Map TMDB format to Recommendation/MovieDTO format
-            genres = [g["name"] for g in data.get("genres", [])]
-
+        for data in details:
             rec = Recommendation(
-                movie_id=str(data.get("id")),
-                title=data.get("title", "Unknown"),
+                movie_id=data["id"],
+                title=data["title"],
                 score=0.0,  # Not applicable for direct fetch
-                genres=genres,
-                backdrop_path=data.get("backdrop_path"),
+                genres=data["genres"],
+                backdrop_path=data["backdrop_path"],
             )
             movies.append(rec)
 
@@ -230,11 +300,40 @@ def get_movies_batch(request: BatchMovieRequest):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@app.get("/admin/cache/movies")
+def movie_cache_stats():
+    """
+    Per-tier hit counts and ratios for /movies/batch lookups.
+    """
+    return movie_resolver.stats()
+
+
 @app.get("/")
 def read_root():
     return {"message": "Welcome to the Recc Engine API"}
 
 
+@app.get("/healthz")
+def healthz():
+    """
+    Liveness: the process is up and serving. Always 200; includes the
+    warm-up report so a slow start can be told apart from a hung one.
+    """
+    return warm_up.report()
+
+
+@app.get("/readyz")
+def readyz(response: Response):
+    """
+    Readiness: 200 once every required subsystem has loaded, 503 (with the
+    per-subsystem states and load durations) until then.
+    """
+    report = warm_up.report()
+    if not report["ready"]:
+        response.status_code = 503
+    return report
+
+
 @app.get("/onboarding/personas", response_model=List[Persona])
 def get_onboarding_personas():
     """
@@ -286,31 +385,13 @@ class UserCreate(BaseModel):
     personas: Optional[List[str]] = []
 
 
-def update_keyword_counts(profile_keywords, new_keywords):
-    """
-    Updates the keyword counts in the profile.
-    Handles migration if profile_keywords is a list (legacy).
-    """
-    # Migration: Convert list to dict if necessary
-    if isinstance(profile_keywords, list):
-        # Assume count 1 for existing keywords in legacy list
-        counts = {k: 1 for k in profile_keywords}
-    else:
-        counts = profile_keywords
-
-    for kw in new_keywords:
-        counts[kw] = counts.get(kw, 0) + 1
-
-    return counts
-
-
 def validate_user_id(user_id: str):
     if not user_id or user_id != os.path.basename(user_id) or user_id in [".", ".."]:
         raise HTTPException(status_code=400, detail="Invalid user ID")
 
 
 @app.post("/encode")
-def encode_user(user_data: UserCreate):
+async def encode_user(user_data: UserCreate):
     """
     Creates or updates a user profile based on the provided personas.
     Retrieves embeddings for the personas, averages them, assigns to user.
@@ -328,7 +409,7 @@ def encode_user(user_data: UserCreate):
             # Sanitize title to match ID format: "persona_The_Thrill_Seeker"
             p_id = f"persona_{p_title.replace(' ', '_')}"
             try:
-                res = user.get_profile_from_db(p_id)
+                res = await search_pool.run(user.get_profile_from_db, p_id)
                 emb = res["embeddings"][0]
                 if emb is not None and len(emb) > 0:
                     persona_embeddings_list.append(emb)
@@ -360,15 +441,17 @@ def encode_user(user_data: UserCreate):
 
         # Save to disk
         validate_user_id(user_data.name)
-        file_path = f"users/{user_data.name}.json"
-        user.save_user_profile(file_path, profile)
+        await io_pool.run(user.save_profile, user_data.name, profile)
 
         # 3. Upsert to DB
         # We need 'query_text' for the DB document, though embedding is pre-calculated.
         # We can use genres + personas names.
         query_text = user.build_user_text(profile)  # Uses genres
 
-        user.upsert_user_profile(user_data.name, query_text, final_embedding, profile)
+        await search_pool.run(
+            user.upsert_user_profile, user_data.name, query_text, final_embedding, profile
+        )
+        invalidate_recommendations(user_data.name)
 
         return {
             "message": f"User {user_data.name} initialized with personas: {user_data.personas}",
@@ -382,17 +465,16 @@ def encode_user(user_data: UserCreate):
 
 
 @app.get("/users/{user_id}")
-def get_user_profile(user_id: str):
+async def get_user_profile(user_id: str):
     """
     Returns the full user profile (watchlist, history, ratings, etc.)
     """
     validate_user_id(user_id)
-    file_path = f"users/{user_id}.json"
-    if not os.path.exists(file_path):
+    if not await io_pool.run(user.profile_exists, user_id):
         raise HTTPException(status_code=404, detail="User profile not found")
 
     try:
-        profile = user.load_user_profile(file_path)
+        profile = await io_pool.run(user.load_profile, user_id)
         return profile
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -403,36 +485,38 @@ class WatchlistRequest(BaseModel):
 
 
 @app.post("/users/{user_id}/watchlist")
-def add_to_watchlist(user_id: str, request: WatchlistRequest):
+async def add_to_watchlist(user_id: str, request: WatchlistRequest):
     """
     Adds a movie to the user's watchlist.
     """
     try:
         validate_user_id(user_id)
-        file_path = f"users/{user_id}.json"
-        if not os.path.exists(file_path):
+        if not await io_pool.run(user.profile_exists, user_id):
             raise HTTPException(status_code=404, detail="User profile not found")
 
-        updated_profile = user.update_user_data(
-            file_path, request.movie_id, "watchlist"
+        updated_profile = await io_pool.run(
+            user.record_interaction, user_id, request.movie_id, "watchlist"
         )
+        invalidate_recommendations(user_id)
         return {"message": "Added to watchlist", "data": updated_profile["data"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.delete("/users/{user_id}/watchlist/{movie_id}")
-def remove_from_watchlist(user_id: str, movie_id: int):
+async def remove_from_watchlist(user_id: str, movie_id: int):
     """
     Removes a movie from the user's watchlist.
     """
     try:
         validate_user_id(user_id)
-        file_path = f"users/{user_id}.json"
-        if not os.path.exists(file_path):
+        if not await io_pool.run(user.profile_exists, user_id):
             raise HTTPException(status_code=404, detail="User profile not found")
 
-        updated_profile = user.update_user_data(file_path, movie_id, "remove_watchlist")
+        updated_profile = await io_pool.run(
+            user.record_interaction, user_id, movie_id, "remove_watchlist"
+        )
+        invalidate_recommendations(user_id)
         return {"message": "Removed from watchlist", "data": updated_profile["data"]}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -444,11 +528,12 @@ class RatingRequest(BaseModel):
 
 
 @app.post("/users/{user_id}/ratings")
-def rate_movie(user_id: str, request: RatingRequest):
+async def rate_movie(user_id: str, request: RatingRequest):
     """
     Updates the user's rating for a movie (like/dislike/neutral).
-    If 'like', it fetches keywords, updates the profile, and re-encodes the user
-    to provide live recommendation updates.
+    Likes and dislikes move the user's vector towards/away from the movie's
+    embedding for live recommendation updates; likes also add the movie's
+    keywords to the profile for reranking.
     """
     if request.rating not in ["like", "dislike", "neutral"]:
         raise HTTPException(
@@ -458,43 +543,44 @@ def rate_movie(user_id: str, request: RatingRequest):
 
     try:
         validate_user_id(user_id)
-        file_path = f"users/{user_id}.json"
-        if not os.path.exists(file_path):
+        if not await io_pool.run(user.profile_exists, user_id):
             raise HTTPException(status_code=404, detail="User profile not found")
 
-        # 1. Update the local JSON data (history, liked/disliked lists)
+        # 1. Update the stored interactions (history, liked/disliked lists)
         action_map = {"like": "liked", "dislike": "disliked", "neutral": "neutral"}
-        updated_profile = user.update_user_data(
-            file_path, request.movie_id, action_map[request.rating]
+        updated_profile = await io_pool.run(
+            user.record_interaction, user_id, request.movie_id, action_map[request.rating]
         )
+        invalidate_recommendations(user_id)
 
-        # 2. If liked, we need to update keywords and re-embed for live recs
+        # 2. Nudge the user's vector with the movie's stored embedding
+        if request.rating in ("like", "dislike"):
+            try:
+                if await search_pool.run(
+                    user.update_user_vector, user_id, request.movie_id, action_map[request.rating]
+                ):
+                    invalidate_recommendations(user_id)
+            except Exception as vector_error:
+                print(
+                    f"Warning: Failed to update vector for movie {request.movie_id}: {vector_error}"
+                )
+
+        # 3. If liked, add its keywords for reranking
         if request.rating == "like":
             try:
                 # Fetch new keywords
-                kw_resp = tmdb_client.keywords(request.movie_id)
+                kw_resp = await tmdb_async.keywords(request.movie_id)
                 keywords_data = kw_resp.get("keywords", [])
                 new_kws = [k["name"] for k in keywords_data if "name" in k]
 
-                # Merge with existing keywords using helper to update counts
-                current_keywords_data = updated_profile.get("keywords", {})
-                updated_keywords_dict = update_keyword_counts(
-                    current_keywords_data, new_kws
-                )
-                updated_profile["keywords"] = updated_keywords_dict
-
-                # Save the keyword update to disk
-                user.save_user_profile(file_path, updated_profile)
-
-                # Re-encode and Upsert
-                query_text = user.build_user_text(updated_profile)
-                embedding = user.encode_user_text(query_text)
-                user.upsert_user_profile(
-                    user_id, query_text, embedding, updated_profile
+                # Merge inside the store so concurrent likes don't drop counts
+                updated_profile["keywords"] = await io_pool.run(
+                    user.merge_keywords, user_id, new_kws
                 )
+                invalidate_recommendations(user_id)
             except Exception as tmdb_error:
                 print(
-                    f"Warning: Failed to fetch keywords or re-embed for movie {request.movie_id}: {tmdb_error}"
+                    f"Warning: Failed to fetch keywords for movie {request.movie_id}: {tmdb_error}"
                 )
                 # We don't fail the request, just the optimization
 
@@ -512,42 +598,138 @@ class SyncRequest(BaseModel):
 
 
 @app.post("/users/{user_id}/sync")
-def sync_user_data(user_id: str, request: SyncRequest):
+async def sync_user_data(user_id: str, request: SyncRequest):
     """
     Syncs the list of movies already shown to the user on the frontend.
     """
     try:
         print(f"[Backend] Syncing shown movies for user: {user_id}")
         validate_user_id(user_id)
-        file_path = f"users/{user_id}.json"
-        if not os.path.exists(file_path):
-            print(f"[Backend] Profile not found for sync: {file_path}")
+        if not await io_pool.run(user.profile_exists, user_id):
+            print(f"[Backend] Profile not found for sync: {user_id}")
             raise HTTPException(status_code=404, detail="User profile not found")
 
-        profile = user.load_user_profile(file_path)
-
         # Update 'shown' list
-        current_shown = set(profile["data"].get("shown", []))
-        incoming_ids = set(request.shown_ids)
-        current_shown.update(incoming_ids)
-        profile["data"]["shown"] = list(current_shown)
-
-        user.save_user_profile(file_path, profile)
-        print(
-            f"[Backend] Sync successful. Total shown now: {len(profile['data']['shown'])}"
-        )
+        shown_count = await io_pool.run(user.record_shown, user_id, request.shown_ids)
+        invalidate_recommendations(user_id)
+        print(f"[Backend] Sync successful. Total shown now: {shown_count}")
         return {
             "message": "Sync successful",
-            "shown_count": len(profile["data"]["shown"]),
+            "shown_count": shown_count,
         }
     except Exception as e:
         print(f"[Backend] Sync error: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def to_recommendations(results) -> List[Recommendation]:
+    """
+    Maps search_movies-shaped results to Recommendation DTOs.
+    """
+    recommendations = []
+    if results and results["ids"]:
+        ids = results["ids"][0]
+        metadatas = results["metadatas"][0]
+        if "scores" in results:
+            scores = results["scores"][0]
+        else:
+            # Precomputed before blended ranking: similarity, higher is better
+            scores = [1.0 - d / 2.0 for d in results["distances"][0]]
+
+        for idx, movie_id in enumerate(ids):
+            # Metadata comes from the catalog index, already decoded
+            meta = metadatas[idx]
+            rec = Recommendation(
+                movie_id=str(movie_id),
+                title=meta["title"],
+                score=scores[idx],
+                genres=meta["genres"],
+                backdrop_path=meta["backdrop_path"],
+            )
+            recommendations.append(rec)
+    return recommendations
+
+
+def feed_page(response: Response, token: str, results, offset: int, top_k: int):
+    """
+    Returns one page of a feed session and sets X-Next-Cursor if more remain.
+    """
+    end = offset + top_k
+    if end < len(results["ids"][0]):
+        response.headers["X-Next-Cursor"] = f"{token}.{end}"
+    return to_recommendations(user.slice_results(results, offset, end))
+
+
+def start_feed(response: Response, user_id: str, results, top_k: int):
+    token = secrets.token_urlsafe(12)
+    feed_sessions.set(token, (user_id, results))
+    return feed_page(response, token, results, 0, top_k)
+
+
+class BatchRecommendationRequest(BaseModel):
+    user_ids: List[str]
+    top_k: int = 50
+    language: Optional[str] = None
+    min_year: Optional[int] = 1995
+
+
+@app.post("/recommendations/batch", response_model=Dict[str, List[Recommendation]])
+async def batch_recommendations(request: BatchRecommendationRequest):
+    """
+    Computes recommendations for many users in one pass and stores them for
+    get_recommendations to serve. Used for push notifications and feed warm-up.
+    """
+    try:
+        for user_id in request.user_ids:
+            validate_user_id(user_id)
+        computed = await search_pool.run(
+            batch_recs.precompute,
+            request.user_ids,
+            top_k=request.top_k,
+            language=request.language,
+            min_year=request.min_year,
+        )
+        for uid in computed:
+            invalidate_recommendations(uid)
+        return {uid: to_recommendations(results) for uid, results in computed.items()}
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@app.get("/admin/executors")
+def executor_stats():
+    """
+    Saturation of the search/io pools (active and queued tasks, utilization,
+    how long tasks waited for a worker) and of the embedding micro-batcher
+    (queue depth and batch-size histograms).
+    """
+    stats = executors.stats()
+    stats["embedding"] = user.get_encoder().stats()
+    return stats
+
+
+@app.get("/admin/cache/embeddings")
+def embedding_cache_stats():
+    """
+    Memory/disk hit counts for the text -> embedding cache.
+    """
+    return user.get_embedding_cache().stats()
+
+
+@app.get("/admin/cache/recommendations")
+def recommendation_cache_stats():
+    """
+    Hit/miss counters for the per-user recommendation cache.
+    """
+    return rec_cache.stats()
+
+
 @app.get("/users/{user_id}/recommendations", response_model=List[Recommendation])
-def get_recommendations(
+async def get_recommendations(
     user_id: str,
+    response: Response,
     top_k: int = 20,
     genres: Optional[str] = Query(
         None, description="Comma-separated list of genres to filter by"
@@ -558,121 +740,124 @@ def get_recommendations(
     min_year: Optional[int] = Query(
         1995, description="Minimum release year to filter by"
     ),
+    cursor: Optional[str] = Query(
+        None, description="X-Next-Cursor from the previous page"
+    ),
+    weights: Optional[str] = Query(
+        None, description="Scoring weight overrides for A/B tests (e.g. 'keywords=0.5,recency=0')"
+    ),
 ):
     """
     Get movie recommendations for a user based on their stored embedding.
     Excludes movies the user has already seen or interacted with.
+    The X-Next-Cursor response header pages further into the same ranked list.
     """
     try:
         print(f"[Backend] Fetching recommendations for: {user_id}")
         validate_user_id(user_id)
+        try:
+            scoring_weights = scoring.parse_weights(weights)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if weights:
+            print(f"[Backend] Scoring weights override: {scoring_weights.to_dict()}")
+
+        # Continue a feed: the next page comes from the list held server-side
+        if cursor:
+            token, _, offset = cursor.partition(".")
+            if not offset.isdigit():
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            session = feed_sessions.get(token)
+            if session is not None and session[0] == user_id:
+                return feed_page(response, token, session[1], int(offset), top_k)
+            print(f"[Backend] Feed cursor expired. Starting a new feed.")
+
+        # 0. Slice from the cached candidate list if this feed was built recently
+        genre_key = tuple(g.strip() for g in genres.split(",")) if genres else None
+        cache_key = (user_id, genre_key, language, min_year, scoring_weights)
+        cached = rec_cache.get(cache_key)
+        if cached is not None and cached[1] >= top_k:
+            print(f"[Backend] Serving cached recommendations.")
+            return start_feed(response, user_id, cached[0], top_k)
+
+        generation = rec_generations.get(user_id, 0)
         embedding = None
         filter_genres = []
         exclude_ids = []
 
         # 1. Try to load user profile to get exclusion list and genres
-        file_path = f"users/{user_id}.json"
         profile = None
-        user_keywords_list = []
-        if os.path.exists(file_path):
-            profile = user.load_user_profile(file_path)
+        user_keywords = {}
+        if await io_pool.run(user.profile_exists, user_id):
+            profile = await io_pool.run(user.load_profile, user_id)
             # Exclude shown, liked, disliked, and watchlist
-            data = profile.get("data", {})
-            exclude_ids = list(
-                set(
-                    data.get("shown", [])
-                    + data.get("liked", [])
-                    + data.get("disliked", [])
-                    + data.get("watchlist", [])
-                    + data.get("history", [])
-                )
-            )
+            interactions = await io_pool.run(user.get_interactions, user_id)
+            exclude_ids = interactions.exclusion_set
             print(f"[Backend] Loaded profile. Exclusion list size: {len(exclude_ids)}")
             if not genres:
                 filter_genres = profile.get("genres", [])
 
             # Process Keywords: Filter Top 100
-            raw_keywords = profile.get("keywords", {})
-            if isinstance(raw_keywords, list):
-                # Legacy: It's a list, use all of them (or truncate if we wanted, but logic implies frequency)
-                # Since we don't have frequency, we just take them all (or top 100 arbitrary)
-                user_keywords_list = raw_keywords[:100]
-            elif isinstance(raw_keywords, dict):
-                # Sort by count (descending)
-                sorted_kws = sorted(
-                    raw_keywords.items(), key=lambda item: item[1], reverse=True
-                )
-                # Take top 100 keys
-                user_keywords_list = [k for k, v in sorted_kws[:100]]
+            user_keywords = user.get_keyword_counts(profile, limit=100)
 
         else:
-            print(f"[Backend] Profile file NOT FOUND: {file_path}")
+            print(f"[Backend] Profile NOT FOUND: {user_id}")
+
+        # Override genres if provided in query
+        if genres:
+            filter_genres = [g.strip() for g in genres.split(",")]
+
+        # 2. Serve from the batch job's store while it's fresh (it was ranked
+        # with the default weights)
+        if profile and scoring_weights == scoring.DEFAULT_WEIGHTS:
+            results = await io_pool.run(
+                batch_recs.load_precomputed, user_id, top_k, filter_genres, language, min_year
+            )
+            if results is not None:
+                print(f"[Backend] Serving precomputed recommendations.")
+                return start_feed(response, user_id, results, top_k)
 
-        # 2. Try to get embedding from DB
+        # 3. Try to get embedding from DB
         try:
-            db_result = user.get_profile_from_db(user_id)
+            db_result = await search_pool.run(user.get_profile_from_db, user_id)
             embedding = [db_result["embeddings"][0]]
         except ValueError:
             # If not in DB, encode from profile
             if profile:
                 print(f"[Backend] Embedding not in DB. Encoding from profile...")
                 query_text = user.build_user_text(profile)
-                embedding = user.encode_user_text(query_text)
-                user.upsert_user_profile(user_id, query_text, embedding, profile)
+                embedding = await user.encode_user_text_async(query_text)
+                await search_pool.run(
+                    user.upsert_user_profile, user_id, query_text, embedding, profile
+                )
             else:
                 raise HTTPException(status_code=404, detail="User not found")
 
-        # Override genres if provided in query
-        if genres:
-            filter_genres = [g.strip() for g in genres.split(",")]
-
         if not embedding:
             raise HTTPException(
                 status_code=500, detail="Failed to obtain user embedding."
             )
 
-        # 3. Search with exclusion and language filter
-        results = user.search_movies(
+        # 4. Search with exclusion and language filter. Rank a longer list than
+        # requested and cache it so refreshes are served from memory.
+        list_size = max(top_k, CANDIDATE_LIST_SIZE)
+        results = await search_pool.run(
+            user.search_movies,
             embedding,
-            top_k,
+            list_size,
             filters=filter_genres,
             exclude_ids=exclude_ids,
             language=language,
-            user_keywords=user_keywords_list,
+            user_keywords=user_keywords,
             min_year=min_year,
+            weights=scoring_weights,
         )
-
-        recommendations = []
         if results and results["ids"]:
-            ids = results["ids"][0]
-            metadatas = results["metadatas"][0]
-            distances = results["distances"][0]
-
-            print(f"[Backend] Engine returned {len(ids)} candidates after exclusion.")
-
-            for idx, movie_id in enumerate(ids):
-                meta = metadatas[idx]
-                payload = json.loads(meta.get("payload", "{}"))
-
-                # Extract genre names if they are objects
-                raw_genres = payload.get("genres", [])
-                processed_genres = []
-                for g in raw_genres:
-                    if isinstance(g, dict) and "name" in g:
-                        processed_genres.append(g["name"])
-                    elif isinstance(g, str):
-                        processed_genres.append(g)
-
-                rec = Recommendation(
-                    movie_id=str(movie_id),
-                    title=payload.get("title", "Unknown"),
-                    score=distances[idx],
-                    genres=processed_genres,
-                    backdrop_path=payload.get("backdrop_path"),
-                )
-                recommendations.append(rec)
+            print(f"[Backend] Engine returned {len(results['ids'][0])} candidates after exclusion.")
+        if rec_generations.get(user_id, 0) == generation:
+            rec_cache.set(cache_key, (results, list_size))
 
-        return recommendations
+        return start_feed(response, user_id, results, top_k)
 
     except HTTPException:
         raise
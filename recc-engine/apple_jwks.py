@@ -0,0 +1,142 @@
+"""
+Cache for Apple's Sign in with Apple signing keys (JWKS).
+
+Keys are fetched once, parsed into public key objects and kept by 'kid' for as
+long as Apple's Cache-Control max-age allows. Near expiry they are refreshed
+in a background thread; an unknown 'kid' triggers an immediate (rate-limited)
+refetch, and if Apple can't be reached the last good keys keep being served.
+Only one fetch runs at a time: callers that need fresh keys while one is in
+flight wait for it and use its result instead of fetching again.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger("recc-engine.apple_jwks")
+
+APPLE_KEYS_URL = os.getenv("APPLE_KEYS_URL", "https://appleid.apple.com/auth/keys")
+DEFAULT_TTL = 3600
+MIN_TTL = 60
+MAX_TTL = 24 * 3600
+# Refresh in the background once this fraction of the TTL has elapsed
+REFRESH_AHEAD = 0.8
+# Minimum seconds between refetches caused by unknown kids
+UNKNOWN_KID_INTERVAL = 30
+
+
+class JWKSUnavailable(Exception):
+    """No signing keys could be fetched and none are cached."""
+
+
+def _max_age(cache_control: Optional[str]) -> Optional[int]:
+    if not cache_control:
+        return None
+    match = re.search(r"max-age=(\d+)", cache_control)
+    return int(match.group(1)) if match else None
+
+
+class JWKSCache:
+    def __init__(self, url: str = APPLE_KEYS_URL, default_ttl: int = DEFAULT_TTL, timeout: float = 5.0) -> None:
+        self.url = url
+        self.default_ttl = default_ttl
+        self.timeout = timeout
+        self._keys: Dict[str, Tuple[Any, str]] = {}
+        self._fetched_at = 0.0
+        self._expires_at = 0.0
+        self._last_unknown_refetch = 0.0
+        self._lock = threading.Lock()
+        # Held for the duration of a fetch
+        self._fetch_lock = threading.Lock()
+        self._refreshing = False
+        self._session = None
+
+    def _fetch(self) -> None:
+        # Imported here so the HTTP and crypto stacks load on the first fetch
+        # (during warm-up), not when app.py is imported
+        import requests
+        from jwt.algorithms import RSAAlgorithm
+
+        if self._session is None:
+            self._session = requests.Session()
+        response = self._session.get(self.url, timeout=self.timeout)
+        response.raise_for_status()
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            kid = jwk.get("kid")
+            if not kid:
+                continue
+            keys[kid] = (RSAAlgorithm.from_jwk(json.dumps(jwk)), jwk.get("alg", "RS256"))
+        if not keys:
+            raise ValueError("JWKS response contained no keys")
+
+        ttl = _max_age(response.headers.get("Cache-Control"))
+        ttl = min(max(ttl if ttl is not None else self.default_ttl, MIN_TTL), MAX_TTL)
+        with self._lock:
+            self._keys = keys
+            self._fetched_at = time.time()
+            self._expires_at = self._fetched_at + ttl
+        logger.info("action jwks_fetch | keys %d | ttl %ds", len(keys), ttl)
+
+    def refresh(self) -> bool:
+        """
+        Fetches the key set now. On failure the cached keys are kept and
+        served for another MIN_TTL seconds before the next attempt.
+        """
+        try:
+            self._fetch()
+            return True
+        except Exception as e:
+            logger.warning("JWKS refresh failed, keeping %d cached keys: %s", len(self._keys), e)
+            if self._keys:
+                with self._lock:
+                    self._expires_at = max(self._expires_at, time.time() + MIN_TTL)
+            return False
+
+    def refresh_in_background(self) -> None:
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                with self._fetch_lock:
+                    self.refresh()
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="jwks-refresh", daemon=True).start()
+
+    def get_key(self, kid: Optional[str]) -> Optional[Tuple[Any, str]]:
+        """
+        Returns (public_key, alg) for kid, or None if Apple doesn't publish it.
+        Raises JWKSUnavailable if there are no keys at all.
+        """
+        now = time.time()
+        if not self._keys or now >= self._expires_at:
+            # Expired: refetch inline, but fall back to stale keys on error
+            with self._fetch_lock:
+                # A fetch we waited on may already have renewed them
+                if not self._keys or time.time() >= self._expires_at:
+                    self.refresh()
+            if not self._keys:
+                raise JWKSUnavailable(f"Could not fetch signing keys from {self.url}")
+        elif now >= self._fetched_at + (self._expires_at - self._fetched_at) * REFRESH_AHEAD:
+            self.refresh_in_background()
+
+        entry = self._keys.get(kid)
+        if entry is None:
+            # Apple may have rotated keys since our last fetch. Waits out a
+            # fetch in flight, which may bring the kid, before starting one
+            with self._fetch_lock:
+                entry = self._keys.get(kid)
+                if entry is None and time.time() - self._last_unknown_refetch >= UNKNOWN_KID_INTERVAL:
+                    self._last_unknown_refetch = time.time()
+                    self.refresh()
+                    entry = self._keys.get(kid)
+        return entry
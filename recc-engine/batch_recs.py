@@ -0,0 +1,190 @@
+"""
+Batch recommendation job.
+
+Scores many users against the movie matrix with a single matrix-matrix
+multiply, applies each user's filters, exclusions and keyword rerank, and
+writes the results to the precomputed recommendations store
+(precomputed/{user_id}.json). get_recommendations serves from that store
+while an entry is fresh.
+
+Usage:
+    python batch_recs.py --all
+    python batch_recs.py --users alice,bob --top-k 50
+"""
+
+import argparse
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+import scoring
+import user
+
+logger = logging.getLogger("recc-engine.batch_recs")
+
+PRECOMPUTED_PATH = "precomputed"
+# Entries older than this are ignored even if the profile hasn't changed
+PRECOMPUTED_TTL = int(os.getenv("RECC_PRECOMPUTED_TTL", 6 * 3600))
+DEFAULT_MIN_YEAR = 1995
+# Users scored per matrix multiply; bounds the (users x movies) score matrix
+BATCH_SIZE = 256
+
+
+def _params(genres, language, min_year):
+    return {"genres": sorted(genres or []), "language": language, "min_year": min_year}
+
+
+def load_user_embeddings(user_ids):
+    """
+    Fetches embeddings for user_ids from the 'users' collection.
+    Returns (found_ids, matrix) with one row per user that has an embedding.
+    """
+    results = user.get_collection("users").get(ids=list(user_ids), include=["embeddings"])
+    found_ids = []
+    vectors = []
+    for uid, emb in zip(results["ids"], results["embeddings"]):
+        if emb is not None and len(emb) > 0:
+            found_ids.append(uid)
+            vectors.append(emb)
+    if not vectors:
+        return [], np.zeros((0, 0), dtype=np.float32)
+    return found_ids, np.asarray(vectors, dtype=np.float32)
+
+
+def list_user_ids():
+    """
+    All users that have both an embedding and a stored profile (skips personas).
+    """
+    ids = user.get_collection("users").get(include=[])["ids"]
+    return [uid for uid in ids if user.profile_exists(uid)]
+
+
+def recommend_many(user_ids, top_k=20, language=None, min_year=DEFAULT_MIN_YEAR):
+    """
+    Computes recommendations for every user in user_ids.
+    Returns {user_id: (results, params)} where results has search_movies' shape.
+    Users without a profile or embedding are skipped.
+    """
+    start_time = time.time()
+    index = user.get_movie_matrix()
+    index.ensure_fresh()
+    # One version of the index for the whole run, even if it's rebuilt meanwhile
+    snap = index.snapshot
+    if len(snap) == 0:
+        return {}
+    pool_k = scoring.pool_size(top_k)
+
+    found_ids, user_matrix = load_user_embeddings(user_ids)
+    output = {}
+    for b in range(0, len(found_ids), BATCH_SIZE):
+        batch_ids = found_ids[b:b + BATCH_SIZE]
+        batch = user_matrix[b:b + BATCH_SIZE]
+        norms = np.linalg.norm(batch, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+
+        # (users x dim) @ (dim x movies): cosine similarity for the whole batch
+        scores = (batch / norms) @ snap.matrix.T
+
+        for row, uid in enumerate(batch_ids):
+            if not user.profile_exists(uid):
+                continue
+            profile = user.load_profile(uid)
+            genres = profile.get("genres", [])
+
+            mask = snap.filter_mask(genres, language, min_year)
+            row_of = snap.row_of
+            exclude = user.get_interactions(uid).exclusion_set
+            mask[[row_of[mid] for mid in exclude if mid in row_of]] = False
+
+            rows = index.top_k(scores[row], mask, pool_k)
+            ids = [snap.ids[r] for r in rows]
+            dists = (2.0 - 2.0 * scores[row, rows]).tolist()
+            docs = [snap.documents[r] for r in rows]
+
+            results = user.rerank_candidates(
+                ids, dists, docs, top_k, user.get_keyword_counts(profile, limit=100)
+            )
+            output[uid] = (results, _params(genres, language, min_year))
+
+    duration = time.time() - start_time
+    logger.info(
+        "action recommend_many | duration %.4fs | users %d | scored %d",
+        duration, len(user_ids), len(output),
+    )
+    return output
+
+
+def save_precomputed(user_id, results, params):
+    os.makedirs(PRECOMPUTED_PATH, exist_ok=True)
+    path = os.path.join(PRECOMPUTED_PATH, f"{user_id}.json")
+    entry = {"generated_at": time.time(), "params": params, "results": results}
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(entry, f)
+    os.replace(tmp_path, path)
+
+
+def load_precomputed(user_id, top_k, genres=None, language=None, min_year=DEFAULT_MIN_YEAR):
+    """
+    Returns the full stored list for user_id if it was computed with the same
+    filters, holds at least top_k movies, is within PRECOMPUTED_TTL and is
+    newer than the user's profile. Otherwise None.
+    """
+    path = os.path.join(PRECOMPUTED_PATH, f"{user_id}.json")
+    try:
+        with open(path, "r") as f:
+            entry = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+
+    generated_at = entry.get("generated_at", 0)
+    if time.time() - generated_at > PRECOMPUTED_TTL:
+        return None
+    updated_at = user.profile_updated_at(user_id)
+    if updated_at is not None and updated_at > generated_at:
+        return None
+    if entry.get("params") != _params(genres, language, min_year):
+        return None
+
+    results = entry["results"]
+    if len(results["ids"][0]) < top_k:
+        return None
+    return results
+
+
+def precompute(user_ids, top_k=20, language=None, min_year=DEFAULT_MIN_YEAR):
+    """
+    Runs recommend_many and stores every result. Returns {user_id: results}.
+    """
+    computed = recommend_many(user_ids, top_k=top_k, language=language, min_year=min_year)
+    for uid, (results, params) in computed.items():
+        save_precomputed(uid, results, params)
+    return {uid: results for uid, (results, _) in computed.items()}
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", help="Comma-separated list of user ids")
+    parser.add_argument("--all", action="store_true", help="Precompute for every user")
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--language", help="Language code to filter by")
+    parser.add_argument("--min-year", type=int, default=DEFAULT_MIN_YEAR)
+    args = parser.parse_args()
+
+    if args.all:
+        user_ids = list_user_ids()
+    elif args.users:
+        user_ids = [u.strip() for u in args.users.split(",") if u.strip()]
+    else:
+        parser.error("Pass --users or --all")
+
+    computed = precompute(user_ids, top_k=args.top_k, language=args.language, min_year=args.min_year)
+    print(f"Precomputed recommendations for {len(computed)}/{len(user_ids)} users.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Small thread-safe LRU cache with optional per-entry TTL and hit/miss counters.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache:
+    def __init__(self, maxsize: int = 1024, ttl: Optional[float] = None) -> None:
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key, _MISSING)
+            if entry is not _MISSING:
+                value, expires_at = entry
+                if expires_at is None or expires_at > time.time():
+                    self._data.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._data[key]
+            self.misses += 1
+            return default
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def pop(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate(self, predicate: Callable[[Hashable], bool]) -> int:
+        """Drops every entry whose key matches predicate. Returns how many were dropped."""
+        with self._lock:
+            stale = [key for key in self._data if predicate(key)]
+            for key in stale:
+                del self._data[key]
+        return len(stale)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+        }
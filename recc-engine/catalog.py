@@ -0,0 +1,357 @@
+"""
+In-memory index of the movie catalog.
+Records are built from the columnar movie store (movie_store.py) into compact
+MovieRecords so the search and response paths never touch per-movie JSON.
+Movies ingested before the store existed still carry a TMDB payload in their
+Chroma metadata; those are decoded from it instead.
+
+Keywords are kept apart from the records, as a movie x keyword CSR matrix
+(KeywordMatrix), so keyword overlap for a whole candidate pool is one sparse
+matrix-vector product.
+"""
+
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple, Union
+
+import numpy as np
+
+from movie_store import MovieStore
+
+logger = logging.getLogger("recc-engine.catalog")
+
+# How often (seconds) to check whether the collection changed underneath us
+REFRESH_INTERVAL = 60
+PAGE_SIZE = 1000
+
+# How a user's keywords are weighted in the overlap score:
+#   binary  1 per keyword (the overlap is the number of shared keywords)
+#   count   the keyword's count in the profile (merge_keyword_counts)
+#   tfidf   count x inverse document frequency over the catalog, so shared
+#           niche keywords outweigh ones half the catalog has
+KEYWORD_WEIGHTINGS = ("binary", "count", "tfidf")
+KEYWORD_WEIGHTING = os.getenv("RECC_KEYWORD_WEIGHTING", "binary")
+# A normalized overlap of 1.0 means sharing as much weight as the user's
+# this-many strongest keywords
+KEYWORD_SATURATION = int(os.getenv("RECC_KEYWORD_SATURATION", 5))
+
+# A user's keywords: names with profile counts, or a plain list of names
+UserKeywords = Union[Dict[str, float], Iterable[str]]
+
+
+@dataclass(frozen=True)
+class MovieRecord:
+    id: str
+    title: str
+    genres: Tuple[str, ...]
+    backdrop_path: Optional[str]
+    year: Optional[int]
+    language: str
+    # Ranking signals (scoring.py); not part of the API metadata
+    popularity: float = 0.0
+    vote_average: float = 0.0
+    vote_count: int = 0
+
+    def to_metadata(self) -> Dict:
+        return {
+            "title": self.title,
+            "genres": list(self.genres),
+            "backdrop_path": self.backdrop_path,
+            "year": self.year,
+            "language": self.language,
+        }
+
+
+class KeywordMatrix:
+    """
+    Movie x keyword CSR matrix with keyword names interned to column indices.
+    Immutable once built; the catalog swaps in a new one when it changes.
+    """
+
+    def __init__(self, movie_ids: List[str], columns: Dict[str, int],
+                 indptr: np.ndarray, indices: np.ndarray) -> None:
+        from scipy.sparse import csr_matrix
+
+        self.rows = {mid: row for row, mid in enumerate(movie_ids)}
+        self.columns = columns
+        matrix = csr_matrix(
+            (np.ones(len(indices), dtype=np.float32), indices, indptr),
+            shape=(len(movie_ids), len(columns)),
+        )
+        # A keyword listed twice still counts once
+        matrix.sum_duplicates()
+        matrix.data[:] = 1.0
+        self.matrix = matrix
+        # Smoothed idf, as in scikit-learn's TfidfTransformer
+        df = np.bincount(matrix.indices, minlength=len(columns))
+        self.idf = (np.log((1 + len(movie_ids)) / (1 + df)) + 1).astype(np.float32)
+
+    @property
+    def nnz(self) -> int:
+        return self.matrix.nnz
+
+    def user_vector(self, keywords: UserKeywords, weighting: str = KEYWORD_WEIGHTING) -> np.ndarray:
+        """Dense weight per keyword column; keywords no movie has are dropped."""
+        if weighting not in KEYWORD_WEIGHTINGS:
+            raise ValueError(f"Unknown keyword weighting {weighting!r}, expected one of {KEYWORD_WEIGHTINGS}")
+        counts = keywords if isinstance(keywords, dict) else dict.fromkeys(keywords, 1)
+        vector = np.zeros(len(self.columns), dtype=np.float32)
+        columns = self.columns
+        for name, count in counts.items():
+            column = columns.get(name)
+            if column is not None:
+                vector[column] = 1.0 if weighting == "binary" else float(count)
+        if weighting == "tfidf":
+            vector *= self.idf
+        return vector
+
+    def overlap(self, movie_ids: List[str], vector: np.ndarray) -> np.ndarray:
+        """Weighted keyword overlap of each movie with the user vector; 0 for unknown ids."""
+        rows = self.rows
+        row_ids = np.fromiter((rows.get(mid, -1) for mid in movie_ids), dtype=np.int64, count=len(movie_ids))
+        scores = np.zeros(len(movie_ids), dtype=np.float32)
+        known = row_ids >= 0
+        if known.any() and vector.any():
+            scores[known] = self.matrix[row_ids[known]] @ vector
+        return scores
+
+    def extend(self, movie_ids: List[str], keyword_names: List[List[str]]) -> "KeywordMatrix":
+        """A copy with rows added for movies loaded after the last rebuild."""
+        columns = dict(self.columns)
+        new_ids = [mid for mid in movie_ids if mid not in self.rows]
+        names_of = dict(zip(movie_ids, keyword_names))
+        indices = [_intern_column(columns, name) for mid in new_ids for name in names_of[mid]]
+        indptr = np.cumsum([0] + [len(names_of[mid]) for mid in new_ids]) + self.matrix.indptr[-1]
+        ordered = sorted(self.rows, key=self.rows.get)
+        return KeywordMatrix(
+            ordered + new_ids,
+            columns,
+            np.concatenate([self.matrix.indptr, indptr[1:]]),
+            np.concatenate([self.matrix.indices, np.array(indices, dtype=self.matrix.indices.dtype)]),
+        )
+
+
+def _intern_column(columns: Dict[str, int], name: str) -> int:
+    column = columns.get(name)
+    if column is None:
+        column = columns[sys.intern(name)] = len(columns)
+    return column
+
+
+class MovieCatalog:
+    """
+    Maps movie id -> MovieRecord for every movie in the Chroma 'movies' collection.
+    The index is rebuilt when the collection's count or the movie store file
+    changes (checked at most every REFRESH_INTERVAL seconds) or after
+    invalidate().
+    """
+
+    def __init__(self, collection_getter: Callable, store: Optional[MovieStore] = None) -> None:
+        self._collection_getter = collection_getter
+        self._store = store if store is not None else MovieStore()
+        self._records: Dict[str, MovieRecord] = {}
+        self._keywords: Optional[KeywordMatrix] = None
+        # Ids Chroma didn't have, so they aren't looked up again until the
+        # next rebuild
+        self._missing: Set[str] = set()
+        self._count: Optional[int] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._rebuild_callbacks: List[Callable[[], None]] = []
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._count = None
+
+    def on_rebuild(self, callback: Callable[[], None]) -> None:
+        """Registers callback to run after every rebuild (e.g. to drop caches of records)."""
+        self._rebuild_callbacks.append(callback)
+
+    def ensure_fresh(self) -> None:
+        now = time.time()
+        if self._count is not None and now - self._checked_at < REFRESH_INTERVAL:
+            return
+        with self._lock:
+            if self._count is not None and now - self._checked_at < REFRESH_INTERVAL:
+                return
+            collection = self._collection_getter()
+            count = collection.count()
+            if count != self._count or self._store.changed():
+                self._rebuild(collection, count)
+            self._checked_at = now
+
+    def get(self, movie_id) -> Optional[MovieRecord]:
+        self.ensure_fresh()
+        return self._records.get(str(movie_id))
+
+    def get_many(self, movie_ids: Iterable) -> List[MovieRecord]:
+        """
+        Returns records for the given ids, loading any the index hasn't seen yet.
+        Unknown ids are skipped, and remembered as unknown until the next rebuild.
+        """
+        self.ensure_fresh()
+        str_ids = [str(mid) for mid in movie_ids]
+        records = self._records
+        missing_ids = self._missing
+        missing = list(dict.fromkeys(
+            mid for mid in str_ids if mid not in records and mid not in missing_ids
+        ))
+        if missing:
+            self._load_ids(missing)
+        return [self._records[mid] for mid in str_ids if mid in self._records]
+
+    def keyword_scores(self, movie_ids: List[str], keywords: UserKeywords,
+                       weighting: str = KEYWORD_WEIGHTING, normalize: bool = False) -> np.ndarray:
+        """
+        Weighted overlap of each movie's keywords with the user's, as one
+        sparse matrix-vector product. Call after get_many(movie_ids) so
+        movies loaded on demand have rows. With normalize, scores are scaled
+        into [0, 1] by the weight of the user's KEYWORD_SATURATION strongest
+        keywords, so they are comparable across users.
+        """
+        self.ensure_fresh()
+        matrix = self._keywords
+        if matrix is None or not keywords:
+            return np.zeros(len(movie_ids), dtype=np.float32)
+        vector = matrix.user_vector(keywords, weighting)
+        scores = matrix.overlap(movie_ids, vector)
+        if normalize:
+            strongest = np.sort(vector)[-KEYWORD_SATURATION:].sum()
+            if strongest > 0:
+                np.minimum(scores / strongest, 1.0, out=scores)
+        return scores
+
+    def _rebuild(self, collection, count: int) -> None:
+        start_time = time.time()
+        store = self._store
+        store.load()
+        genre_names = [sys.intern(g) for g in store.genre_names]
+        language_names = [sys.intern(l) for l in store.language_names]
+        years = store.years.tolist()
+        language_codes = store.language_codes.tolist()
+        genre_offsets = store.genre_offsets.tolist()
+        genre_codes = store.genre_codes.tolist()
+        popularity = store.popularity.tolist()
+        vote_average = store.vote_average.tolist()
+        vote_count = store.vote_count.tolist()
+
+        records = {}
+        for row, movie_id in enumerate(store.ids.tolist()):
+            mid = str(movie_id)
+            records[mid] = MovieRecord(
+                id=mid,
+                title=store.titles[row],
+                genres=tuple(genre_names[c] for c in genre_codes[genre_offsets[row]:genre_offsets[row + 1]]),
+                backdrop_path=store.backdrops[row],
+                year=years[row] or None,
+                language=language_names[language_codes[row]],
+                popularity=popularity[row],
+                vote_average=vote_average[row],
+                vote_count=vote_count[row],
+            )
+
+        # The store's vocabulary is sorted by keyword id, so its keyword ids
+        # map to column indices with one searchsorted
+        columns: Dict[str, int] = {}
+        vocab_columns = np.array([_intern_column(columns, name) for name in store.vocab_names], dtype=np.int32)
+        indices = vocab_columns[np.searchsorted(store.vocab_ids, store.keyword_ids)]
+        indptr = store.keyword_offsets
+
+        # Movies the store doesn't have yet (ingested before it existed, or by
+        # a run that hasn't finished) fall back to their Chroma metadata
+        legacy = [mid for mid in collection.get(include=[])["ids"] if mid not in records]
+        legacy_indices = []
+        legacy_lengths = []
+        for start in range(0, len(legacy), PAGE_SIZE):
+            results = collection.get(ids=legacy[start:start + PAGE_SIZE], include=["metadatas"])
+            for mid, meta in zip(results["ids"], results["metadatas"]):
+                records[mid], names = self._decode(mid, meta)
+                legacy_indices.extend(_intern_column(columns, name) for name in names)
+                legacy_lengths.append(len(names))
+
+        self._keywords = KeywordMatrix(
+            list(records),
+            columns,
+            np.concatenate([indptr, indptr[-1] + np.cumsum(legacy_lengths, dtype=np.int64)]),
+            np.concatenate([indices, np.array(legacy_indices, dtype=np.int32)]),
+        )
+        self._records = records
+        self._missing = set()
+        self._count = count
+        for callback in self._rebuild_callbacks:
+            callback()
+        duration = time.time() - start_time
+        logger.info(
+            "action catalog_rebuild | duration %.4fs | movies %d | from_chroma %d | keywords %d | nnz %d",
+            duration, len(records), len(legacy), len(columns), self._keywords.nnz,
+        )
+
+    def _load_ids(self, str_ids: List[str]) -> None:
+        results = self._collection_getter().get(ids=str_ids, include=["metadatas"])
+        with self._lock:
+            records = dict(self._records)
+            loaded = []
+            for mid, meta in zip(results["ids"], results["metadatas"]):
+                records[mid], names = self._decode(mid, meta)
+                loaded.append((mid, names))
+            if loaded and self._keywords is not None:
+                self._keywords = self._keywords.extend([mid for mid, _ in loaded], [names for _, names in loaded])
+            self._records = records
+            self._missing = self._missing | (set(str_ids) - set(results["ids"]))
+
+    def _decode(self, mid: str, meta: Optional[Dict]) -> Tuple[MovieRecord, List[str]]:
+        """A record and keyword names from Chroma metadata."""
+        meta = meta or {}
+        if "payload" not in meta:
+            # Slim metadata without a store row: no backdrop or keywords to show
+            year = meta.get("year")
+            record = MovieRecord(
+                id=mid,
+                title=meta.get("title") or "Unknown",
+                genres=tuple(sys.intern(key[3:]) for key in meta if key.startswith("is_") and meta[key]),
+                backdrop_path=None,
+                year=int(year) if year is not None else None,
+                language=sys.intern(meta.get("language") or "unknown"),
+            )
+            return record, []
+        try:
+            payload = json.loads(meta.get("payload", "{}"))
+        except json.JSONDecodeError:
+            logger.warning("Failed to decode payload for id %s", mid)
+            payload = {}
+
+        genres = []
+        for g in payload.get("genres", []):
+            if isinstance(g, dict) and "name" in g:
+                genres.append(sys.intern(g["name"]))
+            elif isinstance(g, str):
+                genres.append(sys.intern(g))
+
+        keywords = []
+        for kw in payload.get("keywords", []):
+            if isinstance(kw, dict) and "name" in kw:
+                keywords.append(kw["name"])
+            elif isinstance(kw, str):
+                keywords.append(kw)
+
+        year = meta.get("year")
+        record = MovieRecord(
+            id=mid,
+            title=payload.get("title", "Unknown"),
+            genres=tuple(genres),
+            backdrop_path=payload.get("backdrop_path"),
+            year=int(year) if year is not None else None,
+            language=sys.intern(meta.get("language") or payload.get("original_language") or "unknown"),
+            popularity=float(payload.get("popularity") or 0.0),
+            vote_average=float(payload.get("vote_average") or 0.0),
+            vote_count=int(payload.get("vote_count") or 0),
+        )
+        return record, keywords
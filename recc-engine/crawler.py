@@ -0,0 +1,222 @@
+"""
+Resumable TMDB crawler behind fetch_diverse_movies.py.
+
+Every discover query is paged concurrently (page 1 first, to learn
+total_pages, then the rest at once). Each new movie id goes onto a queue
+drained by a pool of workers that fetch details and keywords together with
+append_to_response, so a movie costs one request instead of two. All
+requests share the client's TokenBucket and connection pool.
+
+Progress is written to two append-only JSONL files in the output directory:
+    pages.jsonl     one discover page per line: {"query", "page", "total_pages", "ids"}
+    movies.jsonl    one enriched movie per line, shaped like data/movies.json entries
+A restarted crawl reads both back, reuses the pages and skips the movies it
+already has. movies.jsonl can be passed straight to ingest.py --input.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Set
+from urllib.parse import urlencode
+
+from event_log import read_events, trim_torn_tail
+from tmdb_api import AsyncTMDBClient
+
+logger = logging.getLogger("recc-engine.crawler")
+
+PAGES_FILE = "pages.jsonl"
+MOVIES_FILE = "movies.jsonl"
+WORKERS = int(os.getenv("TMDB_CRAWL_WORKERS", 16))
+
+
+def query_key(params: Dict[str, Any]) -> str:
+    return urlencode(sorted(params.items()))
+
+
+class JsonlWriter:
+    """Appends one JSON record per line, flushed as it goes and fsynced on close."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        # A crash mid-write leaves a partial last line; drop it before appending
+        trim_torn_tail(path)
+        self._file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: Dict[str, Any]) -> None:
+        self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+        self._file.flush()
+
+    def close(self) -> None:
+        if not self._file.closed:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._file.close()
+
+
+class Crawler:
+    def __init__(
+        self,
+        client: AsyncTMDBClient,
+        output_dir: str,
+        workers: int = WORKERS,
+        known_ids: Iterable[int] = (),
+    ) -> None:
+        self.client = client
+        self.output_dir = output_dir
+        self.workers = workers
+        # Movies that are already in the dataset and need no fetching
+        self._known: Set[int] = set(known_ids)
+        self._seen: Set[int] = set()
+        self._pages: Dict[str, Dict[str, Any]] = {}
+        self._page_writer: Optional[JsonlWriter] = None
+        self._movie_writer: Optional[JsonlWriter] = None
+        self.pages_fetched = 0
+        self.pages_cached = 0
+        self.movies_fetched = 0
+        self.movies_cached = 0
+        self.failed = 0
+
+    @property
+    def pages_path(self) -> str:
+        return os.path.join(self.output_dir, PAGES_FILE)
+
+    @property
+    def movies_path(self) -> str:
+        return os.path.join(self.output_dir, MOVIES_FILE)
+
+    def _load(self) -> None:
+        if os.path.exists(self.pages_path):
+            for record in read_events(self.pages_path):
+                self._pages[f"{record['query']}#{record['page']}"] = record
+        for movie in self.iter_movies():
+            self._seen.add(movie["id"])
+            self.movies_cached += 1
+        if self._pages or self.movies_cached:
+            logger.info(
+                "Resuming crawl in %s: %d pages, %d movies already fetched",
+                self.output_dir, len(self._pages), self.movies_cached,
+            )
+
+    def iter_movies(self) -> Iterator[Dict[str, Any]]:
+        """Yields every movie crawled so far, in the order it was fetched."""
+        if os.path.exists(self.movies_path):
+            yield from read_events(self.movies_path)
+
+    async def _enqueue(self, movie_id: int, queue: asyncio.Queue) -> None:
+        if movie_id not in self._known and movie_id not in self._seen:
+            self._seen.add(movie_id)
+            await queue.put(movie_id)
+
+    async def _page(self, params: Dict[str, Any], page: int, queue: asyncio.Queue) -> Optional[Dict[str, Any]]:
+        key = query_key(params)
+        record = self._pages.get(f"{key}#{page}")
+        if record is not None:
+            self.pages_cached += 1
+        else:
+            try:
+                response = await self.client.discover_movies({**params, "page": page})
+            except Exception as e:
+                logger.warning(f"Discover {key} page {page} failed: {e}")
+                self.failed += 1
+                return None
+            record = {
+                "query": key,
+                "page": page,
+                "total_pages": response.get("total_pages", page),
+                "ids": [m["id"] for m in response.get("results", []) if m.get("id")],
+            }
+            self._page_writer.write(record)
+            self._pages[f"{key}#{page}"] = record
+            self.pages_fetched += 1
+
+        for movie_id in record["ids"]:
+            await self._enqueue(movie_id, queue)
+        return record
+
+    async def _discover(self, params: Dict[str, Any], max_pages: int, queue: asyncio.Queue) -> None:
+        first = await self._page(params, 1, queue)
+        if first is None:
+            return
+        last = min(max_pages, first["total_pages"])
+        await asyncio.gather(*(self._page(params, page, queue) for page in range(2, last + 1)))
+
+    async def _enrich(self, queue: asyncio.Queue) -> None:
+        while True:
+            movie_id = await queue.get()
+            if movie_id is None:
+                return
+            try:
+                movie = await self.client.movie_with_keywords(movie_id)
+            except Exception as e:
+                logger.warning(f"Failed to enrich movie {movie_id}: {e}")
+                self.failed += 1
+                continue
+            self._movie_writer.write(movie)
+            self.movies_fetched += 1
+            if self.movies_fetched % 100 == 0:
+                logger.info("Enriched %d movies (%d queued)", self.movies_fetched, queue.qsize())
+
+    async def crawl(self, queries: List[Dict[str, Any]], max_pages: int = 10) -> Dict[str, Any]:
+        """Discovers and enriches every movie the queries turn up. Closes the client when done."""
+
+        async def discover(queue):
+            await asyncio.gather(*(self._discover(params, max_pages, queue) for params in queries))
+
+        return await self._run(discover)
+
+    async def fetch(self, movie_ids: Iterable[int]) -> Dict[str, Any]:
+        """Enriches the given movies (e.g. a delta refresh). Closes the client when done."""
+
+        async def enqueue(queue):
+            for movie_id in movie_ids:
+                await self._enqueue(movie_id, queue)
+
+        return await self._run(enqueue)
+
+    async def _run(self, produce: Callable[[asyncio.Queue], Awaitable[None]]) -> Dict[str, Any]:
+        start_time = time.time()
+        os.makedirs(self.output_dir, exist_ok=True)
+        self._load()
+        self._page_writer = JsonlWriter(self.pages_path)
+        self._movie_writer = JsonlWriter(self.movies_path)
+
+        # Bounded, so discovery can't run arbitrarily far ahead of enrichment
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 4)
+        workers = [asyncio.create_task(self._enrich(queue)) for _ in range(self.workers)]
+
+        async def producer():
+            await produce(queue)
+            for _ in workers:
+                await queue.put(None)
+
+        producing = asyncio.create_task(producer())
+        try:
+            await asyncio.gather(producing, *workers)
+        finally:
+            for task in [producing, *workers]:
+                task.cancel()
+            self._page_writer.close()
+            self._movie_writer.close()
+            await self.client.aclose()
+
+        duration = time.time() - start_time
+        logger.info(
+            "action crawl | duration %.4fs | pages %d (+%d cached) | movies %d (+%d cached) | failed %d | requests %d",
+            duration, self.pages_fetched, self.pages_cached, self.movies_fetched,
+            self.movies_cached, self.failed, self.client.requests,
+        )
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pages_fetched": self.pages_fetched,
+            "pages_cached": self.pages_cached,
+            "movies_fetched": self.movies_fetched,
+            "movies_cached": self.movies_cached,
+            "failed": self.failed,
+            "requests": self.client.requests,
+            "retries": self.client.retries,
+        }
@@ -14,7 +14,7 @@ results = collection.query(
 
 for idx, movie_id in enumerate(results["ids"][0]):
         metadata = results["metadatas"][0][idx]
-        payload = json.loads(metadata.get("payload", "{}"))
-        title = payload.get("title", "Unknown")
+        # Slim metadata carries the title; older rows only have the payload
+        title = metadata.get("title") or json.loads(metadata.get("payload", "{}")).get("title", "Unknown")
         score = results["distances"][0][idx]
         print(f"{idx + 1}. {title} (id={movie_id}, distance={score:.4f})")
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+Content-addressed cache of sentence embeddings.
+
+Keys are sha256(model name + text), so the same text always maps to the same
+vector for a given model and a model change can never serve stale vectors.
+Vectors are kept as float32 in an in-process LRU, backed by a SQLite file that
+survives restarts.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from cache import LRUCache
+
+logger = logging.getLogger("recc-engine.embedding_cache")
+
+EMBEDDING_CACHE_PATH = "cache/embeddings.sqlite3"
+EMBEDDING_CACHE_SIZE = int(os.getenv("RECC_EMBEDDING_CACHE_SIZE", 10000))
+
+
+def text_key(model_name: str, text: str) -> str:
+    return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, path: Optional[str] = EMBEDDING_CACHE_PATH, maxsize: int = EMBEDDING_CACHE_SIZE) -> None:
+        self.model_name = model_name
+        self.path = path
+        self._memory = LRUCache(maxsize=maxsize)
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def key(self, text: str) -> str:
+        return text_key(self.model_name, text)
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings ("
+                " key TEXT PRIMARY KEY, dim INTEGER NOT NULL, vector BLOB NOT NULL, created_at REAL NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get_memory(self, text: str) -> Optional[np.ndarray]:
+        """In-process lookup only; cheap enough to call from the event loop."""
+        vector = self._memory.get(self.key(text))
+        if vector is not None:
+            with self._lock:
+                self.memory_hits += 1
+        return vector
+
+    def get_many(self, texts: Iterable[str]) -> Dict[str, np.ndarray]:
+        """Returns {text: vector} for every text found in memory or on disk."""
+        found = {}
+        missing = {}
+        for text in texts:
+            key = self.key(text)
+            vector = self._memory.get(key)
+            if vector is not None:
+                found[text] = vector
+            else:
+                missing[key] = text
+        memory_hits = len(found)
+
+        if missing and self.path:
+            keys = list(missing)
+            placeholders = ",".join("?" * len(keys))
+            with self._lock:
+                rows = self._connect().execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", keys
+                ).fetchall()
+            for key, blob in rows:
+                vector = np.frombuffer(blob, dtype=np.float32)
+                self._memory.set(key, vector)
+                found[missing.pop(key)] = vector
+
+        with self._lock:
+            self.memory_hits += memory_hits
+            self.disk_hits += len(found) - memory_hits
+            self.misses += len(missing)
+        return found
+
+    def put_many(self, texts: List[str], vectors) -> None:
+        now = time.time()
+        rows = []
+        for text, vector in zip(texts, vectors):
+            vector = np.asarray(vector, dtype=np.float32)
+            key = self.key(text)
+            self._memory.set(key, vector)
+            rows.append((key, vector.shape[0], vector.tobytes(), now))
+        if rows and self.path:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.executemany(
+                        "INSERT OR REPLACE INTO embeddings (key, dim, vector, created_at) VALUES (?, ?, ?, ?)",
+                        rows,
+                    )
+
+    def stats(self):
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            disk_entries = None
+            if self.path:
+                (disk_entries,) = self._connect().execute("SELECT COUNT(*) FROM embeddings").fetchone()
+            return {
+                "model": self.model_name,
+                "lookups": lookups,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_ratio": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory": self._memory.stats(),
+                "disk_entries": disk_entries,
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -0,0 +1,200 @@
+"""
+Micro-batching front end for the sentence embedding model.
+
+Callers submit texts and get a future back. A worker thread waits a few
+milliseconds for more requests (or until max_batch texts are queued), runs a
+single model.encode over all of them and resolves each caller's future with
+its own rows. Concurrent re-embeds from /ratings then share one forward pass
+instead of queueing for the model one string at a time.
+
+With an EmbeddingCache attached, a single text already in memory resolves
+without queueing, and the worker looks the rest up on disk before encoding
+only the texts it has never seen.
+
+Queue depth (sampled when a batch starts) and batch sizes are kept as
+power-of-two histograms for /admin/executors.
+"""
+
+import asyncio
+import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional
+
+from embedding_cache import EmbeddingCache
+
+logger = logging.getLogger("recc-engine.encoder")
+
+MAX_BATCH = int(os.getenv("RECC_ENCODE_MAX_BATCH", 32))
+MAX_WAIT = float(os.getenv("RECC_ENCODE_MAX_WAIT_MS", 5)) / 1000.0
+
+_STOP = object()
+
+
+def _bucket(n: int) -> str:
+    """Histogram bucket label: the smallest power of two >= n."""
+    size = 1
+    while size < n:
+        size *= 2
+    return str(size)
+
+
+class BatchEncoder:
+    def __init__(
+        self,
+        model_getter: Callable[[], Any],
+        max_batch: int = MAX_BATCH,
+        max_wait: float = MAX_WAIT,
+        cache: Optional[EmbeddingCache] = None,
+    ) -> None:
+        self._model_getter = model_getter
+        self._cache = cache
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: "queue.Queue" = queue.Queue()
+        self._lock = threading.Lock()
+        self._worker = None
+        self.requests = 0
+        self.texts = 0
+        self.batches = 0
+        self.completed = 0
+        self.encoded = 0
+        self.failures = 0
+        self.peak_queue_depth = 0
+        self.total_wait = 0.0
+        self.total_encode = 0.0
+        self.batch_sizes: Dict[str, int] = {}
+        self.queue_depths: Dict[str, int] = {}
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None:
+            with self._lock:
+                if self._worker is None:
+                    self._worker = threading.Thread(target=self._run, name="batch-encoder", daemon=True)
+                    self._worker.start()
+
+    def submit(self, texts: List[str]) -> Future:
+        """Queues texts for encoding. The future resolves to one vector (list) per text."""
+        future: Future = Future()
+        if not texts:
+            future.set_result([])
+            return future
+        if self._cache is not None and len(texts) == 1:
+            vector = self._cache.get_memory(texts[0])
+            if vector is not None:
+                future.set_result([vector.tolist()])
+                return future
+        self._ensure_worker()
+        with self._lock:
+            self.requests += 1
+            self.texts += len(texts)
+        self._queue.put((list(texts), future, time.time()))
+        return future
+
+    def encode(self, texts: List[str]) -> List[List[float]]:
+        return self.submit(texts).result()
+
+    async def aencode(self, texts: List[str]) -> List[List[float]]:
+        return await asyncio.wrap_future(self.submit(texts))
+
+    def _collect(self, first) -> List:
+        # Gather requests until max_batch texts or max_wait has passed.
+        # A single request larger than max_batch is encoded on its own.
+        pending = [first]
+        count = len(first[0])
+        deadline = time.time() + self.max_wait
+        while count < self.max_batch:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            if item is _STOP:
+                self._queue.put(_STOP)
+                break
+            pending.append(item)
+            count += len(item[0])
+        return pending
+
+    def _encode(self, texts: List[str]) -> List[List[float]]:
+        if self._cache is None:
+            return self._model_getter().encode(texts).tolist()
+        found = self._cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t in texts if t not in found))
+        if missing:
+            encoded = self._model_getter().encode(missing)
+            self._cache.put_many(missing, encoded)
+            found.update(zip(missing, encoded))
+        return [found[t].tolist() for t in texts]
+
+    def _run(self) -> None:
+        while True:
+            first = self._queue.get()
+            if first is _STOP:
+                return
+            depth = self._queue.qsize() + 1
+            pending = self._collect(first)
+            texts = [text for item in pending for text in item[0]]
+
+            start_time = time.time()
+            try:
+                vectors = self._encode(texts)
+            except Exception as e:
+                logger.error(f"Batch encode of {len(texts)} texts failed: {e}")
+                for _, future, _ in pending:
+                    future.set_exception(e)
+                with self._lock:
+                    self.failures += len(pending)
+                continue
+            duration = time.time() - start_time
+
+            offset = 0
+            for item_texts, future, _ in pending:
+                future.set_result(vectors[offset:offset + len(item_texts)])
+                offset += len(item_texts)
+
+            with self._lock:
+                self.batches += 1
+                self.completed += len(pending)
+                self.encoded += len(texts)
+                self.total_encode += duration
+                self.total_wait += sum(start_time - submitted for _, _, submitted in pending)
+                self.peak_queue_depth = max(self.peak_queue_depth, depth)
+                size_bucket = _bucket(len(texts))
+                self.batch_sizes[size_bucket] = self.batch_sizes.get(size_bucket, 0) + 1
+                depth_bucket = _bucket(depth)
+                self.queue_depths[depth_bucket] = self.queue_depths.get(depth_bucket, 0) + 1
+            logger.info(
+                "action batch_encode | duration %.4fs | requests %d | texts %d",
+                duration, len(pending), len(texts),
+            )
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_batch": self.max_batch,
+                "max_wait": self.max_wait,
+                "queue_depth": self._queue.qsize(),
+                "peak_queue_depth": self.peak_queue_depth,
+                "requests": self.requests,
+                "texts": self.texts,
+                "batches": self.batches,
+                "failures": self.failures,
+                "avg_batch_size": self.encoded / self.batches if self.batches else 0.0,
+                "avg_wait": self.total_wait / self.completed if self.completed else 0.0,
+                "avg_encode": self.total_encode / self.batches if self.batches else 0.0,
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items(), key=lambda kv: int(kv[0]))),
+                "queue_depth_histogram": dict(sorted(self.queue_depths.items(), key=lambda kv: int(kv[0]))),
+            }
+
+    def close(self) -> None:
+        with self._lock:
+            worker, self._worker = self._worker, None
+        if worker is not None:
+            self._queue.put(_STOP)
+            worker.join(timeout=5.0)
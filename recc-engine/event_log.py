@@ -0,0 +1,160 @@
+"""
+Append-only JSONL event log with batched fsync.
+
+Records are buffered as they are appended; a flusher thread writes and fsyncs
+them in groups, so concurrent writers share one fsync instead of paying for
+one each. append() returns the record's sequence number and wait(seq) blocks
+until it is durable.
+
+rotate() closes the live file as a numbered segment and starts a new one;
+segments are what the compactor folds into snapshots and what offline jobs
+(e.g. retraining) can read back with read_events.
+"""
+
+import glob
+import json
+import logging
+import os
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+logger = logging.getLogger("recc-engine.event_log")
+
+LOG_NAME = "events.jsonl"
+SEGMENTS_DIR = "segments"
+FSYNC_INTERVAL = float(os.getenv("RECC_EVENTLOG_FSYNC_MS", 5)) / 1000.0
+
+
+def read_events(path: str) -> Iterator[Dict[str, Any]]:
+    """Yields the records of one log file in order, skipping a torn last line."""
+    with open(path, "r") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning("Skipping corrupt record in %s", path)
+
+
+def trim_torn_tail(path: str) -> None:
+    # A crash mid-write leaves a partial last line; drop it so the next
+    # record doesn't get glued onto it
+    if not os.path.exists(path):
+        return
+    with open(path, "rb+") as f:
+        data = f.read()
+        if data and not data.endswith(b"\n"):
+            f.truncate(data.rfind(b"\n") + 1)
+
+
+class EventLog:
+    def __init__(self, path: str, fsync_interval: float = FSYNC_INTERVAL) -> None:
+        self.path = path
+        self.fsync_interval = fsync_interval
+        os.makedirs(os.path.join(path, SEGMENTS_DIR), exist_ok=True)
+        self._log_path = os.path.join(path, LOG_NAME)
+        trim_torn_tail(self._log_path)
+
+        self._seq = 0
+        for segment in self.segments() + [self._log_path]:
+            if os.path.exists(segment):
+                for record in read_events(segment):
+                    self._seq = max(self._seq, record.get("seq", 0))
+
+        self._file = open(self._log_path, "a")
+        self._lock = threading.Lock()
+        self._synced = threading.Condition(self._lock)
+        self._written_seq = self._seq
+        self._synced_seq = self._seq
+        self._closed = False
+        self._flusher = threading.Thread(target=self._flush_loop, name="eventlog-fsync", daemon=True)
+        self._flusher.start()
+
+    @property
+    def log_path(self) -> str:
+        return self._log_path
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    def size(self) -> int:
+        try:
+            return os.path.getsize(self._log_path)
+        except OSError:
+            return 0
+
+    def segments(self) -> List[str]:
+        """Rolled segment files, oldest first."""
+        return sorted(glob.glob(os.path.join(self.path, SEGMENTS_DIR, "events-*.jsonl")))
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """
+        Buffers one record and returns its sequence number. The caller must
+        hold whatever lock orders its records; durability comes from wait().
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Event log is closed")
+            self._seq += 1
+            record["seq"] = self._seq
+            self._file.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._written_seq = self._seq
+            self._synced.notify_all()
+            return self._seq
+
+    def wait(self, seq: int) -> None:
+        """Blocks until the record with this sequence number has been fsynced."""
+        with self._lock:
+            while self._synced_seq < seq and not self._closed:
+                self._synced.wait()
+
+    def _sync_locked(self) -> None:
+        if self._synced_seq < self._written_seq:
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self._synced_seq = self._written_seq
+            self._synced.notify_all()
+
+    def _flush_loop(self) -> None:
+        while True:
+            with self._lock:
+                while self._synced_seq >= self._written_seq and not self._closed:
+                    self._synced.wait()
+                if self._closed:
+                    return
+            # Let more writers join this batch before paying for the fsync
+            time.sleep(self.fsync_interval)
+            with self._lock:
+                if self._closed:
+                    return
+                batch = self._written_seq - self._synced_seq
+                self._sync_locked()
+            logger.debug("action eventlog_fsync | records %d", batch)
+
+    def rotate(self) -> Optional[str]:
+        """
+        Moves the live log to segments/ and starts a new one. Returns the
+        segment path, or None if the live log was empty.
+        """
+        with self._lock:
+            self._sync_locked()
+            if self._file.tell() == 0:
+                return None
+            self._file.close()
+            segment = os.path.join(self.path, SEGMENTS_DIR, f"events-{self._seq:012d}.jsonl")
+            os.replace(self._log_path, segment)
+            self._file = open(self._log_path, "a")
+            return segment
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._sync_locked()
+            self._closed = True
+            self._synced.notify_all()
+            self._file.close()
+        self._flusher.join(timeout=1.0)
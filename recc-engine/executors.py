@@ -0,0 +1,122 @@
+"""
+Dedicated thread pools for blocking work done by async route handlers.
+
+Each kind of work gets its own bounded pool so one can't starve another:
+    search     Chroma / NumPy queries and collection writes
+    io         profile store and other local disk access
+Embedding runs on the micro-batcher's own thread (encoder.BatchEncoder).
+Network calls to TMDB and Apple stay on the event loop (httpx) or go to io.
+
+Every pool counts active and queued tasks and how long tasks waited for a
+worker, which /admin/executors reports.
+"""
+
+import asyncio
+import functools
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger("recc-engine.executors")
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int) -> None:
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = None
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        self.active = 0
+        self.peak_queued = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    @property
+    def queued(self) -> int:
+        return self.submitted - self.completed - self.failed - self.active
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        # Created on first use (and again after shutdown, e.g. an app restart in tests)
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix=f"{self.name}-pool"
+                    )
+        return self._pool
+
+    def _call(self, submitted_at: float, fn: Callable, *args, **kwargs) -> Any:
+        started_at = time.time()
+        wait = started_at - submitted_at
+        with self._lock:
+            self.active += 1
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        ok = False
+        try:
+            result = fn(*args, **kwargs)
+            ok = True
+            return result
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.total_run += time.time() - started_at
+                if ok:
+                    self.completed += 1
+                else:
+                    self.failed += 1
+
+    async def run(self, fn: Callable, *args, **kwargs) -> Any:
+        """Runs fn(*args, **kwargs) on this pool and awaits the result."""
+        with self._lock:
+            self.submitted += 1
+            self.peak_queued = max(self.peak_queued, self.queued)
+        loop = asyncio.get_running_loop()
+        call = functools.partial(self._call, time.time(), fn, *args, **kwargs)
+        return await loop.run_in_executor(self._get_pool(), call)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            finished = self.completed + self.failed
+            return {
+                "max_workers": self.max_workers,
+                "active": self.active,
+                "queued": self.queued,
+                "peak_queued": self.peak_queued,
+                "utilization": self.active / self.max_workers,
+                "submitted": self.submitted,
+                "completed": self.completed,
+                "failed": self.failed,
+                "avg_wait": self.total_wait / finished if finished else 0.0,
+                "max_wait": self.max_wait,
+                "avg_run": self.total_run / finished if finished else 0.0,
+            }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+search_pool = BoundedExecutor("search", int(os.getenv("RECC_SEARCH_WORKERS", 8)))
+io_pool = BoundedExecutor("io", int(os.getenv("RECC_IO_WORKERS", 8)))
+
+POOLS = {pool.name: pool for pool in (search_pool, io_pool)}
+
+
+def stats() -> Dict[str, Dict[str, Any]]:
+    return {name: pool.stats() for name, pool in POOLS.items()}
+
+
+def shutdown() -> None:
+    for pool in POOLS.values():
+        pool.shutdown()
+    logger.info("Executor pools shut down")
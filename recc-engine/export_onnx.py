@@ -0,0 +1,147 @@
+"""
+Exports all-MiniLM-L6-v2 to ONNX for the onnx encoder backend.
+
+Writes into --output:
+    tokenizer.json      fast tokenizer used by onnx_encoder
+    model.onnx          fp32 transformer graph
+    model_int8.onnx     dynamically int8-quantized copy (unless --no-quantize)
+
+Then encodes sample texts with both the PyTorch model and each ONNX graph and
+fails if any text's cosine similarity falls below --threshold.
+
+Usage:
+    python export_onnx.py [--output models/all-MiniLM-L6-v2-onnx] [--threshold 0.99] [--sample-db 200]
+    RECC_ENCODER_BACKEND=onnx uvicorn app:app ...
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("export_onnx")
+
+MODEL_NAME = "all-MiniLM-L6-v2"
+
+SAMPLE_TEXTS = [
+    "Genres: Action, Drama",
+    "Genres: Comedy, Romance",
+    "Genres: Science Fiction, Fantasy, Adventure",
+    "The Thrill Seeker. High stakes, explosions, and edge-of-your-seat action.",
+    "The Dreamer. Sci-fi worlds, fantasy epics, and magical realism.",
+    "The Detective. Mind-bending mysteries, true crime, and thrillers.",
+    "Genres: Crime, Thriller | Keywords: heist, double cross | Overview: A crew plans one last job.",
+    "Genres: Animation, Family | Overview: A young fox sets out to find her way home before winter.",
+    "Genres: Horror | Keywords: haunted house | Overview: A family moves into a house with a past.",
+    "",
+]
+
+
+def sample_texts(from_db: int):
+    texts = list(SAMPLE_TEXTS)
+    if from_db:
+        import chromadb
+
+        collection = chromadb.PersistentClient(path="chroma").get_or_create_collection(name="movies")
+        texts += [doc for doc in collection.get(limit=from_db, include=["documents"])["documents"] if doc]
+    return texts
+
+
+def export(output_dir, opset):
+    import torch
+    from sentence_transformers import SentenceTransformer
+
+    start_time = time.time()
+    os.makedirs(output_dir, exist_ok=True)
+    model = SentenceTransformer(MODEL_NAME, device="cpu")
+    transformer = model[0].auto_model
+    transformer.config.return_dict = False
+    transformer.eval()
+    model.tokenizer.save_pretrained(output_dir)
+
+    dummy = model.tokenizer(["export sample"], return_tensors="pt")
+    input_names = ["input_ids", "attention_mask", "token_type_ids"]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    fp32_path = os.path.join(output_dir, "model.onnx")
+    with torch.no_grad():
+        torch.onnx.export(
+            transformer,
+            tuple(dummy[name] for name in input_names),
+            fp32_path,
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+        )
+    duration = time.time() - start_time
+    logger.info("action export | duration %.4fs | path %s", duration, fp32_path)
+    return model, fp32_path
+
+
+def quantize(fp32_path, int8_path):
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    start_time = time.time()
+    quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QInt8)
+    duration = time.time() - start_time
+    logger.info(
+        "action quantize | duration %.4fs | size %.1fMB -> %.1fMB",
+        duration, os.path.getsize(fp32_path) / 1e6, os.path.getsize(int8_path) / 1e6,
+    )
+
+
+def validate(reference, output_dir, model_file, texts, threshold):
+    """Returns True if every text's ONNX vector agrees with PyTorch's to within threshold."""
+    from onnx_encoder import OnnxSentenceEncoder
+
+    encoder = OnnxSentenceEncoder(output_dir, model_file)
+
+    start_time = time.time()
+    expected = reference.encode(texts, normalize_embeddings=True)
+    torch_duration = time.time() - start_time
+    start_time = time.time()
+    actual = encoder.encode(texts)
+    onnx_duration = time.time() - start_time
+
+    cosines = np.sum(expected * actual, axis=1)
+    worst = int(np.argmin(cosines))
+    logger.info(
+        "action validate | model %s | texts %d | min cosine %.5f | mean cosine %.5f | torch %.4fs | onnx %.4fs",
+        model_file, len(texts), cosines.min(), cosines.mean(), torch_duration, onnx_duration,
+    )
+    if cosines.min() < threshold:
+        logger.error(f"{model_file}: cosine {cosines[worst]:.5f} < {threshold} for {texts[worst]!r}")
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--output", default=os.getenv("RECC_ONNX_MODEL_PATH", "models/all-MiniLM-L6-v2-onnx"))
+    parser.add_argument("--opset", type=int, default=17)
+    parser.add_argument("--no-quantize", action="store_true", help="Only export the fp32 graph")
+    parser.add_argument("--threshold", type=float, default=0.99, help="Minimum per-text cosine vs PyTorch")
+    parser.add_argument("--sample-db", type=int, default=0, help="Also validate on this many movie documents from Chroma")
+    args = parser.parse_args()
+
+    reference, fp32_path = export(args.output, args.opset)
+    model_files = ["model.onnx"]
+    if not args.no_quantize:
+        quantize(fp32_path, os.path.join(args.output, "model_int8.onnx"))
+        model_files.append("model_int8.onnx")
+
+    texts = sample_texts(args.sample_db)
+    ok = all([validate(reference, args.output, f, texts, args.threshold) for f in model_files])
+    if not ok:
+        sys.exit(1)
+    logger.info("ONNX models in %s agree with PyTorch", args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,161 +1,116 @@
-import json
+"""
+Grows data/movies.json with TMDB's most popular movies for each release year.
+
+Crawling is done by crawler.Crawler: discover pages and movie details are
+fetched concurrently under a shared rate limit, and progress is appended to
+JSONL files in --crawl-dir, so an interrupted run picks up where it stopped.
+At the end the new movies are merged into DATA_FILE and the progress files
+are removed.
+
+Usage:
+    python fetch_diverse_movies.py [--start-year 1995] [--end-year 2026] [--pages 10]
+                                   [--workers 16] [--rate 40] [--fresh]
+"""
+
+import argparse
+import asyncio
+import logging
 import os
-import time
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import shutil
+
 from dotenv import load_dotenv
-from tmdb_api import TMDBClient
+
+from crawler import Crawler
+from ingest import iter_movies, write_movies
+from tmdb_api import TMDB_RATE_BURST, TMDB_RATE_LIMIT, AsyncTMDBClient, TokenBucket
 
 load_dotenv()
+logging.basicConfig(level=logging.INFO)
 
 # Configuration
 DATA_FILE = "data/movies.json"
 SOURCE_FILE = "test_data.json" # Try to load this if DATA_FILE is empty
-client = TMDBClient(os.getenv("TMDB_BEARER"))
+CRAWL_DIR = "data/crawl"
+
 
-def load_existing_movies():
-    movies = []
+def existing_source():
     if os.path.exists(DATA_FILE):
-        print(f"Loading existing data from {DATA_FILE}...")
-        with open(DATA_FILE, "r") as f:
-            movies = json.load(f)
-    elif os.path.exists(SOURCE_FILE):
-        print(f"Loading seed data from {SOURCE_FILE}...")
-        with open(SOURCE_FILE, "r") as f:
-            movies = json.load(f)
-    return movies
-
-def enrich_movie(movie_basic):
-    """
-    Takes a basic movie object (id, title) and fetches full details + keywords.
-    """
-    movie_id = movie_basic.get("id")
-    if movie_id is None:
-        return None, 0
-    
-    start = time.time()
-    try:
-        # Fetch Details
-        details = client.movie_details(movie_id)
-        
-        # Fetch Keywords
-        kw_resp = client.keywords(movie_id)
-        details["keywords"] = kw_resp.get("keywords", [])
-        
-        duration = time.time() - start
-        return details, duration
-    except Exception as e:
-        print(f"Failed to enrich movie {movie_id}: {e}")
-        return None, 0
+        return DATA_FILE
+    if os.path.exists(SOURCE_FILE):
+        return SOURCE_FILE
+    return None
 
-def main():
-    # 1. Load Existing Data
-    existing_movies = load_existing_movies()
-    existing_ids = {m["id"] for m in existing_movies}
-    print(f"Loaded {len(existing_movies)} existing movies.")
-
-    candidates_to_fetch = []
-
-    # 2. Strategy A: Time Machine (1980 - 2023)
-    # Fetch top 10 pages (~200 movies) for each year
-    print("\n--- Strategy: Time Machine ---")
-    current_year = 2027
-    for year in range(1995, current_year):
-        print(f"Scanning year {year}...", end="\r")
-        try:
-            for page in range(1, 11): # Pages 1 to 10
-                res = client.discover_movies({
-                    "primary_release_year": year,
-                    "sort_by": "popularity.desc",
-                    "page": page
-                })
-                candidates_to_fetch.extend(res.get("results", []))
-            
-        except Exception as e:
-            print(f"Error fetching year {year}: {e}")
-            time.sleep(1)
-
-    # 3. Strategy B: Genre Equalizer
-    # Fetch top ~60 movies for specific genres to ensure coverage
+
+def build_queries(start_year, end_year):
+    # Strategy A: Time Machine
+    # Top pages by popularity for each release year
+    queries = [
+        {"primary_release_year": year, "sort_by": "popularity.desc"}
+        for year in range(start_year, end_year + 1)
+    ]
+
+    # Strategy B: Genre Equalizer
     # 27: Horror, 878: Sci-Fi, 99: Documentary, 16: Animation, 10752: War, 37: Western
-    # print("\n\n--- Strategy: Genre Equalizer ---")
-    # target_genres = [27, 878, 99, 16, 10752, 37, 9648] 
-    # for genre_id in target_genres:
-    #     print(f"Scanning genre {genre_id}...", end="\r")
-    #     try:
-    #         for page in range(4, 10): # ~60 movies per genre
-    #             res = client.discover_movies({
-    #                 "with_genres": genre_id,
-    #                 "sort_by": "vote_count.desc", # Get classics
-    #                 "page": page
-    #             })
-    #             candidates_to_fetch.extend(res.get("results", []))
-    #     except Exception as e:
-    #         print(f"Error fetching genre {genre_id}: {e}")
-
-    # # 4. Strategy C: Hidden Gems
-    # # High rated (>7.5), decent vote count (>300), sorted by rating
-    # print("\n\n--- Strategy: Hidden Gems ---")
-    # try:
-    #     for page in range(6, 10): # ~100 movies
-    #         res = client.discover_movies({
-    #             "vote_average.gte": 7.5,
-    #             "vote_count.gte": 300,
-    #             "sort_by": "vote_average.desc",
-    #             "page": page
-    #         })
-    #         candidates_to_fetch.extend(res.get("results", []))
-    # except Exception as e:
-    #     print(f"Error fetching hidden gems: {e}")
-
-    # 5. Deduplicate Candidates (vs Existing and Self)
-    unique_candidates = []
-    seen_candidates = set()
-    
-    for c in candidates_to_fetch:
-        mid = c.get("id")
-        if mid and mid not in existing_ids and mid not in seen_candidates:
-            unique_candidates.append(c)
-            seen_candidates.add(mid)
-            
-    print(f"\n\nFound {len(candidates_to_fetch)} raw candidates.")
-    print(f"After deduplication: {len(unique_candidates)} NEW movies to process.")
-    
-    if not unique_candidates:
-        print("No new movies to fetch.")
-        return
-
-    # 6. Enrich New Candidates
-    print("\n--- Enriching Candidates (Details + Keywords) ---")
-    new_movies = []
-    completed = 0
-    total = len(unique_candidates)
-    
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Submit all
-        future_to_movie = {executor.submit(enrich_movie, m): m for m in unique_candidates}
-        
-        for future in as_completed(future_to_movie):
-            result, duration = future.result()
-            if result:
-                new_movies.append(result)
-            
-            completed += 1
-            if completed % 10 == 0:
-                print(f"Progress: {completed}/{total} ({len(new_movies)} successful)", end="\r")
-
-    print(f"\n\nSuccessfully enriched {len(new_movies)} movies.")
-
-    # 7. Merge and Save
-    final_dataset = existing_movies + new_movies
-    
-    # Ensure directory exists
-    os.makedirs(os.path.dirname(DATA_FILE), exist_ok=True)
-    
-    print(f"Saving {len(final_dataset)} total movies to {DATA_FILE}...")
-    with open(DATA_FILE, "w") as f:
-        json.dump(final_dataset, f, indent=2, ensure_ascii=True)
-    
+    # queries += [{"with_genres": g, "sort_by": "vote_count.desc"} for g in [27, 878, 99, 16, 10752, 37, 9648]]
+
+    # Strategy C: Hidden Gems
+    # High rated (>7.5), decent vote count (>300), sorted by rating
+    # queries.append({"vote_average.gte": 7.5, "vote_count.gte": 300, "sort_by": "vote_average.desc"})
+    return queries
+
+
+def save_dataset(source, crawler):
+    """Streams existing + newly crawled movies into DATA_FILE without loading either."""
+    seen = set()
+
+    def movies():
+        for batch in (iter_movies(source) if source else (), crawler.iter_movies()):
+            for movie in batch:
+                if movie.get("id") not in seen:
+                    seen.add(movie.get("id"))
+                    yield movie
+
+    return write_movies(DATA_FILE, movies())
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--start-year", type=int, default=1995)
+    parser.add_argument("--end-year", type=int, default=2026)
+    parser.add_argument("--pages", type=int, default=10, help="Discover pages per query (20 movies each)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TMDB_CRAWL_WORKERS", 16)))
+    parser.add_argument("--rate", type=float, default=TMDB_RATE_LIMIT, help="Requests per second")
+    parser.add_argument("--crawl-dir", default=CRAWL_DIR)
+    parser.add_argument("--fresh", action="store_true", help="Discard the previous crawl's progress")
+    args = parser.parse_args()
+
+    if args.fresh:
+        shutil.rmtree(args.crawl_dir, ignore_errors=True)
+
+    # 1. Movies we already have are never fetched again
+    source = existing_source()
+    existing_ids = {m.get("id") for m in iter_movies(source)} if source else set()
+    print(f"Loaded {len(existing_ids)} existing movies.")
+
+    # 2. Discover + enrich
+    client = AsyncTMDBClient(
+        os.getenv("TMDB_BEARER"),
+        max_concurrency=int(os.getenv("TMDB_MAX_CONCURRENCY", 20)),
+        rate_limiter=TokenBucket(args.rate, TMDB_RATE_BURST),
+    )
+    crawler = Crawler(client, args.crawl_dir, workers=args.workers, known_ids=existing_ids)
+    stats = asyncio.run(crawler.crawl(build_queries(args.start_year, args.end_year), args.pages))
+    print(f"Crawl finished: {stats}")
+
+    # 3. Merge and Save
+    total = save_dataset(source, crawler)
+    print(f"Saved {total} total movies to {DATA_FILE}")
+
+    # Progress only matters for resuming an interrupted crawl; the next run
+    # should discover afresh
+    shutil.rmtree(args.crawl_dir, ignore_errors=True)
     print("Done!")
 
+
 if __name__ == "__main__":
     main()
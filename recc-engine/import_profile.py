@@ -0,0 +1,107 @@
+"""
+Import-time profile of the API server.
+
+Runs `python -X importtime -c "import app"` in a fresh interpreter and sums
+the self time of every module by top-level package, so a dependency that
+starts loading eagerly again shows up as a jump in its package's line.
+
+Usage:
+    python import_profile.py [--module app] [--top 20]
+    python import_profile.py --json import_profile.json          # save a baseline
+    python import_profile.py --baseline import_profile.json      # exit 1 on regression
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+from typing import Dict, List
+
+
+def measure(module: str) -> List[Dict]:
+    """Returns one {"module", "self", "cumulative", "depth"} row per import, times in seconds."""
+    here = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=here, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time:       self [us] |  cumulative | imported package
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        rows.append({
+            "module": name.strip(),
+            "self": int(self_us) / 1e6,
+            "cumulative": int(cumulative_us) / 1e6,
+            "depth": (len(name) - len(name.lstrip())) // 2,
+        })
+    return rows
+
+
+def summarize(rows: List[Dict]) -> Dict:
+    packages = defaultdict(float)
+    for row in rows:
+        packages[row["module"].split(".")[0]] += row["self"]
+    return {
+        "total": round(sum(row["self"] for row in rows), 4),
+        "packages": {name: round(t, 4) for name, t in sorted(packages.items(), key=lambda kv: -kv[1])},
+    }
+
+
+def compare(summary: Dict, baseline: Dict, max_regression: float, min_delta: float) -> List[str]:
+    """Lists packages (and the total) that got slower than baseline by more than the allowed ratio."""
+    regressions = []
+    checks = [("total", summary["total"], baseline["total"])]
+    checks += [
+        (name, t, baseline["packages"].get(name, 0.0)) for name, t in summary["packages"].items()
+    ]
+    for name, current, before in checks:
+        if current - before > min_delta and current > before * (1 + max_regression):
+            regressions.append(f"{name}: {before:.4f}s -> {current:.4f}s")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--module", default="app", help="Module to import")
+    parser.add_argument("--top", type=int, default=20, help="Packages to print")
+    parser.add_argument("--json", help="Write the summary to this file")
+    parser.add_argument("--baseline", help="Compare against a summary written by --json")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed slowdown ratio per package")
+    parser.add_argument("--min-delta", type=float, default=0.02, help="Ignore slowdowns smaller than this many seconds")
+    args = parser.parse_args()
+
+    rows = measure(args.module)
+    summary = summarize(rows)
+    summary["module"] = args.module
+
+    print(f"import {args.module}: {summary['total']:.4f}s across {len(rows)} modules")
+    for name, t in list(summary["packages"].items())[:args.top]:
+        print(f"  {t:8.4f}s  {name}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summary, f, indent=2)
+        print(f"Wrote {args.json}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(summary, baseline, args.max_regression, args.min_delta)
+        if regressions:
+            print("Import-time regressions against baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("No import-time regressions against baseline")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,502 @@
+"""
+Streaming, resumable ingestion of the movie catalog into Chroma.
+
+Movies flow through four stages, one thread each, with bounded queues in
+between so only a few batches are in flight however large the input file
+is:
+
+    read      stream movies out of a JSON array or JSONL file, build each
+              one's document text and metadata, group them into batches
+    diff      look the batch up in Chroma and drop movies whose metadata
+              (which carries a hash of the document text) is unchanged;
+              movies whose text is unchanged but metadata differs are
+              updated in place without re-encoding
+    encode    embed the documents that did change
+    write     upsert into Chroma and checkpoint
+
+Chroma only gets slim filter fields (build_metadata); display fields and
+keyword ids go to the movie store (movie_store.py). Only rows that are new
+or differ from the store are held until the run completes and then merged
+into it, so an unchanged file (or a small delta refresh) doesn't rewrite
+the store. The store itself is loaded for the comparison; it is columnar,
+a few arrays rather than one object per movie.
+
+Batches pass through the stages in order, so the checkpoint is just the
+number of input rows written. A run that dies resumes after that row, and
+a full reindex of an unchanged file encodes nothing.
+
+Usage:
+    python ingest.py [--input data/movies.json] [--batch-size 256] [--force] [--no-resume]
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from movie_store import MovieStore, store_row
+import user
+
+logger = logging.getLogger("recc-engine.ingest")
+
+DATA_FILE = "data/movies.json"
+CHECKPOINT_PATH = "cache/ingest_checkpoint.json"
+BATCH_SIZE = int(os.getenv("RECC_INGEST_BATCH_SIZE", 256))
+QUEUE_SIZE = int(os.getenv("RECC_INGEST_QUEUE_SIZE", 4))
+READ_CHUNK = 1 << 16
+
+_DONE = object()
+_WHITESPACE = " \t\r\n"
+
+
+def build_text(item):
+    genre_names = [g.get("name") for g in item.get("genres", []) if g.get("name")]
+    keyword_names = [
+        k.get("name") for k in item.get("keywords", []) if k.get("name")
+    ]
+    overview = item.get("overview") or ""
+    parts = []
+    if genre_names:
+        parts.append("Genres: " + ", ".join(genre_names))
+    if keyword_names:
+        parts.append("Keywords: " + ", ".join(keyword_names))
+    if overview:
+        parts.append("Overview: " + overview)
+    return " | ".join(parts)
+
+
+def doc_hash(document: str) -> str:
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()[:16]
+
+
+def release_year(item) -> Optional[int]:
+    release_date = item.get("release_date")
+    if release_date:
+        try:
+            # Try YYYY-MM-DD
+            return datetime.strptime(release_date, "%Y-%m-%d").year
+        except ValueError:
+            # Fallback: Try just extracting first 4 digits
+            if len(release_date) >= 4 and release_date[:4].isdigit():
+                return int(release_date[:4])
+    return None
+
+
+def build_metadata(item, document, year: Optional[int] = None):
+    # Only typed scalars Chroma can filter on: 'language', 'year' and one
+    # is_{genre} flag per genre, the title for inspection, and the document
+    # hash that lets the next ingest tell whether this movie needs
+    # re-encoding. Display fields and keywords go to the movie store.
+    metadata = {
+        "title": item.get("title") or "Unknown",
+        "language": item.get("original_language") or "unknown",
+        "doc_hash": doc_hash(document),
+    }
+    if year is not None:
+        metadata["year"] = year
+    for g in item.get("genres", []):
+        name = g.get("name")
+        if name:
+            metadata[f"is_{name}"] = True
+    return metadata
+
+
+def same_store_row(stored: Optional[Dict[str, Any]], row: Dict[str, Any]) -> bool:
+    """Whether row (store_row() form) matches what the store holds, at its float32 precision."""
+    if stored is None:
+        return False
+    for key, value in row.items():
+        current = stored[key]
+        if key in ("popularity", "vote_average"):
+            if np.float32(value) != np.float32(current):
+                return False
+        elif value != current:
+            return False
+    return True
+
+
+def iter_movies(path: str, chunk_size: int = READ_CHUNK) -> Iterator[Dict[str, Any]]:
+    """
+    Yields movies one at a time from a JSON array (data/movies.json) or a
+    JSONL file, holding at most one chunk plus one movie in memory.
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buf = ""
+        pos = 0
+        in_array = None
+        eof = False
+        while True:
+            # Skip whitespace and, inside an array, the separators
+            while pos < len(buf) and (buf[pos] in _WHITESPACE or (in_array and buf[pos] == ",")):
+                pos += 1
+            if pos < len(buf) and in_array is None:
+                in_array = buf[pos] == "["
+                if in_array:
+                    pos += 1
+                continue
+            if pos < len(buf) and in_array and buf[pos] == "]":
+                return
+
+            item = None
+            if pos < len(buf):
+                try:
+                    item, end = decoder.raw_decode(buf, pos)
+                except json.JSONDecodeError:
+                    # Most likely the value runs past the end of the buffer
+                    if eof:
+                        raise
+            if item is not None:
+                pos = end
+                yield item
+                continue
+
+            if eof:
+                if in_array:
+                    raise ValueError(f"{path}: unterminated JSON array")
+                return
+            chunk = f.read(chunk_size)
+            eof = not chunk
+            buf = buf[pos:] + chunk
+            pos = 0
+
+
+def write_movies(path: str, movies: Iterable[Dict[str, Any]]) -> int:
+    """
+    Atomically writes movies as a JSON array with one movie per line, so
+    the file stays diffable and iter_movies can stream it back.
+    """
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    count = 0
+    with open(tmp_path, "w") as f:
+        f.write("[")
+        for movie in movies:
+            f.write(",\n" if count else "\n")
+            f.write(json.dumps(movie, ensure_ascii=True))
+            count += 1
+        f.write("\n]\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return count
+
+
+class Checkpoint:
+    """
+    Rows of one input file written so far. Tied to the file's size and
+    mtime, so a checkpoint never carries over to a different file.
+    """
+
+    def __init__(self, path: str, source: str) -> None:
+        self.path = path
+        stat = os.stat(source)
+        self.source = {"path": os.path.abspath(source), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load(self) -> int:
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+        if data.get("source") != self.source:
+            logger.info("Ignoring checkpoint for a different input: %s", data.get("source"))
+            return 0
+        return int(data.get("rows", 0))
+
+    def save(self, rows: int) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"source": self.source, "rows": rows, "updated_at": time.time()}, f)
+        os.replace(tmp_path, self.path)
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+class Batch:
+    def __init__(self, end_row: int) -> None:
+        # Input rows up to end_row are covered once this batch is written
+        self.end_row = end_row
+        self.ids: List[str] = []
+        self.documents: List[str] = []
+        self.metadatas: List[Dict[str, Any]] = []
+        self.embeddings = None
+        # Unchanged text, changed metadata: written with collection.update
+        self.meta_ids: List[str] = []
+        self.meta_metadatas: List[Dict[str, Any]] = []
+
+
+class Ingest:
+    def __init__(self, collection, batch_size: int = BATCH_SIZE, queue_size: int = QUEUE_SIZE,
+                 force: bool = False, store: Optional[MovieStore] = None) -> None:
+        self.collection = collection
+        self.store = store if store is not None else MovieStore()
+        # Store rows that are new or changed, resumed rows included, so a
+        # resumed run still leaves the store complete
+        self._store_rows: Dict[int, Dict[str, Any]] = {}
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.force = force
+        self._stop = threading.Event()
+        self._errors: List[BaseException] = []
+        self.rows = 0
+        self.resumed = 0
+        self.invalid = 0
+        self.unchanged = 0
+        self.updated = 0
+        self.encoded = 0
+        self.stage_time = {"read": 0.0, "diff": 0.0, "encode": 0.0, "write": 0.0}
+
+    # Queue helpers that give up once another stage has failed
+    def _put(self, q: queue.Queue, item) -> bool:
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q: queue.Queue):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, e: BaseException) -> None:
+        self._errors.append(e)
+        self._stop.set()
+
+    def _read(self, items: Iterable[Dict[str, Any]], skip_rows: int, outbox: queue.Queue) -> None:
+        try:
+            batch = None
+            row = 0
+            started = time.time()
+            if self.store.changed():
+                self.store.load()
+            for item in items:
+                row += 1
+                movie_id = item.get("id") if isinstance(item, dict) else None
+                year = release_year(item) if movie_id is not None else None
+                if movie_id is not None:
+                    new_row = store_row(item, year)
+                    if not same_store_row(self.store.get(new_row["id"]), new_row):
+                        self._store_rows[new_row["id"]] = new_row
+                    else:
+                        # A later duplicate may undo an earlier change
+                        self._store_rows.pop(new_row["id"], None)
+                if row <= skip_rows:
+                    continue
+                if batch is None:
+                    batch = {}
+                if movie_id is None:
+                    self.invalid += 1
+                else:
+                    # Later duplicates win, as they would with one upsert per row
+                    document = build_text(item)
+                    batch[str(movie_id)] = (document, build_metadata(item, document, year))
+                if len(batch) >= self.batch_size:
+                    self.stage_time["read"] += time.time() - started
+                    if not self._put(outbox, (row, batch)):
+                        return
+                    started = time.time()
+                    batch = None
+            self.rows = row
+            self.resumed = min(skip_rows, row)
+            self.stage_time["read"] += time.time() - started
+            if batch is not None:
+                self._put(outbox, (row, batch))
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(outbox, _DONE)
+
+    def _diff(self, inbox: queue.Queue, outbox: queue.Queue) -> None:
+        try:
+            while True:
+                item = self._get(inbox)
+                if item is _DONE:
+                    break
+                end_row, rows = item
+                started = time.time()
+                found = self.collection.get(ids=list(rows), include=["metadatas", "documents"])
+                existing = dict(zip(found["ids"], found["metadatas"]))
+                # Rows from before doc_hash (or the slim layout) are hashed here,
+                # so moving them over doesn't re-encode them
+                existing_hash = {
+                    movie_id: (meta or {}).get("doc_hash") or doc_hash(document or "")
+                    for movie_id, meta, document in zip(found["ids"], found["metadatas"], found["documents"])
+                }
+
+                batch = Batch(end_row)
+                for movie_id, (document, metadata) in rows.items():
+                    current = existing.get(movie_id)
+                    if current == metadata and not self.force:
+                        self.unchanged += 1
+                        continue
+                    if current:
+                        # Chroma merges metadata on write; None deletes keys the
+                        # movie no longer has (e.g. a genre TMDB dropped)
+                        metadata = {**{key: None for key in current if key not in metadata}, **metadata}
+                    if current and existing_hash[movie_id] == metadata["doc_hash"] and not self.force:
+                        batch.meta_ids.append(movie_id)
+                        batch.meta_metadatas.append(metadata)
+                    else:
+                        batch.ids.append(movie_id)
+                        batch.documents.append(document)
+                        batch.metadatas.append(metadata)
+                self.stage_time["diff"] += time.time() - started
+                if not self._put(outbox, batch):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(outbox, _DONE)
+
+    def _encode(self, inbox: queue.Queue, outbox: queue.Queue) -> None:
+        try:
+            while True:
+                batch = self._get(inbox)
+                if batch is _DONE:
+                    break
+                if batch.documents:
+                    started = time.time()
+                    batch.embeddings = user.encode_documents(batch.documents)
+                    self.stage_time["encode"] += time.time() - started
+                if not self._put(outbox, batch):
+                    return
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            self._put(outbox, _DONE)
+
+    def _write(self, batch: Batch, checkpoint: Optional[Checkpoint]) -> None:
+        started = time.time()
+        if batch.ids:
+            self.collection.upsert(
+                ids=batch.ids,
+                embeddings=batch.embeddings,
+                metadatas=batch.metadatas,
+                documents=batch.documents,
+            )
+            self.encoded += len(batch.ids)
+        if batch.meta_ids:
+            self.collection.update(ids=batch.meta_ids, metadatas=batch.meta_metadatas)
+            self.updated += len(batch.meta_ids)
+        if checkpoint is not None:
+            checkpoint.save(batch.end_row)
+        self.stage_time["write"] += time.time() - started
+        logger.info(
+            "Ingested through row %d | encoded %d | updated %d | unchanged %d",
+            batch.end_row, self.encoded, self.updated, self.unchanged,
+        )
+
+    def run(self, path: str, checkpoint: Optional[Checkpoint] = None) -> Dict[str, Any]:
+        skip_rows = checkpoint.load() if checkpoint is not None else 0
+        if skip_rows:
+            logger.info("Resuming %s after row %d", path, skip_rows)
+        return self.run_items(iter_movies(path), checkpoint, skip_rows)
+
+    def run_items(self, items: Iterable[Dict[str, Any]], checkpoint: Optional[Checkpoint] = None,
+                  skip_rows: int = 0) -> Dict[str, Any]:
+        """Ingests movies from any iterable (e.g. a delta refresh's refetched movies)."""
+        start_time = time.time()
+
+        parsed = queue.Queue(maxsize=self.queue_size)
+        diffed = queue.Queue(maxsize=self.queue_size)
+        encoded = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(target=self._read, args=(items, skip_rows, parsed), name="ingest-read"),
+            threading.Thread(target=self._diff, args=(parsed, diffed), name="ingest-diff"),
+            threading.Thread(target=self._encode, args=(diffed, encoded), name="ingest-encode"),
+        ]
+        for thread in threads:
+            thread.start()
+        try:
+            while True:
+                batch = self._get(encoded)
+                if batch is _DONE:
+                    break
+                self._write(batch, checkpoint)
+        except BaseException as e:
+            self._fail(e)
+        finally:
+            for thread in threads:
+                thread.join()
+
+        if self._errors:
+            raise self._errors[0]
+        if self._store_rows:
+            self.store.upsert(self._store_rows.values())
+        if checkpoint is not None:
+            checkpoint.clear()
+
+        duration = time.time() - start_time
+        logger.info(
+            "action ingest | duration %.4fs | rows %d | resumed %d | invalid %d | unchanged %d | updated %d | encoded %d",
+            duration, self.rows, self.resumed, self.invalid, self.unchanged, self.updated, self.encoded,
+        )
+        return self.stats()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "resumed": self.resumed,
+            "invalid": self.invalid,
+            "unchanged": self.unchanged,
+            "updated": self.updated,
+            "encoded": self.encoded,
+            "stage_time": {name: round(t, 4) for name, t in self.stage_time.items()},
+        }
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--input", default=DATA_FILE, help="JSON array or JSONL file of TMDB movies")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="Batches buffered between stages")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_PATH)
+    parser.add_argument("--no-resume", action="store_true", help="Start from the first row even if a checkpoint exists")
+    parser.add_argument("--force", action="store_true", help="Re-encode every movie, changed or not")
+    parser.add_argument("--store", default=None, help="Movie store path (default: RECC_MOVIE_STORE)")
+    args = parser.parse_args()
+
+    checkpoint = Checkpoint(args.checkpoint, args.input)
+    if args.no_resume:
+        checkpoint.clear()
+
+    store = MovieStore(args.store) if args.store else None
+    ingest = Ingest(user.get_collection("movies"), args.batch_size, args.queue_size, force=args.force, store=store)
+    try:
+        stats = ingest.run(args.input, checkpoint)
+        if (stats["encoded"] or stats["updated"]) and os.path.isdir(user.INDEX_PATH):
+            # Re-encoded or updated movies keep the catalog size, so rebuild
+            # the movie matrix rather than leave it serving old vectors and
+            # filter columns
+            matrix = user.get_movie_matrix()
+            matrix.invalidate()
+            matrix.ensure_fresh()
+    finally:
+        user.close_encoder()
+        user.close_chroma_client()
+    print(json.dumps(stats, indent=2))
+
+
+if __name__ == "__main__":
+    main()
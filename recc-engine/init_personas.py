@@ -15,8 +15,15 @@ personas = [
 
 def init_personas():
     logger.info("Initializing personas...")
-    
-    for p in personas:
+
+    # Text to encode
+    texts = [f"{p['title']}. {p['description']}" for p in personas]
+
+    # Encode all personas in one batch
+    logger.info(f"Encoding {len(texts)} personas...")
+    embeddings = user.encode_texts(texts)
+
+    for p, text, vector in zip(personas, texts, embeddings):
         title = p["title"]
         description = p["description"]
         
@@ -24,13 +31,7 @@ def init_personas():
         # actually let's just use the title to be easy to map from frontend if we send titles
         # But spaces in IDs might be annoying. Let's use underscores.
         persona_id = f"persona_{title.replace(' ', '_')}"
-        
-        # Text to encode
-        text = f"{title}. {description}"
-        
-        # Encode
-        logger.info(f"Encoding '{title}'...")
-        embedding = user.encode_user_text(text)
+        embedding = [vector]
         
         # Create a profile object for consistency (though primarily we need the embedding)
         profile = {
@@ -1,33 +1,34 @@
 import chromadb
-import json
+
+from movie_store import MovieStore
 
 def inspect_movies():
     client = chromadb.PersistentClient(path="chroma")
     collection = client.get_collection(name="movies")
+    store = MovieStore()
+    store.load()
     
     # Peek at 5 items to see their metadata structure
     results = collection.peek(limit=5)
     
     print(f"Total items in 'movies' collection: {collection.count()}")
+    print(f"Total items in movie store ({store.path}): {len(store)}")
     
     if not results["ids"]:
         print("Collection is empty.")
         return
 
     print("\nSample Movie Metadata:")
-    for idx, meta in enumerate(results["metadatas"]):
+    for idx, (mid, meta) in enumerate(zip(results["ids"], results["metadatas"])):
         print(f"[{idx}] RAW METADATA: {meta}")
-        payload_str = meta.get("payload", "{{}}")
-        try:
-            payload = json.loads(payload_str)
-            title = payload.get("title", "Unknown")
-            keywords = payload.get("keywords", [])
-            genres = payload.get("genres", [])
-            print(f"[{idx}] Title: {title}")
-            print(f"    Genres: {genres}")
-            print(f"    Keywords (Type: {type(keywords)}): {keywords}")
-        except json.JSONDecodeError:
-            print(f"[{idx}] Error decoding payload: {payload_str}")
+        row = store.get(mid) if mid.isdigit() else None
+        if row is None:
+            print(f"[{idx}] Not in the movie store (legacy payload: {'payload' in meta})")
+            continue
+        print(f"[{idx}] Title: {row['title']} ({row['year']}, {row['language']})")
+        print(f"    Genres: {row['genres']}")
+        print(f"    Backdrop: {row['backdrop_path']}")
+        print(f"    Keywords: {[name for _, name in row['keywords']]}")
 
 if __name__ == "__main__":
     inspect_movies()
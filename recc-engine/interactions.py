@@ -0,0 +1,128 @@
+"""
+In-memory interaction state for one user.
+
+Each list in a profile's 'data' (liked, disliked, neutral, watchlist, history,
+shown) is kept as an insertion-ordered dict, so membership tests and removals
+are O(1) while the order of the original lists (e.g. history as a log) is
+preserved. The set of movies to exclude from recommendations is maintained
+incrementally alongside them.
+"""
+
+import threading
+from collections import Counter
+from typing import Any, Dict, FrozenSet, Iterable, List
+
+INTERACTION_KINDS = ("liked", "disliked", "neutral", "watchlist", "history", "shown")
+
+# Kinds whose movies are never recommended again (neutral ones are only
+# excluded through 'shown'/'history', which rating them also sets)
+EXCLUDED_KINDS = ("shown", "liked", "disliked", "watchlist", "history")
+
+# action -> (lists the movie is added to, lists it is removed from)
+ACTION_EFFECTS = {
+    # Liked/disliked/neutral imply history (watched/interacted) and shown,
+    # and are mutually exclusive
+    "liked": (("liked", "history", "shown"), ("disliked", "neutral")),
+    "disliked": (("disliked", "history", "shown"), ("liked", "neutral")),
+    "neutral": (("neutral", "history", "shown"), ("liked", "disliked")),
+    "watchlist": (("watchlist",), ()),
+    "history": (("history", "shown"), ()),
+    "shown": (("shown",), ()),
+    "remove_watchlist": ((), ("watchlist",)),
+}
+
+
+def normalize_movie_id(movie_id):
+    try:
+        return int(movie_id)
+    except ValueError:
+        return movie_id
+
+
+class Interactions:
+    def __init__(self) -> None:
+        self._kinds: Dict[str, Dict[Any, None]] = {kind: {} for kind in INTERACTION_KINDS}
+        # str(movie_id) -> number of excluded kinds holding it
+        self._excluded: Counter = Counter()
+        self._exclusion_set: FrozenSet[str] = frozenset()
+        self._exclusion_dirty = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_data(cls, data: Dict[str, List]) -> "Interactions":
+        """Builds from a profile's 'data' dict. Missing kinds are empty, duplicates dropped."""
+        interactions = cls()
+        for kind in INTERACTION_KINDS:
+            for movie_id in data.get(kind, []):
+                interactions._add(kind, movie_id)
+        return interactions
+
+    def _add(self, kind: str, movie_id) -> bool:
+        ids = self._kinds[kind]
+        if movie_id in ids:
+            return False
+        ids[movie_id] = None
+        if kind in EXCLUDED_KINDS:
+            key = str(movie_id)
+            self._excluded[key] += 1
+            if self._excluded[key] == 1:
+                self._exclusion_dirty = True
+        return True
+
+    def _remove(self, kind: str, movie_id) -> bool:
+        ids = self._kinds[kind]
+        if movie_id not in ids:
+            return False
+        del ids[movie_id]
+        if kind in EXCLUDED_KINDS:
+            key = str(movie_id)
+            self._excluded[key] -= 1
+            if self._excluded[key] == 0:
+                del self._excluded[key]
+                self._exclusion_dirty = True
+        return True
+
+    def apply(self, movie_id, action: str) -> bool:
+        """Applies an action (see ACTION_EFFECTS). Returns True if anything changed."""
+        movie_id = normalize_movie_id(movie_id)
+        added, removed = ACTION_EFFECTS.get(action, ((), ()))
+        changed = False
+        with self._lock:
+            for kind in added:
+                changed |= self._add(kind, movie_id)
+            for kind in removed:
+                changed |= self._remove(kind, movie_id)
+        return changed
+
+    def add_many(self, kind: str, movie_ids: Iterable) -> int:
+        """Adds movie_ids to one list. Returns how many were new."""
+        with self._lock:
+            return sum(self._add(kind, normalize_movie_id(mid)) for mid in movie_ids)
+
+    def has(self, kind: str, movie_id) -> bool:
+        return normalize_movie_id(movie_id) in self._kinds[kind]
+
+    def ids(self, kind: str) -> List:
+        """Ids in one list, oldest first."""
+        return list(self._kinds[kind])
+
+    def count(self, kind: str) -> int:
+        return len(self._kinds[kind])
+
+    @property
+    def exclusion_set(self) -> FrozenSet[str]:
+        """
+        String ids of every movie that shouldn't be recommended, in the form
+        search_movies matches against. Rebuilt only after it changed.
+        """
+        if self._exclusion_dirty:
+            with self._lock:
+                if self._exclusion_dirty:
+                    self._exclusion_set = frozenset(self._excluded)
+                    self._exclusion_dirty = False
+        return self._exclusion_set
+
+    def to_data(self) -> Dict[str, List]:
+        """The profile 'data' dict: one list per kind, in insertion order."""
+        with self._lock:
+            return {kind: list(ids) for kind, ids in self._kinds.items()}
@@ -0,0 +1,70 @@
+"""
+Imports users/*.json profile files into the SQLite (default) or event-log
+profile store.
+
+Users already in the store are skipped unless --overwrite is given, so the
+script is safe to re-run. The JSON files are left in place.
+
+Usage:
+    python migrate_profiles.py [--users-path users] [--db profiles.sqlite3] [--overwrite]
+    python migrate_profiles.py --store eventlog [--log-path profile_log]
+"""
+
+import argparse
+import logging
+import os
+import time
+
+from profile_store import EventLogProfileStore, JsonProfileStore, SqliteProfileStore
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger("migrate_profiles")
+
+
+def migrate(users_path, target, overwrite=False):
+    start_time = time.time()
+    source = JsonProfileStore(users_path)
+
+    imported = skipped = failed = 0
+    for user_id in source.list_ids():
+        try:
+            profile = source.load(user_id)
+        except Exception as e:
+            logger.error(f"Could not read {source.path(user_id)}: {e}")
+            failed += 1
+            continue
+
+        if target.import_profile(user_id, profile, overwrite=overwrite):
+            imported += 1
+        else:
+            skipped += 1
+
+    target.close()
+    duration = time.time() - start_time
+    logger.info(
+        "action migrate_profiles | duration %.4fs | imported %d | skipped %d | failed %d",
+        duration, imported, skipped, failed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users-path", default="users")
+    parser.add_argument("--store", choices=["sqlite", "eventlog"], default="sqlite")
+    parser.add_argument("--db", default=os.getenv("RECC_PROFILE_DB", "profiles.sqlite3"))
+    parser.add_argument("--log-path", default=os.getenv("RECC_PROFILE_LOG", "profile_log"))
+    parser.add_argument("--overwrite", action="store_true", help="Replace users already in the store")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.users_path):
+        parser.error(f"{args.users_path} is not a directory")
+    # No lazy legacy import in the target: every file is imported explicitly
+    if args.store == "eventlog":
+        target = EventLogProfileStore(args.log_path, legacy_users_path=None, compact_interval=None)
+    else:
+        target = SqliteProfileStore(args.db, legacy_users_path=None)
+    migrate(args.users_path, target, overwrite=args.overwrite)
+
+
+if __name__ == "__main__":
+    main()
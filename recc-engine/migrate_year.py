@@ -3,6 +3,8 @@ import json
 import logging
 from datetime import datetime
 
+from movie_store import MovieStore
+
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("migrate_year")
@@ -10,6 +12,10 @@ logger = logging.getLogger("migrate_year")
 def migrate():
     client = chromadb.PersistentClient(path="chroma")
     collection = client.get_collection(name="movies")
+    # Release years live in the movie store; rows ingested before it existed
+    # still have them in their payload
+    store = MovieStore()
+    store.load()
     
     # Process in batches to be safe, though 7k fits in memory
     limit = 1000
@@ -35,13 +41,18 @@ def migrate():
         
         for i, mid in enumerate(ids):
             meta = metadatas[i]
-            payload_str = meta.get("payload", "{}")
-            
-            try:
-                payload = json.loads(payload_str)
+            year = None
+            row = store.row_of.get(int(mid)) if mid.isdigit() else None
+
+            if row is not None:
+                year = int(store.years[row]) or None
+            elif "payload" in meta:
+                try:
+                    payload = json.loads(meta["payload"])
+                except json.JSONDecodeError:
+                    logger.warning(f"Failed to decode payload for id {mid}")
+                    continue
                 release_date = payload.get("release_date")
-                
-                year = None
                 if release_date:
                     try:
                         # Parse "YYYY-MM-DD"
@@ -51,19 +62,13 @@ def migrate():
                         # Try just YYYY if format differs
                         if len(release_date) >= 4 and release_date[:4].isdigit():
                             year = int(release_date[:4])
-                
-                # Only update if we found a valid year and it's not already set (or we want to overwrite)
-                if year is not None:
-                    # Create a copy to update
-                    new_meta = meta.copy()
-                    new_meta["year"] = year
-                    
-                    updates_ids.append(mid)
-                    updates_metas.append(new_meta)
-                    
-            except json.JSONDecodeError:
-                logger.warning(f"Failed to decode payload for id {mid}")
-                
+
+            # Only update if we found a valid year that isn't already set.
+            # Chroma merges metadata on update, so only the year is sent
+            if year is not None and meta.get("year") != year:
+                updates_ids.append(mid)
+                updates_metas.append({"year": year})
+
         if updates_ids:
             collection.update(
                 ids=updates_ids,
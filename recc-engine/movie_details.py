@@ -0,0 +1,174 @@
+"""
+Tiered movie-details lookup for /movies/batch.
+
+Ids are resolved from the cheapest tier that has them:
+    1. in-process LRU
+    2. the local catalog (movies already indexed in Chroma)
+    3. an on-disk cache of TMDB responses with a TTL (SQLite)
+    4. TMDB itself
+Every tier above the one that answered is back-filled, and per-tier hit
+counts are kept for the stats endpoint. The in-process tier expires entries
+after MEMORY_CACHE_TTL (never longer than the disk tier's TTL) and is
+cleared whenever the catalog reloads the movie store.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+from cache import LRUCache
+from executors import io_pool
+import user
+
+logger = logging.getLogger("recc-engine.movie_details")
+
+DISK_CACHE_PATH = "cache/tmdb.sqlite3"
+DISK_CACHE_TTL = int(os.getenv("RECC_TMDB_CACHE_TTL", 7 * 24 * 3600))
+MEMORY_CACHE_SIZE = int(os.getenv("RECC_MOVIE_CACHE_SIZE", 4096))
+MEMORY_CACHE_TTL = min(int(os.getenv("RECC_MOVIE_CACHE_TTL", 3600)), DISK_CACHE_TTL)
+
+TIERS = ("memory", "catalog", "disk", "network")
+
+
+def _from_tmdb(data: Dict[str, Any]) -> Dict[str, Any]:
+    """Keeps the fields the API returns from a raw TMDB details response."""
+    return {
+        "id": str(data.get("id")),
+        "title": data.get("title", "Unknown"),
+        "genres": [g["name"] for g in data.get("genres", []) if "name" in g],
+        "backdrop_path": data.get("backdrop_path"),
+    }
+
+
+class TMDBDiskCache:
+    """TMDB details responses persisted in SQLite, keyed by movie id."""
+
+    def __init__(self, path: str = DISK_CACHE_PATH, ttl: int = DISK_CACHE_TTL) -> None:
+        self.path = path
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS movie_details ("
+                " movie_id INTEGER PRIMARY KEY, fetched_at REAL NOT NULL, body TEXT NOT NULL)"
+            )
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, movie_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        if not movie_ids:
+            return {}
+        cutoff = time.time() - self.ttl
+        placeholders = ",".join("?" * len(movie_ids))
+        with self._lock:
+            rows = self._connect().execute(
+                f"SELECT movie_id, body FROM movie_details"
+                f" WHERE fetched_at >= ? AND movie_id IN ({placeholders})",
+                [cutoff, *movie_ids],
+            ).fetchall()
+        return {mid: json.loads(body) for mid, body in rows}
+
+    def put_many(self, responses: List[Dict[str, Any]]) -> None:
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT OR REPLACE INTO movie_details (movie_id, fetched_at, body) VALUES (?, ?, ?)",
+                    [(int(d["id"]), now, json.dumps(d)) for d in responses if "id" in d],
+                )
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+
+class MovieDetailsResolver:
+    def __init__(self, tmdb, disk_cache: Optional[TMDBDiskCache] = None) -> None:
+        self._tmdb = tmdb
+        self._memory = LRUCache(maxsize=MEMORY_CACHE_SIZE, ttl=MEMORY_CACHE_TTL)
+        # A catalog refresh may have changed titles and backdrops
+        user.get_catalog().on_rebuild(self._memory.clear)
+        self._disk = disk_cache or TMDBDiskCache()
+        self._hits = {tier: 0 for tier in TIERS}
+        self._failures = 0
+
+    def _from_catalog(self, movie_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+        found = {}
+        for movie in user.get_movies_by_ids(movie_ids):
+            meta = movie["metadata"]
+            found[int(movie["id"])] = {
+                "id": movie["id"],
+                "title": meta["title"],
+                "genres": meta["genres"],
+                "backdrop_path": meta["backdrop_path"],
+            }
+        return found
+
+    async def get_many(self, movie_ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Returns {id, title, genres, backdrop_path} for each id that any tier
+        could resolve, in the order given. Unresolvable ids are dropped.
+        """
+        found: Dict[int, Dict[str, Any]] = {}
+
+        for mid in movie_ids:
+            movie = self._memory.get(mid)
+            if movie is not None:
+                found[mid] = movie
+        self._hits["memory"] += len(found)
+
+        missing = [mid for mid in movie_ids if mid not in found]
+        if missing:
+            from_catalog = await io_pool.run(self._from_catalog, missing)
+            self._hits["catalog"] += len(from_catalog)
+            found.update(from_catalog)
+
+        missing = [mid for mid in movie_ids if mid not in found]
+        if missing:
+            from_disk = await io_pool.run(self._disk.get_many, missing)
+            self._hits["disk"] += len(from_disk)
+            found.update({mid: _from_tmdb(data) for mid, data in from_disk.items()})
+
+        missing = [mid for mid in movie_ids if mid not in found]
+        if missing:
+            responses = await self._tmdb.movie_details_batch(missing)
+            if responses:
+                await io_pool.run(self._disk.put_many, responses)
+            for data in responses:
+                found[int(data["id"])] = _from_tmdb(data)
+            self._hits["network"] += len(responses)
+            self._failures += len(missing) - len(responses)
+
+        for mid, movie in found.items():
+            self._memory.set(mid, movie)
+
+        return [found[mid] for mid in movie_ids if mid in found]
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = sum(self._hits.values()) + self._failures
+        return {
+            "lookups": lookups,
+            "hits": dict(self._hits),
+            "hit_ratio": {
+                tier: (count / lookups if lookups else 0.0)
+                for tier, count in self._hits.items()
+            },
+            "failures": self._failures,
+            "memory": self._memory.stats(),
+        }
+
+    def close(self) -> None:
+        self._disk.close()
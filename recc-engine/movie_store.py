@@ -0,0 +1,245 @@
+"""
+Columnar side store for movie display fields and keyword ids.
+
+Chroma keeps only slim, typed filter fields per movie (see
+ingest.build_metadata). What the API shows and reranks on lives here, in a
+single uncompressed .npz of parallel arrays ordered by movie id:
+
+    ids                                  int64
+    title_data/_offsets,
+    backdrop_data/_offsets               UTF-8 strings packed into one buffer
+    genre_offsets, genre_codes           per-movie genres, coded into genre_names
+    keyword_offsets, keyword_ids         per-movie TMDB keyword ids (CSR layout)
+    vocab_ids, vocab_data/_offsets       keyword id -> name
+    years                                int16, 0 when unknown
+    language_codes                       int16, coded into language_names
+    popularity, vote_average             float32
+    vote_count                           int32
+
+Loading it is a handful of array reads instead of one json.loads per movie.
+Writers (ingest.py) merge new rows into the existing file and replace it
+atomically; readers reload when its mtime changes.
+"""
+
+import logging
+import os
+import time
+import zlib
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("recc-engine.movie_store")
+
+MOVIE_STORE_PATH = os.getenv("RECC_MOVIE_STORE", "movie_store.npz")
+
+
+def keyword_id(kw_id, name: str) -> int:
+    """TMDB's keyword id, or a stable negative id for legacy name-only keywords."""
+    if isinstance(kw_id, int):
+        return kw_id
+    return -(zlib.crc32(name.encode("utf-8")) & 0x7FFFFFFF) - 1
+
+
+def store_row(item: Dict[str, Any], year: Optional[int] = None) -> Dict[str, Any]:
+    """The store's row for one TMDB movie record."""
+    keywords = []
+    for kw in item.get("keywords", []):
+        if isinstance(kw, dict) and kw.get("name"):
+            keywords.append((keyword_id(kw.get("id"), kw["name"]), kw["name"]))
+        elif isinstance(kw, str):
+            keywords.append((keyword_id(None, kw), kw))
+    genres = []
+    for g in item.get("genres", []):
+        if isinstance(g, dict) and g.get("name"):
+            genres.append(g["name"])
+        elif isinstance(g, str):
+            genres.append(g)
+    return {
+        "id": int(item["id"]),
+        "title": item.get("title") or "Unknown",
+        "backdrop_path": item.get("backdrop_path") or item.get("poster_path"),
+        "genres": genres,
+        "keywords": keywords,
+        "year": year,
+        "language": item.get("original_language") or "unknown",
+        "popularity": float(item.get("popularity") or 0.0),
+        "vote_average": float(item.get("vote_average") or 0.0),
+        "vote_count": int(item.get("vote_count") or 0),
+    }
+
+
+def _pack_strings(values: List[Optional[str]]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [(v or "").encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(data: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = data.tobytes()
+    return [raw[offsets[i]:offsets[i + 1]].decode("utf-8") for i in range(len(offsets) - 1)]
+
+
+class MovieStore:
+    def __init__(self, path: str = MOVIE_STORE_PATH) -> None:
+        self.path = path
+        self._reset()
+
+    def _reset(self) -> None:
+        self._mtime: Optional[float] = None
+        self.ids = np.empty(0, dtype=np.int64)
+        self.titles: List[str] = []
+        self.backdrops: List[Optional[str]] = []
+        self.genre_names: List[str] = []
+        self.genre_offsets = np.zeros(1, dtype=np.int64)
+        self.genre_codes = np.empty(0, dtype=np.int16)
+        self.keyword_offsets = np.zeros(1, dtype=np.int64)
+        self.keyword_ids = np.empty(0, dtype=np.int64)
+        self.vocab_ids = np.empty(0, dtype=np.int64)
+        self.vocab_names: List[str] = []
+        self.vocab: Dict[int, str] = {}
+        self.years = np.empty(0, dtype=np.int16)
+        self.language_names: List[str] = []
+        self.language_codes = np.empty(0, dtype=np.int16)
+        self.popularity = np.empty(0, dtype=np.float32)
+        self.vote_average = np.empty(0, dtype=np.float32)
+        self.vote_count = np.empty(0, dtype=np.int32)
+        self.row_of: Dict[int, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _file_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.path)
+        except OSError:
+            return None
+
+    def changed(self) -> bool:
+        """True if the file was written (or removed) since the last load."""
+        return self._file_mtime() != self._mtime
+
+    def load(self) -> bool:
+        mtime = self._file_mtime()
+        if mtime is None:
+            self._reset()
+            return False
+        start_time = time.time()
+        with np.load(self.path, allow_pickle=False) as f:
+            self.ids = f["ids"]
+            self.titles = _unpack_strings(f["title_data"], f["title_offsets"])
+            self.backdrops = [b or None for b in _unpack_strings(f["backdrop_data"], f["backdrop_offsets"])]
+            self.genre_names = [str(g) for g in f["genre_names"]]
+            self.genre_offsets = f["genre_offsets"]
+            self.genre_codes = f["genre_codes"]
+            self.keyword_offsets = f["keyword_offsets"]
+            self.keyword_ids = f["keyword_ids"]
+            self.vocab_ids = f["vocab_ids"]
+            self.vocab_names = _unpack_strings(f["vocab_data"], f["vocab_offsets"])
+            self.vocab = dict(zip(self.vocab_ids.tolist(), self.vocab_names))
+            self.years = f["years"]
+            self.language_names = [str(l) for l in f["language_names"]]
+            self.language_codes = f["language_codes"]
+            self.popularity = f["popularity"]
+            self.vote_average = f["vote_average"]
+            self.vote_count = f["vote_count"]
+        self.row_of = {mid: row for row, mid in enumerate(self.ids.tolist())}
+        self._mtime = mtime
+        duration = time.time() - start_time
+        logger.info("action movie_store_load | duration %.4fs | movies %d", duration, len(self.ids))
+        return True
+
+    def genres(self, row: int) -> List[str]:
+        codes = self.genre_codes[self.genre_offsets[row]:self.genre_offsets[row + 1]]
+        return [self.genre_names[c] for c in codes]
+
+    def keywords(self, row: int) -> np.ndarray:
+        return self.keyword_ids[self.keyword_offsets[row]:self.keyword_offsets[row + 1]]
+
+    def row(self, row: int) -> Dict[str, Any]:
+        """Decodes one row back into store_row() form."""
+        year = int(self.years[row])
+        return {
+            "id": int(self.ids[row]),
+            "title": self.titles[row],
+            "backdrop_path": self.backdrops[row],
+            "genres": self.genres(row),
+            "keywords": [(int(k), self.vocab.get(int(k), "")) for k in self.keywords(row)],
+            "year": year or None,
+            "language": self.language_names[self.language_codes[row]],
+            "popularity": float(self.popularity[row]),
+            "vote_average": float(self.vote_average[row]),
+            "vote_count": int(self.vote_count[row]),
+        }
+
+    def get(self, movie_id) -> Optional[Dict[str, Any]]:
+        row = self.row_of.get(int(movie_id))
+        return self.row(row) if row is not None else None
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        for row in range(len(self.ids)):
+            yield self.row(row)
+
+    def upsert(self, rows: Iterable[Dict[str, Any]]) -> int:
+        """Merges rows (store_row() form) into the file by id and reloads it."""
+        if self._mtime is None or self.changed():
+            self.load()
+        merged = {r["id"]: r for r in self.rows()}
+        before = len(merged)
+        for r in rows:
+            merged[r["id"]] = r
+        self.save(merged[mid] for mid in sorted(merged))
+        self.load()
+        return len(merged) - before
+
+    def save(self, rows: Iterable[Dict[str, Any]]) -> None:
+        start_time = time.time()
+        rows = list(rows)
+        genre_names = sorted({g for r in rows for g in r["genres"]})
+        genre_code = {g: i for i, g in enumerate(genre_names)}
+        language_names = sorted({r["language"] for r in rows})
+        language_code = {l: i for i, l in enumerate(language_names)}
+        vocab = {}
+        for r in rows:
+            vocab.update(r["keywords"])
+
+        title_data, title_offsets = _pack_strings([r["title"] for r in rows])
+        backdrop_data, backdrop_offsets = _pack_strings([r["backdrop_path"] for r in rows])
+        vocab_ids = sorted(vocab)
+        vocab_data, vocab_offsets = _pack_strings([vocab[k] for k in vocab_ids])
+        genre_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(r["genres"]) for r in rows], out=genre_offsets[1:])
+        keyword_offsets = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(r["keywords"]) for r in rows], out=keyword_offsets[1:])
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            ids=np.array([r["id"] for r in rows], dtype=np.int64),
+            title_data=title_data,
+            title_offsets=title_offsets,
+            backdrop_data=backdrop_data,
+            backdrop_offsets=backdrop_offsets,
+            genre_names=np.array(genre_names, dtype=str),
+            genre_offsets=genre_offsets,
+            genre_codes=np.array([genre_code[g] for r in rows for g in r["genres"]], dtype=np.int16),
+            keyword_offsets=keyword_offsets,
+            keyword_ids=np.array([k for r in rows for k, _ in r["keywords"]], dtype=np.int64),
+            vocab_ids=np.array(vocab_ids, dtype=np.int64),
+            vocab_data=vocab_data,
+            vocab_offsets=vocab_offsets,
+            years=np.array([r["year"] or 0 for r in rows], dtype=np.int16),
+            language_names=np.array(language_names, dtype=str),
+            language_codes=np.array([language_code[r["language"]] for r in rows], dtype=np.int16),
+            popularity=np.array([r["popularity"] for r in rows], dtype=np.float32),
+            vote_average=np.array([r["vote_average"] for r in rows], dtype=np.float32),
+            vote_count=np.array([r["vote_count"] for r in rows], dtype=np.int32),
+        )
+        os.replace(tmp_path, self.path)
+        duration = time.time() - start_time
+        logger.info(
+            "action movie_store_save | duration %.4fs | movies %d | keywords %d | bytes %d",
+            duration, len(rows), len(vocab_ids), os.path.getsize(self.path),
+        )
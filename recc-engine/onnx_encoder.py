@@ -0,0 +1,81 @@
+"""
+ONNX Runtime inference for all-MiniLM-L6-v2 on CPU.
+
+Reproduces the SentenceTransformer pipeline (tokenize -> transformer -> mean
+pooling -> L2 normalize) over an exported, optionally int8-quantized, ONNX
+graph, so the API can embed text without loading PyTorch. The model
+directory is produced by export_onnx.py.
+"""
+
+import logging
+import os
+import time
+from typing import List, Optional
+
+import numpy as np
+import onnxruntime as ort
+from tokenizers import Tokenizer
+
+logger = logging.getLogger("recc-engine.onnx_encoder")
+
+# all-MiniLM-L6-v2's max_seq_length
+MAX_LENGTH = 256
+ONNX_THREADS = int(os.getenv("RECC_ONNX_THREADS", 0))  # 0 = onnxruntime default
+
+
+class OnnxSentenceEncoder:
+    """Drop-in for SentenceTransformer.encode: returns unit-length float32 rows."""
+
+    def __init__(self, model_dir: str, model_file: str = "model_int8.onnx", max_length: int = MAX_LENGTH,
+                 batch_size: int = 32, threads: Optional[int] = None) -> None:
+        start_time = time.time()
+        self.model_path = os.path.join(model_dir, model_file)
+        self.batch_size = batch_size
+
+        self._tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self._tokenizer.enable_truncation(max_length=max_length)
+        self._tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = ONNX_THREADS if threads is None else threads
+        if threads:
+            options.intra_op_num_threads = threads
+        self._session = ort.InferenceSession(
+            self.model_path, options, providers=["CPUExecutionProvider"]
+        )
+        self._inputs = {i.name for i in self._session.get_inputs()}
+
+        duration = time.time() - start_time
+        logger.info("action onnx_load | duration %.4fs | model %s", duration, self.model_path)
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        encodings = self._tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        hidden = self._session.run(None, feeds)[0]
+
+        # Mean over real (non-padding) tokens, then L2 normalize
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (hidden * mask).sum(axis=1)
+        counts = np.clip(mask.sum(axis=1), 1e-9, None)
+        pooled = summed / counts
+        norms = np.linalg.norm(pooled, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return (pooled / norms).astype(np.float32)
+
+    def encode(self, sentences, batch_size: Optional[int] = None, **kwargs) -> np.ndarray:
+        if isinstance(sentences, str):
+            return self.encode([sentences], batch_size=batch_size)[0]
+        batch_size = batch_size or self.batch_size
+        if not sentences:
+            return np.zeros((0, 0), dtype=np.float32)
+        batches = [
+            self._encode_batch(list(sentences[i:i + batch_size]))
+            for i in range(0, len(sentences), batch_size)
+        ]
+        return np.vstack(batches)
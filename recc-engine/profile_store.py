@@ -0,0 +1,726 @@
+"""
+User profile storage.
+
+JsonProfileStore keeps the original one-file-per-user layout (users/{id}.json).
+SqliteProfileStore keeps every profile in one SQLite database in WAL mode:
+scalar profile fields as a JSON row in 'profiles' and the interaction lists
+(liked, watchlist, shown, ...) as one row per movie in 'interactions', so a
+rating is a couple of row writes in a single transaction instead of a
+whole-file rewrite.
+EventLogProfileStore appends every change as one record to an event log and
+materializes profiles by replaying it onto per-user snapshots, which a
+background compactor rewrites as the log grows.
+
+All three expose the same methods and return profiles in the same shape as
+user.load_user_profile. apply_action, add_shown and load_interactions
+return Stamped results, so callers caching interactions (user.py) can tell
+whether another writer got in between.
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional
+
+import portalocker
+
+from cache import LRUCache
+from event_log import EventLog, read_events
+from interactions import ACTION_EFFECTS, INTERACTION_KINDS, Interactions, normalize_movie_id
+
+logger = logging.getLogger("recc-engine.profile_store")
+
+EVENTLOG_COMPACT_INTERVAL = float(os.getenv("RECC_EVENTLOG_COMPACT_INTERVAL", 600))
+EVENTLOG_COMPACT_BYTES = int(os.getenv("RECC_EVENTLOG_COMPACT_BYTES", 1024 * 1024))
+EVENTLOG_CHECK_INTERVAL = 30
+# Users read from their snapshot (no pending changes) kept in memory
+EVENTLOG_CLEAN_CACHE_SIZE = int(os.getenv("RECC_EVENTLOG_CLEAN_CACHE_SIZE", 1024))
+
+
+def empty_data() -> Dict[str, List]:
+    return {kind: [] for kind in INTERACTION_KINDS}
+
+
+class Stamped(NamedTuple):
+    value: Any
+    # updated_at just before this write (for a read: the same as updated_at)
+    previous: Optional[float]
+    # updated_at this write left, or, for a read, taken before reading, so
+    # the value is at least as new as the stamp
+    updated_at: Optional[float]
+
+
+def merge_keyword_counts(profile_keywords, new_keywords: Iterable[str]) -> Dict[str, int]:
+    """
+    Adds one to each new keyword's count. A legacy list of keywords counts
+    each of them once.
+    """
+    if isinstance(profile_keywords, list):
+        counts = {k: 1 for k in profile_keywords}
+    else:
+        counts = dict(profile_keywords or {})
+    for kw in new_keywords:
+        counts[kw] = counts.get(kw, 0) + 1
+    return counts
+
+
+def read_profile_file(path: str) -> Dict[str, Any]:
+    with open(path, "r") as f:
+        data = json.load(f)
+
+    if isinstance(data, list):
+        if not data:
+            raise ValueError(f"{path} is empty.")
+        profile = data[0]
+    elif isinstance(data, dict):
+        profile = data
+    else:
+        raise ValueError(f"{path} must be a JSON object or a list of objects.")
+
+    # Ensure data structure exists
+    if "data" not in profile:
+        profile["data"] = empty_data()
+    else:
+        # Ensure all keys exist
+        for key in INTERACTION_KINDS:
+            if key not in profile["data"]:
+                profile["data"][key] = []
+
+    return profile
+
+
+def write_profile_file(path: str, profile: Dict[str, Any]) -> None:
+    # Existing files are lists holding one profile; keep a dict file a dict
+    is_list = True
+    if os.path.exists(path):
+        with open(path, "r") as f:
+            try:
+                data = json.load(f)
+                if isinstance(data, dict):
+                    is_list = False
+            except:
+                pass
+
+    output_data = [profile] if is_list else profile
+
+    # No indentation: with indent=4 every id in 'shown' got its own line
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(output_data, f, separators=(",", ":"))
+    os.replace(tmp_path, path)
+
+
+class JsonProfileStore:
+    """users/{id}.json files; read-modify-write under a per-user file lock."""
+
+    def __init__(self, users_path: str = "users") -> None:
+        self.users_path = users_path
+
+    def path(self, user_id: str) -> str:
+        return os.path.join(self.users_path, f"{user_id}.json")
+
+    def _lock(self, user_id: str):
+        os.makedirs(self.users_path, exist_ok=True)
+        return portalocker.Lock(os.path.join(self.users_path, f"{user_id}.lock"), timeout=5)
+
+    def exists(self, user_id: str) -> bool:
+        return os.path.exists(self.path(user_id))
+
+    def updated_at(self, user_id: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(self.path(user_id))
+        except OSError:
+            return None
+
+    def list_ids(self) -> List[str]:
+        if not os.path.isdir(self.users_path):
+            return []
+        return sorted(
+            os.path.splitext(name)[0]
+            for name in os.listdir(self.users_path)
+            if name.endswith(".json")
+        )
+
+    def load(self, user_id: str) -> Dict[str, Any]:
+        return read_profile_file(self.path(user_id))
+
+    def load_interactions(self, user_id: str) -> Stamped:
+        stamp = self.updated_at(user_id)
+        return Stamped(Interactions.from_data(self.load(user_id)["data"]), stamp, stamp)
+
+    def save(self, user_id: str, profile: Dict[str, Any]) -> None:
+        with self._lock(user_id):
+            write_profile_file(self.path(user_id), profile)
+
+    def create(self, user_id: str, profile: Dict[str, Any]) -> bool:
+        """Saves profile unless user_id already exists. Returns True if created."""
+        with self._lock(user_id):
+            if self.exists(user_id):
+                return False
+            write_profile_file(self.path(user_id), profile)
+            return True
+
+    def update_fields(self, user_id: str, **fields) -> Dict[str, Any]:
+        with self._lock(user_id):
+            profile = self.load(user_id)
+            profile.update(fields)
+            write_profile_file(self.path(user_id), profile)
+            return profile
+
+    def merge_keywords(self, user_id: str, keywords: Iterable[str]) -> Dict[str, int]:
+        """Adds keyword counts atomically. Returns the merged counts."""
+        with self._lock(user_id):
+            profile = self.load(user_id)
+            profile["keywords"] = merge_keyword_counts(profile.get("keywords"), keywords)
+            write_profile_file(self.path(user_id), profile)
+            return profile["keywords"]
+
+    def apply_action(self, user_id: str, movie_id, action: str) -> Stamped:
+        with self._lock(user_id):
+            previous = self.updated_at(user_id)
+            profile = self.load(user_id)
+            interactions = Interactions.from_data(profile["data"])
+            if interactions.apply(movie_id, action):
+                profile["data"] = interactions.to_data()
+                write_profile_file(self.path(user_id), profile)
+            return Stamped(profile, previous, self.updated_at(user_id))
+
+    def add_shown(self, user_id: str, movie_ids: Iterable) -> Stamped:
+        with self._lock(user_id):
+            previous = self.updated_at(user_id)
+            profile = self.load(user_id)
+            interactions = Interactions.from_data(profile["data"])
+            if interactions.add_many("shown", movie_ids):
+                profile["data"] = interactions.to_data()
+                write_profile_file(self.path(user_id), profile)
+            return Stamped(interactions.count("shown"), previous, self.updated_at(user_id))
+
+    def close(self) -> None:
+        pass
+
+
+class SqliteProfileStore:
+    """
+    All profiles in one SQLite database (WAL mode, one connection per thread).
+
+    Users that only exist as legacy users/{id}.json files are imported the
+    first time they're looked up; migrate_profiles.py imports them in bulk.
+    """
+
+    def __init__(self, db_path: str = "profiles.sqlite3", legacy_users_path: Optional[str] = "users") -> None:
+        self.db_path = db_path
+        self._legacy = JsonProfileStore(legacy_users_path) if legacy_users_path else None
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        with self._connect() as conn:
+            conn.executescript(
+                """
+                CREATE TABLE IF NOT EXISTS profiles (
+                    user_id TEXT PRIMARY KEY,
+                    body TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS interactions (
+                    user_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    movie_id NOT NULL,
+                    seq INTEGER NOT NULL,
+                    PRIMARY KEY (user_id, kind, movie_id)
+                ) WITHOUT ROWID;
+                """
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+            conn = sqlite3.connect(self.db_path, timeout=5.0, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _write(self):
+        """Context manager for a write transaction (takes the write lock up front)."""
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        return _Transaction(conn)
+
+    def _row(self, user_id: str):
+        return self._connect().execute(
+            "SELECT body, updated_at FROM profiles WHERE user_id = ?", (user_id,)
+        ).fetchone()
+
+    def _import_legacy(self, user_id: str) -> bool:
+        if self._legacy is None or not self._legacy.exists(user_id):
+            return False
+        self.import_profile(user_id, self._legacy.load(user_id), overwrite=False)
+        logger.info("Imported legacy profile %s into %s", user_id, self.db_path)
+        return True
+
+    def exists(self, user_id: str) -> bool:
+        return self._row(user_id) is not None or self._import_legacy(user_id)
+
+    def updated_at(self, user_id: str) -> Optional[float]:
+        row = self._row(user_id)
+        return row[1] if row else None
+
+    @staticmethod
+    def _stamp(conn: sqlite3.Connection, user_id: str) -> Optional[float]:
+        row = conn.execute("SELECT updated_at FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+        return row[0] if row else None
+
+    def list_ids(self) -> List[str]:
+        rows = self._connect().execute("SELECT user_id FROM profiles ORDER BY user_id").fetchall()
+        return [r[0] for r in rows]
+
+    def load(self, user_id: str) -> Dict[str, Any]:
+        row = self._row(user_id)
+        if row is None:
+            if not self._import_legacy(user_id):
+                raise KeyError(f"Profile not found for id={user_id}")
+            row = self._row(user_id)
+        profile = json.loads(row[0])
+        profile["data"] = self._interaction_rows(user_id)
+        return profile
+
+    def _interaction_rows(self, user_id: str) -> Dict[str, List]:
+        data = empty_data()
+        rows = self._connect().execute(
+            "SELECT kind, movie_id FROM interactions WHERE user_id = ? ORDER BY seq",
+            (user_id,),
+        )
+        for kind, movie_id in rows:
+            data[kind].append(movie_id)
+        return data
+
+    def load_interactions(self, user_id: str) -> Stamped:
+        if not self.exists(user_id):
+            raise KeyError(f"Profile not found for id={user_id}")
+        stamp = self.updated_at(user_id)
+        return Stamped(Interactions.from_data(self._interaction_rows(user_id)), stamp, stamp)
+
+    def import_profile(self, user_id: str, profile: Dict[str, Any], overwrite: bool = True) -> bool:
+        """Writes a whole profile (fields and interaction lists). Returns False if skipped."""
+        body = {k: v for k, v in profile.items() if k != "data"}
+        data = profile.get("data") or {}
+        with self._write() as conn:
+            if not overwrite:
+                exists = conn.execute(
+                    "SELECT 1 FROM profiles WHERE user_id = ?", (user_id,)
+                ).fetchone()
+                if exists:
+                    return False
+            conn.execute(
+                "INSERT OR REPLACE INTO profiles (user_id, body, updated_at) VALUES (?, ?, ?)",
+                (user_id, json.dumps(body), time.time()),
+            )
+            conn.execute("DELETE FROM interactions WHERE user_id = ?", (user_id,))
+            conn.executemany(
+                "INSERT OR IGNORE INTO interactions (user_id, kind, movie_id, seq) VALUES (?, ?, ?, ?)",
+                [
+                    (user_id, kind, mid, seq)
+                    for kind in INTERACTION_KINDS
+                    for seq, mid in enumerate(data.get(kind, []))
+                ],
+            )
+        return True
+
+    def save(self, user_id: str, profile: Dict[str, Any]) -> None:
+        self.import_profile(user_id, profile, overwrite=True)
+
+    def create(self, user_id: str, profile: Dict[str, Any]) -> bool:
+        if self._import_legacy(user_id):
+            return False
+        return self.import_profile(user_id, profile, overwrite=False)
+
+    def update_fields(self, user_id: str, **fields) -> Dict[str, Any]:
+        if not self.exists(user_id):
+            raise KeyError(f"Profile not found for id={user_id}")
+        with self._write() as conn:
+            row = conn.execute("SELECT body FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+            body = json.loads(row[0])
+            body.update(fields)
+            conn.execute(
+                "UPDATE profiles SET body = ?, updated_at = ? WHERE user_id = ?",
+                (json.dumps(body), time.time(), user_id),
+            )
+        return self.load(user_id)
+
+    def merge_keywords(self, user_id: str, keywords: Iterable[str]) -> Dict[str, int]:
+        if not self.exists(user_id):
+            raise KeyError(f"Profile not found for id={user_id}")
+        with self._write() as conn:
+            row = conn.execute("SELECT body FROM profiles WHERE user_id = ?", (user_id,)).fetchone()
+            body = json.loads(row[0])
+            body["keywords"] = merge_keyword_counts(body.get("keywords"), keywords)
+            conn.execute(
+                "UPDATE profiles SET body = ?, updated_at = ? WHERE user_id = ?",
+                (json.dumps(body), time.time(), user_id),
+            )
+        return body["keywords"]
+
+    def apply_action(self, user_id: str, movie_id, action: str) -> Stamped:
+        if not self.exists(user_id):
+            raise KeyError(f"Profile not found for id={user_id}")
+        movie_id = normalize_movie_id(movie_id)
+        added, removed = ACTION_EFFECTS.get(action, ((), ()))
+        seq = time.time_ns()
+        with self._write() as conn:
+            previous = self._stamp(conn, user_id)
+            updated_at = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO interactions (user_id, kind, movie_id, seq) VALUES (?, ?, ?, ?)",
+                [(user_id, kind, movie_id, seq) for kind in added],
+            )
+            conn.executemany(
+                "DELETE FROM interactions WHERE user_id = ? AND kind = ? AND movie_id = ?",
+                [(user_id, kind, movie_id) for kind in removed],
+            )
+            conn.execute(
+                "UPDATE profiles SET updated_at = ? WHERE user_id = ?", (updated_at, user_id)
+            )
+        return Stamped(self.load(user_id), previous, updated_at)
+
+    def add_shown(self, user_id: str, movie_ids: Iterable) -> Stamped:
+        if not self.exists(user_id):
+            raise KeyError(f"Profile not found for id={user_id}")
+        seq = time.time_ns()
+        with self._write() as conn:
+            previous = self._stamp(conn, user_id)
+            updated_at = time.time()
+            conn.executemany(
+                "INSERT OR IGNORE INTO interactions (user_id, kind, movie_id, seq) VALUES (?, 'shown', ?, ?)",
+                [(user_id, normalize_movie_id(mid), seq + i) for i, mid in enumerate(movie_ids)],
+            )
+            conn.execute(
+                "UPDATE profiles SET updated_at = ? WHERE user_id = ?", (updated_at, user_id)
+            )
+            (count,) = conn.execute(
+                "SELECT COUNT(*) FROM interactions WHERE user_id = ? AND kind = 'shown'",
+                (user_id,),
+            ).fetchone()
+        return Stamped(count, previous, updated_at)
+
+    def close(self) -> None:
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+
+class _Transaction:
+    def __init__(self, conn: sqlite3.Connection) -> None:
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Connection:
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+
+
+class _UserState:
+    __slots__ = ("fields", "interactions", "updated_at", "seq")
+
+    def __init__(self, profile: Dict[str, Any], updated_at: float, seq: int) -> None:
+        self.fields = {k: v for k, v in profile.items() if k != "data"}
+        self.interactions = Interactions.from_data(profile.get("data") or {})
+        self.updated_at = updated_at
+        self.seq = seq
+
+    def to_profile(self) -> Dict[str, Any]:
+        profile = json.loads(json.dumps(self.fields))
+        profile["data"] = self.interactions.to_data()
+        return profile
+
+
+class EventLogProfileStore:
+    """
+    Profiles as snapshots plus an append-only event log.
+
+    Layout under path:
+        events.jsonl       live log, one JSON record per change (fsync batched)
+        segments/          rolled logs not yet folded into snapshots
+        snapshots/{id}.json  profile as of the 'seq' stored with it
+        archive/           folded segments, kept for offline use (retraining)
+
+    Users with changes since their last snapshot are held in memory; the
+    compactor writes their snapshots and then drops them. Users that were
+    only read sit in a bounded LRU in front of their snapshot files.
+    """
+
+    def __init__(
+        self,
+        path: str = "profile_log",
+        legacy_users_path: Optional[str] = "users",
+        compact_interval: Optional[float] = EVENTLOG_COMPACT_INTERVAL,
+        compact_bytes: int = EVENTLOG_COMPACT_BYTES,
+    ) -> None:
+        self.path = path
+        self.compact_interval = compact_interval
+        self.compact_bytes = compact_bytes
+        self._snapshots_path = os.path.join(path, "snapshots")
+        self._archive_path = os.path.join(path, "archive")
+        os.makedirs(self._snapshots_path, exist_ok=True)
+        os.makedirs(self._archive_path, exist_ok=True)
+        self._legacy = JsonProfileStore(legacy_users_path) if legacy_users_path else None
+
+        self._lock = threading.RLock()
+        self._compact_lock = threading.Lock()
+        # Users with changes not yet in a snapshot; only compaction drops them
+        self._states: Dict[str, _UserState] = {}
+        self._clean = LRUCache(maxsize=EVENTLOG_CLEAN_CACHE_SIZE)
+        self._dirty = set()
+        self._last_compaction = time.time()
+
+        self._log = EventLog(path)
+        self._replay()
+
+        self._stop = threading.Event()
+        self._compactor = None
+        if compact_interval:
+            self._compactor = threading.Thread(target=self._compact_loop, name="profile-compactor", daemon=True)
+            self._compactor.start()
+
+    def _snapshot_path(self, user_id: str) -> str:
+        return os.path.join(self._snapshots_path, f"{user_id}.json")
+
+    def _replay(self) -> None:
+        start_time = time.time()
+        replayed = 0
+        for path in self._log.segments() + [self._log.log_path]:
+            if not os.path.exists(path):
+                continue
+            for record in read_events(path):
+                user_id = record["user"]
+                state = self._state(user_id)
+                if state is not None and record["seq"] <= state.seq:
+                    continue  # already in the snapshot
+                self._apply(user_id, record)
+                replayed += 1
+        duration = time.time() - start_time
+        logger.info(
+            "action eventlog_replay | duration %.4fs | events %d | users %d",
+            duration, replayed, len(self._dirty),
+        )
+
+    def _state(self, user_id: str) -> Optional[_UserState]:
+        state = self._states.get(user_id)
+        if state is None:
+            state = self._clean.get(user_id)
+        if state is None:
+            try:
+                with open(self._snapshot_path(user_id), "r") as f:
+                    snapshot = json.load(f)
+            except FileNotFoundError:
+                return None
+            state = _UserState(snapshot["profile"], snapshot["updated_at"], snapshot["seq"])
+            self._clean.set(user_id, state)
+        return state
+
+    def _apply(self, user_id: str, record: Dict[str, Any]) -> None:
+        kind = record["type"]
+        if kind == "save":
+            state = _UserState(record["profile"], record["ts"], record["seq"])
+        else:
+            state = self._state(user_id)
+            if kind == "fields":
+                state.fields.update(record["fields"])
+            elif kind == "keywords":
+                state.fields["keywords"] = merge_keyword_counts(state.fields.get("keywords"), record["keywords"])
+            elif kind == "action":
+                state.interactions.apply(record["movie_id"], record["action"])
+            elif kind == "shown":
+                state.interactions.add_many("shown", record["movie_ids"])
+            state.seq = record["seq"]
+            state.updated_at = record["ts"]
+        # Pending changes keep the user in memory until compaction
+        self._states[user_id] = state
+        self._clean.pop(user_id)
+        self._dirty.add(user_id)
+
+    def _append(self, user_id: str, record: Dict[str, Any]) -> int:
+        """Logs and applies one change. Caller holds self._lock and waits on the seq."""
+        record["user"] = user_id
+        record["ts"] = time.time()
+        seq = self._log.append(record)
+        self._apply(user_id, record)
+        return seq
+
+    def _require(self, user_id: str) -> _UserState:
+        state = self._state(user_id)
+        if state is None:
+            if not self._import_legacy(user_id):
+                raise KeyError(f"Profile not found for id={user_id}")
+            state = self._state(user_id)
+        return state
+
+    def _import_legacy(self, user_id: str) -> bool:
+        if self._legacy is None or not self._legacy.exists(user_id):
+            return False
+        self.import_profile(user_id, self._legacy.load(user_id), overwrite=False)
+        logger.info("Imported legacy profile %s into %s", user_id, self.path)
+        return True
+
+    def exists(self, user_id: str) -> bool:
+        with self._lock:
+            return self._state(user_id) is not None or self._import_legacy(user_id)
+
+    def updated_at(self, user_id: str) -> Optional[float]:
+        with self._lock:
+            state = self._state(user_id)
+            return state.updated_at if state else None
+
+    def list_ids(self) -> List[str]:
+        with self._lock:
+            ids = set(self._states)
+        ids.update(
+            os.path.splitext(name)[0]
+            for name in os.listdir(self._snapshots_path)
+            if name.endswith(".json")
+        )
+        return sorted(ids)
+
+    def load(self, user_id: str) -> Dict[str, Any]:
+        with self._lock:
+            return self._require(user_id).to_profile()
+
+    def load_interactions(self, user_id: str) -> Stamped:
+        with self._lock:
+            state = self._require(user_id)
+            return Stamped(Interactions.from_data(state.interactions.to_data()), state.updated_at, state.updated_at)
+
+    def import_profile(self, user_id: str, profile: Dict[str, Any], overwrite: bool = True) -> bool:
+        with self._lock:
+            if not overwrite and self._state(user_id) is not None:
+                return False
+            seq = self._append(user_id, {"type": "save", "profile": profile})
+        self._log.wait(seq)
+        return True
+
+    def save(self, user_id: str, profile: Dict[str, Any]) -> None:
+        self.import_profile(user_id, profile, overwrite=True)
+
+    def create(self, user_id: str, profile: Dict[str, Any]) -> bool:
+        with self._lock:
+            if self.exists(user_id):
+                return False
+            seq = self._append(user_id, {"type": "save", "profile": profile})
+        # Wait for the fsync without holding up everyone else's reads and writes
+        self._log.wait(seq)
+        return True
+
+    def update_fields(self, user_id: str, **fields) -> Dict[str, Any]:
+        with self._lock:
+            self._require(user_id)
+            seq = self._append(user_id, {"type": "fields", "fields": fields})
+            profile = self._states[user_id].to_profile()
+        self._log.wait(seq)
+        return profile
+
+    def merge_keywords(self, user_id: str, keywords: Iterable[str]) -> Dict[str, int]:
+        with self._lock:
+            self._require(user_id)
+            # Logged as a delta, so replay re-applies it onto whatever came before
+            seq = self._append(user_id, {"type": "keywords", "keywords": list(keywords)})
+            counts = dict(self._states[user_id].fields["keywords"])
+        self._log.wait(seq)
+        return counts
+
+    def apply_action(self, user_id: str, movie_id, action: str) -> Stamped:
+        with self._lock:
+            previous = self._require(user_id).updated_at
+            record = {"type": "action", "movie_id": normalize_movie_id(movie_id), "action": action}
+            seq = self._append(user_id, record)
+            state = self._states[user_id]
+            result = Stamped(state.to_profile(), previous, state.updated_at)
+        self._log.wait(seq)
+        return result
+
+    def add_shown(self, user_id: str, movie_ids: Iterable) -> Stamped:
+        with self._lock:
+            previous = self._require(user_id).updated_at
+            record = {"type": "shown", "movie_ids": [normalize_movie_id(mid) for mid in movie_ids]}
+            seq = self._append(user_id, record)
+            state = self._states[user_id]
+            result = Stamped(state.interactions.count("shown"), previous, state.updated_at)
+        self._log.wait(seq)
+        return result
+
+    def _write_snapshot(self, user_id: str, snapshot: Dict[str, Any]) -> None:
+        path = self._snapshot_path(user_id)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(snapshot, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def compact(self) -> int:
+        """
+        Rolls the live log, writes a snapshot for every user changed since the
+        last compaction and archives the folded segments. Returns the number
+        of snapshots written.
+        """
+        with self._compact_lock:
+            start_time = time.time()
+            with self._lock:
+                self._log.rotate()
+                segments = self._log.segments()
+                captured = {
+                    uid: {
+                        "seq": self._states[uid].seq,
+                        "updated_at": self._states[uid].updated_at,
+                        "profile": self._states[uid].to_profile(),
+                    }
+                    for uid in self._dirty
+                }
+
+            for uid, snapshot in captured.items():
+                self._write_snapshot(uid, snapshot)
+
+            with self._lock:
+                for uid, snapshot in captured.items():
+                    state = self._states.get(uid)
+                    if state is not None and state.seq == snapshot["seq"]:
+                        # Nothing newer arrived; the snapshot is the state now
+                        self._dirty.discard(uid)
+                        self._clean.set(uid, self._states.pop(uid))
+            for segment in segments:
+                os.replace(segment, os.path.join(self._archive_path, os.path.basename(segment)))
+
+            self._last_compaction = time.time()
+            duration = self._last_compaction - start_time
+            logger.info(
+                "action eventlog_compact | duration %.4fs | snapshots %d | segments %d",
+                duration, len(captured), len(segments),
+            )
+            return len(captured)
+
+    def _compact_loop(self) -> None:
+        while not self._stop.wait(min(EVENTLOG_CHECK_INTERVAL, self.compact_interval)):
+            size = self._log.size()
+            overdue = time.time() - self._last_compaction >= self.compact_interval
+            if size >= self.compact_bytes or (size > 0 and overdue):
+                try:
+                    self.compact()
+                except Exception as e:
+                    logger.error(f"Profile compaction failed: {e}")
+
+    def close(self) -> None:
+        self._stop.set()
+        if self._compactor is not None:
+            self._compactor.join(timeout=5.0)
+        self.compact()
+        self._log.close()
@@ -0,0 +1,265 @@
+"""
+Delta refresh of the movie catalog from TMDB.
+
+Keeps, per movie, when it was last fetched and a hash of what TMDB returned
+(cache/catalog_state.sqlite3). Each run:
+
+    1. starts tracking movies that are in Chroma but not in the state yet
+       (on the first run that is every movie, counted as fetched now)
+    2. picks the movies to refetch: those TMDB's /movie/changes feed lists
+       as edited since the last refresh, plus up to --max-stale of the
+       movies last fetched more than --max-age days ago, oldest first
+    3. refetches them with crawler.Crawler (rate limited; an interrupted
+       run resumes from --work-dir)
+    4. hands only the movies whose content hash changed to ingest.Ingest,
+       which re-encodes a movie only when its build_text output changed and
+       otherwise just updates its metadata; if any was re-encoded or
+       updated, the NumPy movie matrix (index/) is rebuilt so it stops
+       serving the old vectors and filter columns
+    5. records the new fetch times and hashes, and writes the refreshed
+       movies back into data/movies.json so a later full ingest agrees
+
+Usage:
+    python refresh_catalog.py [--max-age 30] [--max-stale 500] [--workers 16] [--dry-run]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from dotenv import load_dotenv
+
+from crawler import Crawler
+from ingest import Ingest, iter_movies, write_movies
+from tmdb_api import TMDB_RATE_BURST, TMDB_RATE_LIMIT, AsyncTMDBClient, TokenBucket
+import user
+
+load_dotenv()
+logger = logging.getLogger("recc-engine.refresh_catalog")
+
+STATE_PATH = "cache/catalog_state.sqlite3"
+WORK_DIR = "data/refresh"
+DATA_FILE = "data/movies.json"
+# /movie/changes covers at most 14 days per request
+MAX_CHANGES_WINDOW = 14
+
+
+def content_hash(movie: Dict[str, Any]) -> str:
+    return hashlib.sha256(
+        json.dumps(movie, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()[:16]
+
+
+class CatalogState:
+    def __init__(self, path: str = STATE_PATH) -> None:
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS movies ("
+            " movie_id INTEGER PRIMARY KEY, fetched_at REAL NOT NULL, content_hash TEXT)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+
+    def ids(self) -> Set[int]:
+        return {row[0] for row in self._conn.execute("SELECT movie_id FROM movies")}
+
+    def hashes(self) -> Dict[int, Optional[str]]:
+        return dict(self._conn.execute("SELECT movie_id, content_hash FROM movies"))
+
+    def stale(self, fetched_before: float, limit: int) -> List[int]:
+        rows = self._conn.execute(
+            "SELECT movie_id FROM movies WHERE fetched_at < ? ORDER BY fetched_at LIMIT ?",
+            (fetched_before, limit),
+        )
+        return [row[0] for row in rows]
+
+    def track(self, entries: Iterable[Tuple[int, float, Optional[str]]]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO movies (movie_id, fetched_at, content_hash) VALUES (?, ?, ?)",
+                entries,
+            )
+
+    def record(self, entries: Iterable[Tuple[int, float, str]]) -> None:
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO movies (movie_id, fetched_at, content_hash) VALUES (?, ?, ?)",
+                entries,
+            )
+
+    def get_meta(self, key: str) -> Optional[str]:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._conn:
+            self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def track_new_movies(state: CatalogState, collection, batch_size: int = 1000) -> int:
+    """
+    Starts tracking catalog movies the state doesn't know yet. Only legacy rows
+    still carry a payload to hash; the rest are hashed on their first refetch.
+    """
+    tracked = state.ids()
+    untracked = [i for i in collection.get(include=[])["ids"] if i.isdigit() and int(i) not in tracked]
+    now = time.time()
+    for start in range(0, len(untracked), batch_size):
+        found = collection.get(ids=untracked[start:start + batch_size], include=["metadatas"])
+        entries = []
+        for movie_id, metadata in zip(found["ids"], found["metadatas"]):
+            payload = (metadata or {}).get("payload")
+            entries.append((int(movie_id), now, content_hash(json.loads(payload)) if payload else None))
+        state.track(entries)
+    return len(untracked)
+
+
+async def changed_ids(client: AsyncTMDBClient, since: datetime, until: datetime) -> Set[int]:
+    """Ids TMDB reports as edited in [since, until], split into 14-day windows."""
+    windows = []
+    start = since
+    while start < until:
+        end = min(start + timedelta(days=MAX_CHANGES_WINDOW), until)
+        windows.append((start.strftime("%Y-%m-%d"), end.strftime("%Y-%m-%d")))
+        start = end
+
+    async def window(start_date, end_date):
+        first = await client.movie_changes(start_date, end_date)
+        pages = [first] + list(await asyncio.gather(*(
+            client.movie_changes(start_date, end_date, page)
+            for page in range(2, first.get("total_pages", 1) + 1)
+        )))
+        return {m["id"] for page in pages for m in page.get("results", []) if m.get("id")}
+
+    results = await asyncio.gather(*(window(s, e) for s, e in windows))
+    return set().union(*results)
+
+
+async def refetch(client: AsyncTMDBClient, crawler: Crawler, tracked: Set[int], stale: List[int],
+                  since: datetime, until: datetime) -> Dict[str, Any]:
+    changed = await changed_ids(client, since, until) & tracked
+    ids = list(dict.fromkeys(sorted(changed) + stale))
+    logger.info("Refetching %d movies (%d changed on TMDB, %d stale)", len(ids), len(changed), len(stale))
+    stats = await crawler.fetch(ids)
+    return {"changed_on_tmdb": len(changed), "stale": len(stale), "selected": len(ids), **stats}
+
+
+def update_data_file(path: str, updates: Dict[int, Dict[str, Any]]) -> None:
+    if not updates or not os.path.exists(path):
+        return
+    write_movies(path, (updates.get(movie.get("id"), movie) for movie in iter_movies(path)))
+
+
+def apply_updates(ingest: Ingest, updates: Dict[int, Dict[str, Any]], matrix=None) -> Dict[str, Any]:
+    """
+    Ingests refetched movies. When any was re-encoded or had its metadata
+    updated, rebuilds the movie matrix: the catalog size rarely changes, so
+    nothing else would tell it the vectors or filter fields did. Running
+    servers pick up the new files on their next freshness check.
+    """
+    stats = ingest.run_items(list(updates.values()))
+    if (stats["encoded"] or stats["updated"]) and matrix is not None:
+        matrix.invalidate()
+        matrix.ensure_fresh()
+    return stats
+
+
+def main():
+    logging.basicConfig(level=logging.INFO)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--max-age", type=float, default=30, help="Refetch movies older than this many days")
+    parser.add_argument("--max-stale", type=int, default=500, help="At most this many age-based refetches per run")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("TMDB_CRAWL_WORKERS", 16)))
+    parser.add_argument("--rate", type=float, default=TMDB_RATE_LIMIT, help="Requests per second")
+    parser.add_argument("--state", default=STATE_PATH)
+    parser.add_argument("--work-dir", default=WORK_DIR)
+    parser.add_argument("--data-file", default=DATA_FILE)
+    parser.add_argument("--dry-run", action="store_true", help="Only report what would be refetched")
+    args = parser.parse_args()
+
+    start_time = time.time()
+    state = CatalogState(args.state)
+    collection = user.get_collection("movies")
+    newly_tracked = track_new_movies(state, collection)
+
+    now = datetime.now(timezone.utc)
+    last_refresh = state.get_meta("last_refresh")
+    since = datetime.fromisoformat(last_refresh) if last_refresh else now - timedelta(days=1)
+    tracked = state.ids()
+    stale = state.stale(time.time() - args.max_age * 86400, args.max_stale)
+
+    client = AsyncTMDBClient(
+        os.getenv("TMDB_BEARER"),
+        max_concurrency=int(os.getenv("TMDB_MAX_CONCURRENCY", 20)),
+        rate_limiter=TokenBucket(args.rate, TMDB_RATE_BURST),
+    )
+    if args.dry_run:
+
+        async def preview():
+            try:
+                return await changed_ids(client, since, now)
+            finally:
+                await client.aclose()
+
+        changed = asyncio.run(preview()) & tracked
+        print(json.dumps({"tracked": len(tracked), "changed_on_tmdb": len(changed), "stale": len(stale)}, indent=2))
+        return
+
+    crawler = Crawler(client, args.work_dir, workers=args.workers)
+    fetch_stats = asyncio.run(refetch(client, crawler, tracked, stale, since, now))
+
+    # Only movies whose TMDB record changed go through ingest; of those,
+    # only the ones whose document text changed get re-encoded
+    hashes = state.hashes()
+    fetched_at = time.time()
+    updates = {}
+    entries = []
+    for movie in crawler.iter_movies():
+        new_hash = content_hash(movie)
+        if hashes.get(movie["id"]) != new_hash:
+            updates[movie["id"]] = movie
+        entries.append((movie["id"], fetched_at, new_hash))
+
+    # Only rebuilt if something built it before (the numpy backend or batch recs)
+    matrix = user.get_movie_matrix() if os.path.isdir(user.INDEX_PATH) else None
+    try:
+        ingest_stats = apply_updates(Ingest(collection), updates, matrix)
+    finally:
+        user.close_encoder()
+    update_data_file(args.data_file, updates)
+
+    state.record(entries)
+    state.set_meta("last_refresh", now.isoformat())
+    state.close()
+    shutil.rmtree(args.work_dir, ignore_errors=True)
+    user.close_chroma_client()
+
+    duration = time.time() - start_time
+    logger.info(
+        "action refresh_catalog | duration %.4fs | tracked %d (+%d new) | refetched %d | content changed %d | encoded %d | updated %d",
+        duration, len(tracked), newly_tracked, len(entries), len(updates), ingest_stats["encoded"], ingest_stats["updated"],
+    )
+    print(json.dumps({
+        "tracked": len(tracked),
+        "newly_tracked": newly_tracked,
+        **fetch_stats,
+        "content_changed": len(updates),
+        "ingest": ingest_stats,
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Blended ranking of a search candidate pool.
+
+Each candidate's score is a weighted sum of signals that are all scaled into
+[0, 1] on an absolute scale, not relative to the pool, so scores compare
+across requests:
+
+    similarity  cosine similarity to the user, from the backend's distance
+                (both backends return 2 - 2cos for normalized embeddings)
+    keywords    keyword overlap with the user, normalized per user
+                (MovieCatalog.keyword_scores)
+    popularity  log TMDB popularity, saturating at POPULARITY_SCALE
+    rating      vote average shrunk toward RATING_PRIOR_MEAN for movies with
+                few votes
+    recency     halves every RECENCY_HALF_LIFE years since release
+
+Default weights come from RECC_WEIGHT_* settings; a request can override any
+of them (parse_weights), e.g. for A/B tests.
+
+Every signal but keywords comes straight from the distance and the movie's
+record, so rank() computes that base score for the whole pool at once.
+Keyword overlap (a sparse product per candidate) adds at most the keywords
+weight, so rank() walks the pool by descending base score, adds keyword
+scores a chunk at a time and stops once no later candidate's base plus that
+weight can beat the current k-th best. Without user keywords the base score
+is final, so it stops as soon as top_k candidates are in. search_movies
+draws on a smaller pool (pool_size) than the old overlap-first sort needed.
+"""
+
+import dataclasses
+import logging
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("recc-engine.scoring")
+
+WEIGHT_SIMILARITY = float(os.getenv("RECC_WEIGHT_SIMILARITY", 1.0))
+WEIGHT_KEYWORDS = float(os.getenv("RECC_WEIGHT_KEYWORDS", 0.3))
+WEIGHT_POPULARITY = float(os.getenv("RECC_WEIGHT_POPULARITY", 0.1))
+WEIGHT_RATING = float(os.getenv("RECC_WEIGHT_RATING", 0.1))
+WEIGHT_RECENCY = float(os.getenv("RECC_WEIGHT_RECENCY", 0.05))
+
+POPULARITY_SCALE = 1000.0
+RATING_PRIOR_MEAN = 6.0
+RATING_PRIOR_VOTES = 100
+RECENCY_HALF_LIFE = 10.0
+
+# Candidates scored per step before checking whether the rest can matter
+RANK_CHUNK = 64
+# Pool fetched from the backend: top_k plus a margin for reranking to draw on
+POOL_MARGIN = float(os.getenv("RECC_RERANK_POOL_MARGIN", 0.5))
+POOL_MIN_MARGIN = int(os.getenv("RECC_RERANK_POOL_MIN_MARGIN", 50))
+MAX_POOL = 3000
+
+
+@dataclass(frozen=True)
+class ScoringWeights:
+    similarity: float = WEIGHT_SIMILARITY
+    keywords: float = WEIGHT_KEYWORDS
+    popularity: float = WEIGHT_POPULARITY
+    rating: float = WEIGHT_RATING
+    recency: float = WEIGHT_RECENCY
+
+    def __post_init__(self) -> None:
+        # Non-negative weights keep rank()'s early exit sound
+        for name, value in self.to_dict().items():
+            if not value >= 0:
+                raise ValueError(f"Scoring weight {name} must be >= 0, got {value}")
+
+    def to_dict(self) -> Dict[str, float]:
+        return dataclasses.asdict(self)
+
+    def override(self, overrides: Dict[str, float]) -> "ScoringWeights":
+        unknown = set(overrides) - set(self.to_dict())
+        if unknown:
+            raise ValueError(f"Unknown scoring weights: {', '.join(sorted(unknown))}")
+        return dataclasses.replace(self, **overrides)
+
+
+DEFAULT_WEIGHTS = ScoringWeights()
+
+
+def parse_weights(spec: Optional[str], base: ScoringWeights = DEFAULT_WEIGHTS) -> ScoringWeights:
+    """'keywords=0.5,recency=0' -> base with those weights replaced."""
+    if not spec:
+        return base
+    overrides = {}
+    for part in spec.split(","):
+        name, sep, value = part.partition("=")
+        if not sep:
+            raise ValueError(f"Expected name=value, got {part!r}")
+        try:
+            overrides[name.strip()] = float(value)
+        except ValueError:
+            raise ValueError(f"Weight {name.strip()} is not a number: {value!r}")
+    return base.override(overrides)
+
+
+def pool_size(top_k: int) -> int:
+    return min(top_k + max(int(top_k * POOL_MARGIN), POOL_MIN_MARGIN), MAX_POOL)
+
+
+def similarity_from_distance(dists: np.ndarray) -> np.ndarray:
+    return np.clip(1.0 - dists / 2.0, 0.0, 1.0)
+
+
+def blend(records, similarity: np.ndarray, keywords: np.ndarray, weights: ScoringWeights,
+          current_year: int) -> np.ndarray:
+    """Scores for records (MovieRecords) given their similarity and keyword signals."""
+    n = len(records)
+    popularity = np.fromiter((r.popularity for r in records), dtype=np.float64, count=n)
+    vote_average = np.fromiter((r.vote_average for r in records), dtype=np.float64, count=n)
+    vote_count = np.fromiter((r.vote_count for r in records), dtype=np.float64, count=n)
+    year = np.fromiter((r.year or 0 for r in records), dtype=np.float64, count=n)
+
+    score = weights.similarity * similarity + weights.keywords * keywords
+    if weights.popularity:
+        score += weights.popularity * np.minimum(np.log1p(popularity) / np.log1p(POPULARITY_SCALE), 1.0)
+    if weights.rating:
+        rating = (vote_count * vote_average + RATING_PRIOR_VOTES * RATING_PRIOR_MEAN) / (vote_count + RATING_PRIOR_VOTES)
+        score += weights.rating * np.clip(rating / 10.0, 0.0, 1.0)
+    if weights.recency:
+        age = np.maximum(current_year - year, 0.0)
+        score += weights.recency * np.where(year > 0, 0.5 ** (age / RECENCY_HALF_LIFE), 0.0)
+    return score
+
+
+def rank(ids: List[str], dists, top_k: int, catalog, user_keywords=None,
+         keyword_weighting: Optional[str] = None, weights: ScoringWeights = DEFAULT_WEIGHTS,
+         chunk_size: int = RANK_CHUNK) -> Tuple[List[int], np.ndarray]:
+    """
+    Returns the positions in ids of the top_k candidates by blended score,
+    best first (ties keep pool order), and their scores. Ids the catalog
+    doesn't know are skipped.
+    """
+    start_time = time.time()
+    similarity = similarity_from_distance(np.asarray(dists, dtype=np.float64))
+    current_year = datetime.now().year
+    use_keywords = bool(user_keywords) and weights.keywords > 0
+    kw_args = (keyword_weighting,) if keyword_weighting else ()
+
+    found = {r.id: r for r in catalog.get_many(ids)}
+    keep = np.array([i for i, mid in enumerate(ids) if mid in found], dtype=np.int64)
+    base = blend([found[ids[i]] for i in keep], similarity[keep], np.zeros(len(keep)), weights, current_year)
+    # Best base score first, pool order among ties
+    order = np.lexsort((keep, -base))
+    keyword_bound = weights.keywords if use_keywords else 0.0
+
+    best = np.empty(0, dtype=np.float64)
+    best_pos = np.empty(0, dtype=np.int64)
+    examined = 0
+    while examined < len(order) and top_k > 0:
+        chunk = order[examined:examined + chunk_size]
+        examined += len(chunk)
+        scores = base[chunk]
+        if use_keywords:
+            kept_ids = [ids[i] for i in keep[chunk]]
+            scores = scores + weights.keywords * catalog.keyword_scores(
+                kept_ids, user_keywords, *kw_args, normalize=True
+            )
+        best = np.concatenate([best, scores])
+        best_pos = np.concatenate([best_pos, keep[chunk]])
+        if len(best) > top_k:
+            top = np.argpartition(-best, top_k - 1)[:top_k]
+            best, best_pos = best[top], best_pos[top]
+        # Early exit: the rest score at most their base plus the keyword weight
+        if examined < len(order) and len(best) >= top_k:
+            if best.min() > base[order[examined]] + keyword_bound:
+                break
+
+    order = np.lexsort((best_pos, -best))
+    duration = time.time() - start_time
+    logger.info(
+        "action rank | duration %.4fs | pool %d | examined %d | top_k %d",
+        duration, len(ids), examined, top_k,
+    )
+    return best_pos[order].tolist(), best[order]
@@ -0,0 +1,133 @@
+"""
+Startup phases and readiness reporting.
+
+app.py only imports what the cheap routes need, so the server starts
+accepting requests right away. Heavy subsystems (Chroma, the movie catalog
+and search index, the embedding model, Apple's signing keys) are loaded one
+phase at a time by a background warm-up thread. Each phase's state and load
+duration is reported by /healthz and /readyz.
+
+A request that needs a subsystem before its phase has run still works: every
+subsystem is lazily created behind a lock, so the request just loads it
+itself and the phase finds it ready.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger("recc-engine.startup")
+
+PENDING = "pending"
+LOADING = "loading"
+READY = "ready"
+FAILED = "failed"
+
+
+class Phase:
+    def __init__(self, name: str, fn: Callable[[], Any], required: bool = True) -> None:
+        self.name = name
+        self.fn = fn
+        # Optional phases (e.g. anything that depends on the network) are
+        # reported but don't hold back readiness
+        self.required = required
+        self.state = PENDING
+        self.started_at: Optional[float] = None
+        self.duration: Optional[float] = None
+        self.error: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        duration = self.duration
+        if self.state == LOADING:
+            duration = time.time() - self.started_at
+        return {
+            "state": self.state,
+            "required": self.required,
+            "duration": round(duration, 4) if duration is not None else None,
+            "error": self.error,
+        }
+
+
+class Startup:
+    def __init__(self) -> None:
+        self.started_at = time.time()
+        self._phases: "OrderedDict[str, Phase]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopping = threading.Event()
+
+    def record(self, name: str, duration: float) -> None:
+        """Records a phase that already ran, e.g. module imports."""
+        phase = Phase(name, lambda: None)
+        phase.state = READY
+        phase.started_at = time.time() - duration
+        phase.duration = duration
+        with self._lock:
+            self._phases[name] = phase
+
+    def add(self, name: str, fn: Callable[[], Any], required: bool = True) -> None:
+        with self._lock:
+            self._phases[name] = Phase(name, fn, required)
+
+    def _run_phase(self, phase: Phase) -> None:
+        phase.started_at = time.time()
+        phase.state = LOADING
+        try:
+            phase.fn()
+        except Exception as e:
+            phase.duration = time.time() - phase.started_at
+            phase.error = str(e)
+            phase.state = FAILED
+            log = logger.error if phase.required else logger.warning
+            log(f"Startup phase {phase.name} failed after {phase.duration:.4f}s: {e}")
+            return
+        phase.duration = time.time() - phase.started_at
+        phase.state = READY
+        logger.info("action startup_%s | duration %.4fs", phase.name, phase.duration)
+
+    def run(self) -> None:
+        """Runs every pending phase in order. A failed phase doesn't stop the rest."""
+        with self._lock:
+            pending = [p for p in self._phases.values() if p.state == PENDING]
+        for phase in pending:
+            if self._stopping.is_set():
+                return
+            self._run_phase(phase)
+        logger.info(
+            "action startup | duration %.4fs | ready %s", time.time() - self.started_at, self.ready()
+        )
+
+    def start(self) -> None:
+        """Runs the pending phases on a background thread."""
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self.run, name="warm-up", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Skips phases that haven't started and waits briefly for the current one."""
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=timeout)
+            self._thread = None
+
+    def ready(self) -> bool:
+        with self._lock:
+            return all(p.state == READY for p in self._phases.values() if p.required)
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            phases = {name: phase.to_dict() for name, phase in self._phases.items()}
+        if self.ready():
+            status = READY
+        elif any(p["state"] == FAILED and p["required"] for p in phases.values()):
+            status = FAILED
+        else:
+            status = LOADING
+        return {
+            "status": status,
+            "ready": self.ready(),
+            "uptime": round(time.time() - self.started_at, 4),
+            "phases": phases,
+        }
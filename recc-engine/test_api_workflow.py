@@ -95,13 +95,17 @@ def main():
     # 8. Get Recommendations
     run_test("Get Recommendations", "GET", f"/users/{TEST_USER}/recommendations?top_k=5")
 
+    # 9. Batch Recommendations (precompute, then served from the store)
+    run_test("Batch Recommendations", "POST", "/recommendations/batch", {"user_ids": [TEST_USER], "top_k": 10})
+    run_test("Get Precomputed Recommendations", "GET", f"/users/{TEST_USER}/recommendations?top_k=5")
+
     print("\n--- Tests Complete ---")
     
     # Cleanup
     print("\nShutting down server...")
     os.killpg(os.getpgid(server_process.pid), signal.SIGTERM)
     
-    user_file = f"users/{TEST_USER}.json"
+    user_file = f"users/{TEST_USER}.json"  # only exists with RECC_PROFILE_STORE=json
     if os.path.exists(user_file):
         os.remove(user_file)
         print(f"Cleaned up test user file: {user_file}")
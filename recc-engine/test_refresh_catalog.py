@@ -0,0 +1,119 @@
+"""
+Delta refresh keeps the NumPy movie matrix in step with Chroma.
+
+Runs against an in-memory stand-in for the Chroma collection and a fake
+encoder, so it needs neither a Chroma store nor the embedding model:
+
+    python -m pytest test_refresh_catalog.py
+"""
+
+import numpy as np
+
+import user
+from catalog import MovieCatalog
+from ingest import Ingest
+from movie_store import MovieStore
+from refresh_catalog import apply_updates
+from vector_index import NumpySearchBackend
+
+
+class FakeCollection:
+    """The slice of Chroma's collection API that ingest and the index use."""
+
+    def __init__(self):
+        self.rows = {}
+
+    def count(self):
+        return len(self.rows)
+
+    def get(self, ids=None, limit=None, offset=0, include=()):
+        keys = [i for i in ids if i in self.rows] if ids is not None else sorted(self.rows)
+        if ids is None and limit is not None:
+            keys = keys[offset:offset + limit]
+        return {
+            "ids": keys,
+            "embeddings": [self.rows[k]["embedding"] for k in keys],
+            "documents": [self.rows[k]["document"] for k in keys],
+            "metadatas": [dict(self.rows[k]["metadata"]) for k in keys],
+        }
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        for i, embedding, metadata, document in zip(ids, embeddings, metadatas, documents):
+            metadata = {k: v for k, v in metadata.items() if v is not None}
+            self.rows[i] = {"embedding": list(embedding), "metadata": metadata, "document": document}
+
+    def update(self, ids, metadatas):
+        for i, metadata in zip(ids, metadatas):
+            merged = {**self.rows[i]["metadata"], **metadata}
+            self.rows[i]["metadata"] = {k: v for k, v in merged.items() if v is not None}
+
+
+def fake_encode(texts):
+    # Deterministic, text-dependent 8-d vectors
+    return [np.random.default_rng(abs(hash(t)) % 2**32).standard_normal(8).tolist() for t in texts]
+
+
+def movie(movie_id, overview):
+    return {
+        "id": movie_id,
+        "title": f"Movie {movie_id}",
+        "overview": overview,
+        "genres": [{"id": 18, "name": "Drama"}],
+        "keywords": [{"id": 1, "name": "family"}],
+        "original_language": "en",
+        "release_date": "2001-01-01",
+    }
+
+
+def test_refresh_rebuilds_matrix_rows(tmp_path, monkeypatch):
+    monkeypatch.setattr(user, "encode_documents", fake_encode)
+    collection = FakeCollection()
+    store = MovieStore(str(tmp_path / "movie_store.npz"))
+    Ingest(collection, store=store).run_items([movie(1, "A quiet drama."), movie(2, "Another one.")])
+
+    matrix = NumpySearchBackend(lambda: collection, MovieCatalog(lambda: collection, store),
+                                index_path=str(tmp_path / "index"))
+    matrix.ensure_fresh()
+    before = np.array(matrix.snapshot.matrix[matrix.snapshot.row_of["1"]])
+
+    stats = apply_updates(Ingest(collection, store=store), {1: movie(1, "Rewritten overview.")}, matrix)
+
+    assert stats["encoded"] == 1
+    assert collection.count() == 2
+    after = np.array(matrix.snapshot.matrix[matrix.snapshot.row_of["1"]])
+    assert not np.allclose(before, after)
+    expected = np.asarray(collection.rows["1"]["embedding"], dtype=np.float32)
+    assert np.allclose(after, expected / np.linalg.norm(expected), atol=1e-6)
+
+    # A fresh process maps the rebuilt files rather than the old ones
+    reopened = NumpySearchBackend(lambda: collection, MovieCatalog(lambda: collection, store),
+                                  index_path=str(tmp_path / "index"))
+    reopened.ensure_fresh()
+    assert np.allclose(reopened.snapshot.matrix[reopened.snapshot.row_of["1"]], after)
+
+
+def test_metadata_only_refresh_updates_filter_columns(tmp_path, monkeypatch):
+    monkeypatch.setattr(user, "encode_documents", fake_encode)
+    collection = FakeCollection()
+    store = MovieStore(str(tmp_path / "movie_store.npz"))
+    undated = {**movie(1, "A quiet drama."), "release_date": None}
+    Ingest(collection, store=store).run_items([undated, movie(2, "Another one.")])
+
+    matrix = NumpySearchBackend(lambda: collection, MovieCatalog(lambda: collection, store),
+                                index_path=str(tmp_path / "index"))
+    matrix.ensure_fresh()
+    assert not matrix.snapshot.filter_mask(min_year=2020)[matrix.snapshot.row_of["1"]]
+
+    dated = {**undated, "release_date": "2024-05-01", "original_language": "fr"}
+    stats = apply_updates(Ingest(collection, store=store), {1: dated}, matrix)
+
+    assert stats["encoded"] == 0 and stats["updated"] == 1
+    snap = matrix.snapshot
+    assert snap.filter_mask(min_year=2020)[snap.row_of["1"]]
+    assert snap.filter_mask(language="fr")[snap.row_of["1"]]
+
+    # The new filter fields change the fingerprint, so the old files can't be reused
+    reopened = NumpySearchBackend(lambda: collection, MovieCatalog(lambda: collection, store),
+                                  index_path=str(tmp_path / "index"))
+    reopened.ensure_fresh()
+    assert reopened.snapshot.filter_mask(min_year=2020)[reopened.snapshot.row_of["1"]]
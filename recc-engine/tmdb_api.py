@@ -2,37 +2,119 @@
 TMDB API custom wrapper.
 This module replaces the 'tmdbsimple' dependency with a direct requests-based client
 to avoid conflicts and maintain a lightweight implementation.
+
+AsyncTMDBClient is the httpx-based counterpart used by async route handlers:
+one keep-alive connection pool, bounded concurrency and retry with backoff
+when TMDB answers 429. Bulk jobs (crawler.py) also give it a TokenBucket so
+they stay under TMDB's request rate instead of leaning on 429s.
 """
 
-import requests
-from typing import Optional, List, Dict, Any
+import asyncio
+import logging
+import os
+import random
+import time
+
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TYPE_CHECKING, Optional, List, Dict, Any
+
+if TYPE_CHECKING:
+    import httpx
+
+logger = logging.getLogger("recc-engine.tmdb")
+
+TMDB_BASE_URL = os.getenv("TMDB_BASE_URL", "https://api.themoviedb.org/3/")
+
+# Statuses worth retrying: rate limiting and transient upstream failures
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# TMDB allows roughly 50 requests/s per IP; stay a little under it
+TMDB_RATE_LIMIT = float(os.getenv("TMDB_RATE_LIMIT", 40))
+TMDB_RATE_BURST = int(os.getenv("TMDB_RATE_BURST", 20))
+
+# Longest wait before a retry. A Retry-After past it fails the request rather
+# than parking it (and the caller waiting on it) for minutes.
+MAX_RETRY_DELAY = float(os.getenv("TMDB_MAX_RETRY_DELAY", 60))
+
+
+def _parse_retry_after(value: str) -> Optional[float]:
+    """Seconds from a Retry-After header (delay-seconds or HTTP-date), or None."""
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+class TokenBucket:
+    """
+    Async rate limiter: allows `rate` acquisitions per second on average and
+    bursts of up to `burst` after an idle period.
+    """
+
+    def __init__(self, rate: float = TMDB_RATE_LIMIT, burst: int = TMDB_RATE_BURST) -> None:
+        self.rate = rate
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock: Optional[asyncio.Lock] = None
+        self.acquired = 0
+        self.waited = 0.0
+
+    async def acquire(self) -> None:
+        # Created lazily so it binds to the running event loop
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    self.acquired += 1
+                    return
+                delay = (1 - self._tokens) / self.rate
+                self.waited += delay
+                await asyncio.sleep(delay)
 
 
 class TMDBClient:
     """Small convenience wrapper to keep TMDB calls in one place."""
 
-    def __init__(self, api_key: Optional[str] = None) -> None:
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None) -> None:
         self._api_key = api_key
-        self._base_url = "https://api.themoviedb.org/3/"
+        self._base_url = base_url or TMDB_BASE_URL
         self.header = {"Authorization": f"Bearer {self._api_key}"}
+        # Reuse connections across calls instead of a new handshake per request.
+        # requests is only needed by the sync scripts, so the API never imports it.
+        import requests
+
+        self._session = requests.Session()
+        self._session.headers.update(self.header)
 
     def _get(
         self, endpoint: str, params: Optional[Dict[str, Any]] = None
     ) -> Dict[str, Any]:
-        response = requests.get(
-            url=self._base_url + endpoint, headers=self.header, params=params
-        )
+        response = self._session.get(url=self._base_url + endpoint, params=params)
         response.raise_for_status()
         return response.json()
 
     def movie_details(self, movie_id: int) -> Dict[str, Any]:
-        return self._get(f"movie/{movie_id}?language=en-US")
+        return self._get(f"movie/{movie_id}", params={"language": "en-US"})
 
     def movie_details_batch(self, movie_ids: List[int]) -> List[Dict[str, Any]]:
         """
         Fetches details for multiple movies.
         Note: TMDB does not have a batch endpoint, so this loops.
-        For production, this should be cached or rate-limited.
+        Async handlers should use AsyncTMDBClient.movie_details_batch instead.
         """
         results = []
         for mid in movie_ids:
@@ -52,3 +134,157 @@ class TMDBClient:
         params example: {"primary_release_year": 1999, "with_genres": 27}
         """
         return self._get("discover/movie", params=params)
+
+
+class AsyncTMDBClient:
+    """
+    Async TMDB client.
+    Holds a single httpx.AsyncClient (keep-alive pool), caps in-flight requests
+    with a semaphore and retries 429/5xx with exponential backoff, honouring
+    Retry-After when TMDB sends it. Waits are capped at MAX_RETRY_DELAY; a
+    longer Retry-After fails the request instead.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        max_concurrency: int = 10,
+        max_retries: int = 4,
+        backoff: float = 0.5,
+        timeout: float = 10.0,
+        rate_limiter: Optional[TokenBucket] = None,
+    ) -> None:
+        self._api_key = api_key
+        self._base_url = base_url or TMDB_BASE_URL
+        self.header = {"Authorization": f"Bearer {self._api_key}"}
+        self._max_concurrency = max_concurrency
+        self._max_retries = max_retries
+        self._backoff = backoff
+        self._timeout = timeout
+        self._rate_limiter = rate_limiter
+        self.requests = 0
+        self.retries = 0
+        self._client: Optional["httpx.AsyncClient"] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_client(self) -> "httpx.AsyncClient":
+        # Created lazily so it binds to the running event loop. httpx is
+        # imported here too: it pulls in its CLI stack (rich, click) on import.
+        import httpx
+
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self._base_url,
+                headers=self.header,
+                timeout=self._timeout,
+                limits=httpx.Limits(
+                    max_connections=self._max_concurrency,
+                    max_keepalive_connections=self._max_concurrency,
+                ),
+            )
+            self._semaphore = asyncio.Semaphore(self._max_concurrency)
+        return self._client
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._semaphore = None
+
+    def _retry_delay(self, attempt: int, response: Optional["httpx.Response"]) -> Optional[float]:
+        """
+        Seconds to wait before the next attempt, or None when TMDB's
+        Retry-After is past MAX_RETRY_DELAY and the request should fail now.
+        """
+        retry_after = response.headers.get("Retry-After") if response is not None else None
+        if retry_after:
+            delay = _parse_retry_after(retry_after)
+            if delay is None:
+                logger.warning("Ignoring unparseable Retry-After %r, using backoff", retry_after)
+            elif delay > MAX_RETRY_DELAY:
+                return None
+            else:
+                return delay
+        return min(self._backoff * (2 ** attempt) + random.uniform(0, self._backoff), MAX_RETRY_DELAY)
+
+    async def _get(
+        self, endpoint: str, params: Optional[Dict[str, Any]] = None
+    ) -> Dict[str, Any]:
+        import httpx
+
+        client = self._get_client()
+        attempt = 0
+        while True:
+            response = None
+            try:
+                async with self._semaphore:
+                    if self._rate_limiter is not None:
+                        await self._rate_limiter.acquire()
+                    self.requests += 1
+                    response = await client.get(endpoint, params=params)
+                if response.status_code not in RETRY_STATUSES:
+                    response.raise_for_status()
+                    return response.json()
+            except httpx.TransportError:
+                if attempt >= self._max_retries:
+                    raise
+            if attempt >= self._max_retries:
+                response.raise_for_status()
+            delay = self._retry_delay(attempt, response)
+            if delay is None:
+                logger.warning(
+                    "TMDB %s returned %s with Retry-After %s, over the %.0fs cap; giving up",
+                    endpoint, response.status_code, response.headers["Retry-After"], MAX_RETRY_DELAY,
+                )
+                response.raise_for_status()
+            status = response.status_code if response is not None else "error"
+            logger.warning("TMDB %s returned %s, retrying in %.2fs", endpoint, status, delay)
+            self.retries += 1
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def movie_details(self, movie_id: int) -> Dict[str, Any]:
+        return await self._get(f"movie/{movie_id}", params={"language": "en-US"})
+
+    async def movie_details_batch(self, movie_ids: List[int]) -> List[Dict[str, Any]]:
+        """
+        Fetches details for multiple movies concurrently (bounded by max_concurrency).
+        Failed ids are logged and skipped; order follows movie_ids.
+        """
+        results = await asyncio.gather(
+            *(self.movie_details(mid) for mid in movie_ids), return_exceptions=True
+        )
+        details = []
+        for mid, result in zip(movie_ids, results):
+            if isinstance(result, Exception):
+                print(f"Failed to fetch details for {mid}: {result}")
+            else:
+                details.append(result)
+        return details
+
+    async def keywords(self, movie_id: int) -> Dict[str, Any]:
+        return await self._get(f"movie/{movie_id}/keywords")
+
+    async def movie_with_keywords(self, movie_id: int) -> Dict[str, Any]:
+        """
+        Details plus keywords in one request. The keywords are flattened to a
+        list, the shape data/movies.json has always stored.
+        """
+        details = await self._get(
+            f"movie/{movie_id}", params={"language": "en-US", "append_to_response": "keywords"}
+        )
+        details["keywords"] = (details.get("keywords") or {}).get("keywords", [])
+        return details
+
+    async def discover_movies(self, params: Dict[str, Any]) -> Dict[str, Any]:
+        return await self._get("discover/movie", params=params)
+
+    async def movie_changes(self, start_date: str, end_date: str, page: int = 1) -> Dict[str, Any]:
+        """
+        Wrapper for /movie/changes: ids of movies edited between the two
+        dates (YYYY-MM-DD, at most 14 days apart).
+        """
+        return await self._get(
+            "movie/changes", params={"start_date": start_date, "end_date": end_date, "page": page}
+        )
@@ -1,25 +1,206 @@
 import argparse
 import json
 import os
+import threading
 import time
 import logging
 
-import chromadb
-from sentence_transformers import SentenceTransformer
+import numpy as np
+
+from cache import LRUCache
+from catalog import KEYWORD_WEIGHTING, MovieCatalog
+from embedding_cache import EmbeddingCache
+from encoder import BatchEncoder
+from interactions import Interactions
+from profile_store import (
+    EventLogProfileStore,
+    JsonProfileStore,
+    SqliteProfileStore,
+    read_profile_file,
+    write_profile_file,
+)
+import scoring
+from vector_index import ChromaSearchBackend, NumpySearchBackend
 
 # Configure logging
 logger = logging.getLogger("recc-engine.user")
 
-# Global model instance
+# Global model instance, the micro-batcher every encode goes through and the
+# text -> vector cache in front of it
+EMBEDDING_MODEL_NAME = "all-MiniLM-L6-v2"
+
+# Inference backend: "torch" (SentenceTransformer) or "onnx" (ONNX Runtime on
+# CPU, int8-quantized by default; build the model dir with export_onnx.py)
+ENCODER_BACKEND = os.getenv("RECC_ENCODER_BACKEND", "torch")
+ONNX_MODEL_PATH = os.getenv("RECC_ONNX_MODEL_PATH", "models/all-MiniLM-L6-v2-onnx")
+ONNX_MODEL_FILE = os.getenv("RECC_ONNX_MODEL_FILE", "model_int8.onnx")
 _embedding_model = None
+_embedding_cache = None
+_encoder = None
+_encoder_lock = threading.RLock()
+
+# Shared Chroma client and collection handles (process-wide, lazily created)
+CHROMA_PATH = "chroma"
+_chroma_client = None
+_collections = {}
+_chroma_lock = threading.Lock()
+
+# Movie records from the movie store (and the 'movies' collection), built on first use
+_catalog = None
+
+# Which engine search_movies uses: "chroma" (HNSW) or "numpy" (exact, in memory)
+SEARCH_BACKEND = os.getenv("RECC_SEARCH_BACKEND", "chroma")
+INDEX_PATH = "index"
+_search_backend = None
+_movie_matrix = None
+
+USERS_PATH = "users"
+
+# Incremental user-vector updates on ratings: older signal fades by
+# VECTOR_DECAY per rating, and a dislike pushes away at DISLIKE_WEIGHT
+VECTOR_DECAY = float(os.getenv("RECC_VECTOR_DECAY", 0.95))
+DISLIKE_WEIGHT = float(os.getenv("RECC_DISLIKE_WEIGHT", 0.5))
+# Serializes read-modify-write of one user's vector (striped by user id)
+_vector_locks = [threading.Lock() for _ in range(64)]
+
+# Where profiles live: "sqlite" (one WAL database), "eventlog" (snapshots plus
+# an append-only log) or "json" (users/{id}.json files)
+PROFILE_STORE = os.getenv("RECC_PROFILE_STORE", "sqlite")
+PROFILE_DB_PATH = os.getenv("RECC_PROFILE_DB", "profiles.sqlite3")
+PROFILE_LOG_PATH = os.getenv("RECC_PROFILE_LOG", "profile_log")
+_profile_store = None
+_profile_lock = threading.Lock()
+
+# Interaction sets per user, kept in step with the store by record_* so the
+# recommendation path doesn't rebuild the exclusion set on every request
+_interactions = LRUCache(maxsize=int(os.getenv("RECC_INTERACTIONS_CACHE_SIZE", 1024)))
+
+
+def get_chroma_client():
+    global _chroma_client
+    if _chroma_client is None:
+        with _chroma_lock:
+            if _chroma_client is None:
+                # chromadb takes most of app.py's import time; load it here instead
+                import chromadb
+
+                logger.info("Opening Chroma store at %s", CHROMA_PATH)
+                _chroma_client = chromadb.PersistentClient(path=CHROMA_PATH)
+    return _chroma_client
+
+
+def get_collection(name):
+    """
+    Returns a cached handle to the named collection, creating it on first use.
+    """
+    collection = _collections.get(name)
+    if collection is None:
+        client = get_chroma_client()
+        with _chroma_lock:
+            collection = _collections.get(name)
+            if collection is None:
+                collection = client.get_or_create_collection(name=name)
+                _collections[name] = collection
+    return collection
+
+
+def get_catalog():
+    global _catalog
+    if _catalog is None:
+        with _chroma_lock:
+            if _catalog is None:
+                _catalog = MovieCatalog(lambda: get_collection("movies"))
+    return _catalog
+
+
+def get_movie_matrix():
+    """
+    Returns the in-memory NumPy index of movie embeddings. Used by the numpy
+    search backend and by batch scoring, whichever backend serves requests.
+    """
+    global _movie_matrix
+    if _movie_matrix is None:
+        catalog = get_catalog()
+        with _chroma_lock:
+            if _movie_matrix is None:
+                _movie_matrix = NumpySearchBackend(
+                    lambda: get_collection("movies"), catalog, index_path=INDEX_PATH
+                )
+    return _movie_matrix
+
+
+def get_search_backend():
+    global _search_backend
+    if _search_backend is None:
+        if SEARCH_BACKEND == "numpy":
+            backend = get_movie_matrix()
+        elif SEARCH_BACKEND == "chroma":
+            backend = ChromaSearchBackend(lambda: get_collection("movies"))
+        else:
+            raise ValueError(f"Unknown search backend: {SEARCH_BACKEND}")
+        with _chroma_lock:
+            if _search_backend is None:
+                _search_backend = backend
+    return _search_backend
+
+
+def open_collections():
+    """Opens the Chroma store and resolves the collections used by the API."""
+    for name in ("movies", "users"):
+        get_collection(name)
+
+
+def close_chroma_client():
+    global _chroma_client
+    with _chroma_lock:
+        client = _chroma_client
+        _chroma_client = None
+        _collections.clear()
+    if client is not None:
+        close = getattr(client, "close", None)
+        if close is not None:
+            close()
+        logger.info("Closed Chroma store at %s", CHROMA_PATH)
+
 
 def get_embedding_model():
     global _embedding_model
     if _embedding_model is None:
-        logger.info("Initializing SentenceTransformer model...")
-        _embedding_model = SentenceTransformer("all-MiniLM-L6-v2")
+        # The warm-up thread and an early request may both get here
+        with _encoder_lock:
+            if _embedding_model is None:
+                # Imported here so the ONNX backend never loads PyTorch
+                if ENCODER_BACKEND == "onnx":
+                    from onnx_encoder import OnnxSentenceEncoder
+
+                    logger.info("Initializing ONNX encoder from %s...", ONNX_MODEL_PATH)
+                    _embedding_model = OnnxSentenceEncoder(ONNX_MODEL_PATH, ONNX_MODEL_FILE)
+                else:
+                    from sentence_transformers import SentenceTransformer
+
+                    logger.info("Initializing SentenceTransformer model...")
+                    _embedding_model = SentenceTransformer(EMBEDDING_MODEL_NAME)
     return _embedding_model
 
+
+def warm_up_embedding_model():
+    """
+    Loads the embedding model and runs one encode through it, so the first
+    request doesn't pay for the model's lazy initialization either.
+    """
+    start_time = time.time()
+    get_embedding_model().encode(["warm up"])
+    get_encoder()
+    duration = time.time() - start_time
+    logger.info("action warm_up_embedding_model | duration %.4fs", duration)
+
+
+def embedding_model_key():
+    """Identifies the model producing vectors (name plus backend), for the embedding cache."""
+    if ENCODER_BACKEND == "onnx":
+        return f"{EMBEDDING_MODEL_NAME}+onnx:{ONNX_MODEL_FILE}"
+    return EMBEDDING_MODEL_NAME
+
 def build_user_text(profile):
     genres = profile.get("genres", [])
     # keys = profile.get("keywords", []) # Keywords used for reranking, not embedding
@@ -32,138 +213,166 @@ def build_user_text(profile):
 
 
 def load_user_profile(path):
-    with open(path, "r") as f:
-        data = json.load(f)
-    
-    if isinstance(data, list):
-        if not data:
-            raise ValueError(f"{path} is empty.")
-        profile = data[0]
-    elif isinstance(data, dict):
-        profile = data
-    else:
-        raise ValueError(f"{path} must be a JSON object or a list of objects.")
-    
-    # Ensure data structure exists
-    if "data" not in profile:
-        profile["data"] = {
-            "liked": [],
-            "disliked": [],
-            "neutral": [],
-            "watchlist": [],
-            "history": [],
-            "shown": []
-        }
-    else:
-        # Ensure all keys exist
-        required_keys = ["liked", "disliked", "neutral", "watchlist", "history", "shown"]
-        for key in required_keys:
-            if key not in profile["data"]:
-                profile["data"][key] = []
-                
-    return profile
+    return read_profile_file(path)
 
 def save_user_profile(path, profile):
-    # Check if original file was a list (simple heuristic or we could store this state)
-    # For now, we follow the convention of the existing files which seem to be lists.
-    # We can check the file content if we want to be 100% sure, but let's assume list for now 
-    # if that's the project standard, or check if the path exists and read it.
-    
-    # We will read the file first to preserve the structure (list vs dict)
-    is_list = True
-    if os.path.exists(path):
-        with open(path, "r") as f:
-            try:
-                data = json.load(f)
-                if isinstance(data, dict):
-                    is_list = False
-            except:
-                pass 
-    
-    output_data = [profile] if is_list else profile
-    
-    with open(path, "w") as f:
-        json.dump(output_data, f, indent=4)
+    write_profile_file(path, profile)
 
 def update_user_data(user_path, movie_id, action):
+    """Applies an interaction to a standalone profile file (see record_interaction for stored users)."""
     profile = load_user_profile(user_path)
-    data = profile["data"]
-    
-    try:
-        movie_id = int(movie_id)
-    except ValueError:
-        pass 
-
-    if action == "liked":
-        if movie_id not in data["liked"]:
-            data["liked"].append(movie_id)
-        # Liked implies history (watched/interacted) and shown
-        if movie_id not in data["history"]:
-            data["history"].append(movie_id)
-        if movie_id not in data["shown"]:
-            data["shown"].append(movie_id)
-        
-        # Remove from conflicting states
-        if movie_id in data["disliked"]:
-            data["disliked"].remove(movie_id)
-        if movie_id in data["neutral"]:
-            data["neutral"].remove(movie_id)
-            
-    elif action == "disliked":
-        if movie_id not in data["disliked"]:
-            data["disliked"].append(movie_id)
-        # Disliked implies history and shown
-        if movie_id not in data["history"]:
-            data["history"].append(movie_id)
-        if movie_id not in data["shown"]:
-            data["shown"].append(movie_id)
-            
-        # Remove from conflicting states
-        if movie_id in data["liked"]:
-            data["liked"].remove(movie_id)
-        if movie_id in data["neutral"]:
-            data["neutral"].remove(movie_id)
-
-    elif action == "neutral":
-        if movie_id not in data["neutral"]:
-            data["neutral"].append(movie_id)
-        # Neutral implies history (user rated it neutral) and shown
-        if movie_id not in data["history"]:
-            data["history"].append(movie_id)
-        if movie_id not in data["shown"]:
-            data["shown"].append(movie_id)
-            
-        # Remove from conflicting states
-        if movie_id in data["liked"]:
-            data["liked"].remove(movie_id)
-        if movie_id in data["disliked"]:
-            data["disliked"].remove(movie_id)
-            
-    elif action == "watchlist":
-        if movie_id not in data["watchlist"]:
-            data["watchlist"].append(movie_id)
-            
-    elif action == "history":
-        if movie_id not in data["history"]:
-            data["history"].append(movie_id)
-        if movie_id not in data["shown"]:
-            data["shown"].append(movie_id)
-            
-    elif action == "shown":
-        if movie_id not in data["shown"]:
-            data["shown"].append(movie_id)
-            
-    elif action == "remove_watchlist":
-         if movie_id in data["watchlist"]:
-            data["watchlist"].remove(movie_id)
-            
+    interactions = Interactions.from_data(profile["data"])
+    interactions.apply(movie_id, action)
+    profile["data"] = interactions.to_data()
     save_user_profile(user_path, profile)
     return profile
 
 
+def profile_path(user_id):
+    return os.path.join(USERS_PATH, f"{user_id}.json")
+
+
+def get_profile_store():
+    global _profile_store
+    if _profile_store is None:
+        with _profile_lock:
+            if _profile_store is None:
+                if PROFILE_STORE == "json":
+                    _profile_store = JsonProfileStore(USERS_PATH)
+                elif PROFILE_STORE == "eventlog":
+                    _profile_store = EventLogProfileStore(PROFILE_LOG_PATH, legacy_users_path=USERS_PATH)
+                else:
+                    _profile_store = SqliteProfileStore(PROFILE_DB_PATH, legacy_users_path=USERS_PATH)
+                logger.info("Using %s profile store", PROFILE_STORE)
+    return _profile_store
+
+
+def close_profile_store():
+    global _profile_store
+    with _profile_lock:
+        store = _profile_store
+        _profile_store = None
+    if store is not None:
+        store.close()
+
+
+def profile_exists(user_id):
+    return get_profile_store().exists(user_id)
+
+
+def load_profile(user_id):
+    """Raises KeyError if the user has no profile."""
+    start_time = time.time()
+    profile = get_profile_store().load(user_id)
+    duration = time.time() - start_time
+    logger.info("action load_profile | duration %.4fs", duration)
+    return profile
+
+
+def save_profile(user_id, profile):
+    get_profile_store().save(user_id, profile)
+    _interactions.pop(user_id)
+
+
+def create_profile(user_id, profile):
+    """Stores profile unless the user already exists. Returns True if it was created."""
+    return get_profile_store().create(user_id, profile)
+
+
+def update_profile_fields(user_id, **fields):
+    return get_profile_store().update_fields(user_id, **fields)
+
+
+def merge_keywords(user_id, keywords):
+    """Adds one to the profile's count of each keyword, atomically. Returns the merged counts."""
+    return get_profile_store().merge_keywords(user_id, keywords)
+
+
+def _update_cached_interactions(user_id, written, change):
+    """
+    Applies our own write to the cached Interactions if the cache was current
+    right before it; if someone else wrote in between, drops the entry.
+    """
+    cached = _interactions.get(user_id)
+    if cached is None:
+        return
+    if cached[0] is not None and cached[0] == written.previous:
+        change(cached[1])
+        _interactions.set(user_id, (written.updated_at, cached[1]))
+    else:
+        _interactions.pop(user_id)
+
+
+def record_interaction(user_id, movie_id, action):
+    """Applies a single interaction (liked, watchlist, ...) atomically and returns the updated profile."""
+    start_time = time.time()
+    written = get_profile_store().apply_action(user_id, movie_id, action)
+    _update_cached_interactions(user_id, written, lambda i: i.apply(movie_id, action))
+    duration = time.time() - start_time
+    logger.info("action record_interaction | duration %.4fs", duration)
+    return written.value
+
+
+def record_shown(user_id, movie_ids):
+    """Marks movies as shown. Returns the size of the shown list."""
+    movie_ids = list(movie_ids)
+    written = get_profile_store().add_shown(user_id, movie_ids)
+    _update_cached_interactions(user_id, written, lambda i: i.add_many("shown", movie_ids))
+    return written.value
+
+
+def get_interactions(user_id):
+    """
+    The user's Interactions, served from memory while the store hasn't been
+    written to by anyone else. Raises KeyError if the user has no profile.
+    """
+    store = get_profile_store()
+    updated_at = store.updated_at(user_id)
+    cached = _interactions.get(user_id)
+    if cached is not None and updated_at is not None and cached[0] == updated_at:
+        return cached[1]
+    # Stamped with updated_at as of before the read, so a write that lands
+    # during it makes the next call reload
+    loaded = store.load_interactions(user_id)
+    _interactions.set(user_id, (loaded.updated_at, loaded.value))
+    return loaded.value
+
+
+def profile_updated_at(user_id):
+    return get_profile_store().updated_at(user_id)
+
+
+def get_exclusion_ids(profile):
+    """
+    Movies the user has already seen or interacted with, as string ids.
+    For stored users prefer get_interactions(user_id).exclusion_set.
+    """
+    return Interactions.from_data(profile.get("data", {})).exclusion_set
+
+
+def get_keyword_counts(profile, limit=100):
+    """
+    The user's most frequent keywords with their counts, used for reranking.
+    """
+    raw_keywords = profile.get("keywords", {})
+    if isinstance(raw_keywords, list):
+        # Legacy: no frequencies, keep the first ones
+        return dict.fromkeys(raw_keywords[:limit], 1)
+    if isinstance(raw_keywords, dict):
+        sorted_kws = sorted(raw_keywords.items(), key=lambda item: item[1], reverse=True)
+        return dict(sorted_kws[:limit])
+    return {}
+
+
+def get_top_keywords(profile, limit=100):
+    """
+    The user's most frequent keywords, used for reranking.
+    """
+    return list(get_keyword_counts(profile, limit))
+
+
 def get_profile_from_db(user_id):
-    client = chromadb.PersistentClient(path="chroma")
-    collection = client.get_or_create_collection(name="users")
+    collection = get_collection("users")
     results = collection.get(
         ids=[user_id],
         include=["metadatas", "documents", "embeddings"],
@@ -173,18 +382,67 @@ def get_profile_from_db(user_id):
     return results
 
 
+def get_embedding_cache():
+    global _embedding_cache
+    if _embedding_cache is None:
+        with _encoder_lock:
+            if _embedding_cache is None:
+                _embedding_cache = EmbeddingCache(embedding_model_key())
+    return _embedding_cache
+
+
+def get_encoder():
+    global _encoder
+    if _encoder is None:
+        with _encoder_lock:
+            if _encoder is None:
+                _encoder = BatchEncoder(get_embedding_model, cache=get_embedding_cache())
+    return _encoder
+
+
+def close_encoder():
+    global _encoder
+    with _encoder_lock:
+        encoder, _encoder = _encoder, None
+    if encoder is not None:
+        encoder.close()
+    if _embedding_cache is not None:
+        _embedding_cache.close()
+
+
+def encode_texts(texts):
+    """Encodes many texts through the shared micro-batcher. One vector per text."""
+    return get_encoder().encode(texts)
+
+
+def encode_documents(texts):
+    """
+    Encodes catalog documents with the shared model directly. Skips the
+    micro-batcher and the embedding cache: each document is encoded once per
+    change, so caching it would only crowd out user and persona texts.
+    """
+    return get_embedding_model().encode(texts).tolist()
+
+
 def encode_user_text(text):
     start_time = time.time()
-    model = get_embedding_model()
-    encoding = model.encode([text]).tolist()
+    encoding = get_encoder().encode([text])
+    duration = time.time() - start_time
+    logger.info("action encode_user_text | duration %.4fs", duration)
+    return encoding
+
+
+async def encode_user_text_async(text):
+    """encode_user_text for async handlers: waits on the batcher without holding a thread."""
+    start_time = time.time()
+    encoding = await get_encoder().aencode([text])
     duration = time.time() - start_time
     logger.info("action encode_user_text | duration %.4fs", duration)
     return encoding
 
 
 def upsert_user_profile(user_id, text, embedding, profile):
-    client = chromadb.PersistentClient(path="chroma")
-    collection = client.get_or_create_collection(name="users")
+    collection = get_collection("users")
     collection.upsert(
         ids=[user_id],
         embeddings=embedding,
@@ -193,135 +451,151 @@ def upsert_user_profile(user_id, text, embedding, profile):
     )
 
 
-def search_movies(embedding, top_k, filters=None, exclude_ids=None, language=None, user_keywords=None, min_year=None):
+def get_movie_embedding(movie_id):
+    """
+    The stored (unit-length) embedding of a movie, or None if it isn't indexed.
+    Read from the in-memory matrix when it's loaded, otherwise from Chroma.
+    """
+    movie_id = str(movie_id)
+    if _movie_matrix is not None:
+        _movie_matrix.ensure_fresh()
+        snap = _movie_matrix.snapshot
+        row = snap.row_of.get(movie_id)
+        if row is not None:
+            return snap.matrix[row]
+    results = get_collection("movies").get(ids=[movie_id], include=["embeddings"])
+    if len(results["ids"]) == 0 or results["embeddings"][0] is None:
+        return None
+    vector = np.asarray(results["embeddings"][0], dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm > 0 else vector
+
+
+def update_user_vector(user_id, movie_id, action):
+    """
+    Moves the user's stored vector towards a liked movie (or away from a
+    disliked one) without running the text model:
+
+        W' = decay * W + |w|
+        v' = normalize((decay * W * v + w * m) / W')
+
+    where m is the movie's embedding, w is +1 for a like and -DISLIKE_WEIGHT
+    for a dislike, and W is the running weight kept in the user's metadata.
+    Returns False when there was nothing to update (no user vector yet, the
+    movie isn't indexed, or a neutral rating). Concurrent ratings by the
+    same user are applied one after the other, so none is lost.
+    """
+    weight = {"liked": 1.0, "disliked": -DISLIKE_WEIGHT}.get(action)
+    if not weight:
+        return False
+
     start_time = time.time()
-    client = chromadb.PersistentClient(path="chroma")
-    collection = client.get_or_create_collection(name="movies")
-    
-    conditions = []
-    
-    # Genre filters (OR)
-    if filters:
-        genre_conditions = [{f"is_{genre}": True} for genre in filters]
-        if len(genre_conditions) == 1:
-            conditions.append(genre_conditions[0])
-        else:
-            conditions.append({"$or": genre_conditions})
-            
-    # Language filter
-    if language:
-        conditions.append({"language": language})
-        
-    # Year Filter (Native)
-    if min_year:
-        conditions.append({"year": {"$gte": min_year}})
-
-    where_filter = None
-    if len(conditions) == 1:
-        where_filter = conditions[0]
-    elif len(conditions) > 1:
-        where_filter = {"$and": conditions}
-
-    # Dynamic Fetching: Ensure we have enough candidates after exclusion.
-    # We fetch: (items to exclude) + (items requested) + (safety buffer)
-    exclude_count = len(exclude_ids) if exclude_ids else 0
-    
-    # INCREASED FETCH SIZE FOR RERANKING
-    # We want a broad pool of "genre-relevant" movies to then filter by keyword overlap
-    fetch_k = exclude_count + top_k + 200 
-    fetch_k = min(max(fetch_k, 250), 3000)
-    
-    logger.info("action search_movies | where_filter: %s | fetch_k: %d", json.dumps(where_filter), fetch_k)
-    
-    results = collection.query(
-        query_embeddings=embedding,
-        n_results=fetch_k,
-        include=["metadatas", "distances", "documents"],
-        where=where_filter
+    movie_vector = get_movie_embedding(movie_id)
+    if movie_vector is None:
+        logger.info("No embedding for movie %s, user vector unchanged", movie_id)
+        return False
+    with _vector_locks[hash(user_id) % len(_vector_locks)]:
+        try:
+            current = get_profile_from_db(user_id)
+        except ValueError:
+            return False
+
+        metadata = dict(current["metadatas"][0] or {})
+        # The initial (persona/genre) vector counts as one observation
+        total = float(metadata.get("vector_weight", 1.0)) * VECTOR_DECAY
+        vector = np.asarray(current["embeddings"][0], dtype=np.float32)
+        updated = (total * vector + weight * movie_vector) / (total + abs(weight))
+        norm = np.linalg.norm(updated)
+        if norm > 0:
+            updated = updated / norm
+
+        metadata["vector_weight"] = total + abs(weight)
+        get_collection("users").update(
+            ids=[user_id], embeddings=[updated.tolist()], metadatas=[metadata]
+        )
+    duration = time.time() - start_time
+    logger.info("action update_user_vector | duration %.4fs", duration)
+    return True
+
+
+def search_movies(embedding, top_k, filters=None, exclude_ids=None, language=None, user_keywords=None, min_year=None,
+                  weights=None):
+    start_time = time.time()
+    backend = get_search_backend()
+
+    # Candidate pool for reranking. Exclusions are applied inside the backend,
+    # so the pool no longer has to grow with the user's history, and the
+    # blended score only needs a margin past top_k (scoring.pool_size).
+    if isinstance(exclude_ids, frozenset):
+        exclude_set = exclude_ids  # already string ids (Interactions.exclusion_set)
+    else:
+        exclude_set = {str(eid) for eid in exclude_ids} if exclude_ids else set()
+    fetch_k = scoring.pool_size(top_k)
+
+    logger.info("action search_movies | backend: %s | fetch_k: %d", backend.name, fetch_k)
+
+    ids, dists, docs = backend.query(
+        embedding,
+        fetch_k,
+        genres=filters,
+        language=language,
+        min_year=min_year,
+        exclude=exclude_set,
     )
 
-    # Candidates list
-    candidates = []
-    exclude_set = {str(eid) for eid in exclude_ids} if exclude_ids else set()
-    user_kw_set = set(user_keywords) if user_keywords else set()
-    
-    ids = results["ids"][0]
-    dists = results["distances"][0]
-    metas = results["metadatas"][0]
-    docs = results["documents"][0]
-    
-    for i in range(len(ids)):
-        mid = ids[i]
-        if mid in exclude_set:
-            continue
-            
-        meta = metas[i]
-        payload = json.loads(meta.get("payload", "{}"))
-        
-        # Calculate Keyword Overlap
-        overlap_count = 0
-        if user_kw_set:
-            # Movie keywords are a list of dicts: [{'id':..., 'name': '...'}, ...]
-            movie_kws_raw = payload.get("keywords", [])
-            movie_kw_names = set()
-            for mk in movie_kws_raw:
-                if isinstance(mk, dict) and "name" in mk:
-                    movie_kw_names.add(mk["name"])
-                elif isinstance(mk, str):
-                    movie_kw_names.add(mk)
-            
-            overlap_count = len(user_kw_set.intersection(movie_kw_names))
-            
-        candidates.append({
-            "id": mid,
-            "distance": dists[i],
-            "metadata": meta,
-            "document": docs[i],
-            "overlap": overlap_count
-        })
+    new_results = rerank_candidates(ids, dists, docs, top_k, user_keywords, weights=weights)
 
-    # RERANKING LOGIC
-    # Primary Sort: Overlap Count (Descending) -> Higher is better
-    # Secondary Sort: Vector Distance (Ascending) -> Lower is better
-    # To combine, we sort by tuple: (-overlap, distance)
-    candidates.sort(key=lambda x: (-x["overlap"], x["distance"]))
-    
-    # Slice top_k
-    final_candidates = candidates[:top_k]
-    
-    # Reconstruct result format
-    new_results = {
-        "ids": [[c["id"] for c in final_candidates]],
-        "distances": [[c["distance"] for c in final_candidates]],
-        "metadatas": [[c["metadata"] for c in final_candidates]],
-        "documents": [[c["document"] for c in final_candidates]]
-    }
-            
     duration = time.time() - start_time
     logger.info("action search_movies | duration %.4fs | exclude_count %d | candidates_reranked %d", 
-                duration, len(exclude_ids) if exclude_ids else 0, len(candidates))
+                duration, len(exclude_set), len(ids))
     return new_results
 
+
+def slice_results(results, start, stop):
+    """
+    Returns rows [start:stop) of a search_movies-shaped result.
+    """
+    return {key: [values[0][start:stop]] for key, values in results.items()}
+
+
+def rerank_candidates(ids, dists, docs, top_k, user_keywords=None, keyword_weighting=None, weights=None):
+    """
+    Ranks a backend candidate pool (ascending distance) by the blended score
+    in scoring.py and returns the top_k in search_movies' result format, with
+    each movie's score under "scores". user_keywords is a list of names or a
+    {name: count} dict (get_keyword_counts); weights defaults to the
+    RECC_WEIGHT_* settings.
+    """
+    catalog = get_catalog()
+    positions, scores = scoring.rank(
+        ids, dists, top_k, catalog,
+        user_keywords=user_keywords,
+        keyword_weighting=keyword_weighting or KEYWORD_WEIGHTING,
+        weights=weights or scoring.DEFAULT_WEIGHTS,
+    )
+    records = {r.id: r for r in catalog.get_many([ids[i] for i in positions])}
+
+    # Reconstruct result format
+    return {
+        "ids": [[ids[i] for i in positions]],
+        "distances": [[dists[i] for i in positions]],
+        "metadatas": [[records[ids[i]].to_metadata() for i in positions]],
+        "documents": [[docs[i] for i in positions]],
+        "scores": [[round(float(score), 6) for score in scores]],
+    }
+
+
 def get_movies_by_ids(movie_ids):
     """
-    Retrieves movies by their IDs from the Chroma DB.
+    Retrieves movies by their IDs from the catalog index (backed by the movie store).
+    Metadata is the catalog record, not raw Chroma metadata.
     """
-    client = chromadb.PersistentClient(path="chroma")
-    collection = client.get_or_create_collection(name="movies")
-    
-    str_ids = [str(mid) for mid in movie_ids]
-    results = collection.get(ids=str_ids)
-    
     movies = []
-    if results and results["ids"]:
-        ids = results["ids"]
-        metas = results["metadatas"]
-        
-        for i, mid in enumerate(ids):
-            movies.append({
-                "id": mid,
-                "metadata": metas[i]
-            })
+    for record in get_catalog().get_many(movie_ids):
+        movies.append({
+            "id": record.id,
+            "metadata": record.to_metadata()
+        })
             
     return movies
 
@@ -357,9 +631,8 @@ def main():
     results = search_movies(embedding, args.top_k, filters=filters, user_keywords=user_keywords)
     for idx, movie_id in enumerate(results["ids"][0]):
         metadata = results["metadatas"][0][idx]
-        payload = json.loads(metadata.get("payload", "{}"))
-        title = payload.get("title", "Unknown")
-        backdrop = payload.get("backdrop_path", "No Backdrop")
+        title = metadata["title"]
+        backdrop = metadata["backdrop_path"] or "No Backdrop"
         score = results["distances"][0][idx]
         # Calculate overlap for display (re-calculate or trust the sort order)
         # Since search_movies doesn't return the overlap count explicitly in the standard dict, 
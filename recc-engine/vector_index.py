@@ -0,0 +1,424 @@
+"""
+Search backends for user.search_movies.
+
+ChromaSearchBackend runs the query through Chroma's HNSW index with a
+'where' filter. NumpySearchBackend keeps the (small) catalog as a
+memory-mapped float32 matrix with genre/language/year columns next to it,
+and scores every movie exactly with one matrix-vector product.
+
+Both take an exclusion set of movie ids and return up to n_results
+non-excluded (ids, distances, documents) ordered by ascending distance, so
+callers never have to over-fetch to make up for a user's history.
+Distances are squared L2, which is what Chroma's default space reports; the
+NumPy backend normalises vectors first, so for unit-length MiniLM embeddings
+the two agree.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import AbstractSet, Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger("recc-engine.vector_index")
+
+SearchResult = Tuple[List[str], List[float], List[str]]
+
+# How often (seconds) the NumPy backend checks the collection for changes
+REFRESH_INTERVAL = 60
+PAGE_SIZE = 1000
+
+# Extra rows the Chroma backend asks for up front to absorb excluded ids
+EXCLUSION_HEADROOM = 100
+
+
+def catalog_fingerprint(ids: Sequence[str], metadatas: Sequence[Optional[dict]]) -> str:
+    """
+    Digest of every movie's id, document hash (ingest.doc_hash) and filter
+    fields (genre flags, language, year), so it changes when a movie is
+    added, removed, re-encoded from new text or re-filed under other filters.
+    """
+    digest = hashlib.sha256()
+    entries = []
+    for mid, meta in zip(ids, metadatas):
+        meta = meta or {}
+        genres = ",".join(sorted(key[3:] for key in meta if key.startswith("is_") and meta[key]))
+        fields = (mid, meta.get("doc_hash"), meta.get("language"), meta.get("year"), genres)
+        entries.append(":".join("" if f is None else str(f) for f in fields))
+    for entry in sorted(entries):
+        digest.update(entry.encode("utf-8") + b"\n")
+    return digest.hexdigest()[:32]
+
+
+def collection_fingerprint(collection) -> str:
+    """catalog_fingerprint of what the collection holds now (metadata only, no vectors)."""
+    ids, metadatas = [], []
+    offset = 0
+    while True:
+        results = collection.get(limit=PAGE_SIZE, offset=offset, include=["metadatas"])
+        if not results["ids"]:
+            break
+        ids.extend(results["ids"])
+        metadatas.extend(results["metadatas"])
+        offset += PAGE_SIZE
+    return catalog_fingerprint(ids, metadatas)
+
+
+class ChromaSearchBackend:
+    """Approximate search through the Chroma collection's HNSW index."""
+
+    name = "chroma"
+
+    def __init__(self, collection_getter: Callable) -> None:
+        self._collection_getter = collection_getter
+
+    def ensure_fresh(self) -> None:
+        pass
+
+    def query(
+        self,
+        embedding,
+        n_results: int,
+        genres: Optional[Sequence[str]] = None,
+        language: Optional[str] = None,
+        min_year: Optional[int] = None,
+        exclude: Optional[AbstractSet[str]] = None,
+    ) -> SearchResult:
+        conditions = []
+
+        # Genre filters (OR)
+        if genres:
+            genre_conditions = [{f"is_{genre}": True} for genre in genres]
+            if len(genre_conditions) == 1:
+                conditions.append(genre_conditions[0])
+            else:
+                conditions.append({"$or": genre_conditions})
+
+        # Language filter
+        if language:
+            conditions.append({"language": language})
+
+        # Year Filter (Native)
+        if min_year:
+            conditions.append({"year": {"$gte": min_year}})
+
+        where_filter = None
+        if len(conditions) == 1:
+            where_filter = conditions[0]
+        elif len(conditions) > 1:
+            where_filter = {"$and": conditions}
+
+        # Chroma can't filter on ids, so page deeper until enough rows survive
+        # the exclusion set (or the filtered collection runs out)
+        collection = self._collection_getter()
+        exclude = exclude or set()
+        total = collection.count()
+        fetch_k = min(n_results + EXCLUSION_HEADROOM, total)
+        rounds = 0
+        while True:
+            rounds += 1
+            results = collection.query(
+                query_embeddings=embedding,
+                n_results=max(fetch_k, 1),
+                include=["distances", "documents"],
+                where=where_filter,
+            )
+            ids = results["ids"][0]
+            kept = [i for i, mid in enumerate(ids) if mid not in exclude]
+            if len(kept) >= n_results or len(ids) < fetch_k or fetch_k >= total:
+                break
+            fetch_k = min(fetch_k * 2, total)
+
+        logger.info(
+            "action chroma_query | where_filter: %s | n_results: %d | fetch_k: %d | rounds: %d",
+            json.dumps(where_filter), n_results, fetch_k, rounds,
+        )
+        kept = kept[:n_results]
+        dists = results["distances"][0]
+        docs = results["documents"][0]
+        return [ids[i] for i in kept], [dists[i] for i in kept], [docs[i] for i in kept]
+
+
+@dataclass(frozen=True)
+class MatrixSnapshot:
+    """
+    One consistent version of the NumPy index. Never changed once built; a
+    rebuild publishes a new snapshot, so a reader that takes one reference
+    per call never mixes rows of two versions.
+    """
+
+    ids: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=object))
+    matrix: np.ndarray = field(default_factory=lambda: np.empty((0, 0), dtype=np.float32))
+    documents: List[str] = field(default_factory=list)
+    genre_names: List[str] = field(default_factory=list)
+    genre_matrix: np.ndarray = field(default_factory=lambda: np.empty((0, 0), dtype=bool))
+    language_names: List[str] = field(default_factory=list)
+    languages: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int16))
+    years: np.ndarray = field(default_factory=lambda: np.empty(0, dtype=np.int16))
+    row_of: Dict[str, int] = field(default_factory=dict)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def filter_mask(
+        self,
+        genres: Optional[Sequence[str]] = None,
+        language: Optional[str] = None,
+        min_year: Optional[int] = None,
+    ) -> np.ndarray:
+        """Boolean row mask equivalent to ChromaSearchBackend's where filter."""
+        mask = np.ones(len(self.ids), dtype=bool)
+        if genres:
+            cols = [self.genre_names.index(g) for g in genres if g in self.genre_names]
+            mask &= self.genre_matrix[:, cols].any(axis=1)
+        if language:
+            if language in self.language_names:
+                mask &= self.languages == self.language_names.index(language)
+            else:
+                mask[:] = False
+        if min_year:
+            mask &= self.years >= min_year
+        return mask
+
+
+class NumpySearchBackend:
+    """
+    Exact brute-force search over the whole catalog.
+
+    Embeddings are L2-normalised and stored as a contiguous float32 matrix in
+    index_path/movies.npy, which is memory-mapped on load so a restart reuses
+    the file instead of re-reading Chroma's vectors. The files are only
+    reused while their catalog_fingerprint matches the collection; the
+    collection's count and the files' mtime are checked every
+    REFRESH_INTERVAL, so an index rebuilt by another process (ingest,
+    refresh_catalog) is picked up too. Filters become boolean masks over the
+    genre/language/year columns; top-k uses argpartition.
+
+    Everything a query reads lives in one MatrixSnapshot (self.snapshot),
+    swapped in with a single assignment; callers take it once per call.
+    """
+
+    name = "numpy"
+
+    def __init__(self, collection_getter: Callable, catalog, index_path: str = "index") -> None:
+        self._collection_getter = collection_getter
+        self._catalog = catalog
+        self._index_path = index_path
+        self._lock = threading.Lock()
+        self._count: Optional[int] = None
+        self._mtime: Optional[float] = None
+        self._force_build = False
+        self._checked_at = 0.0
+        self.snapshot = MatrixSnapshot()
+
+    def __len__(self) -> int:
+        return len(self.snapshot)
+
+    def invalidate(self) -> None:
+        """Makes the next ensure_fresh rebuild from Chroma instead of reusing the files."""
+        # The filter columns come from the catalog, so it has to catch up too
+        self._catalog.invalidate()
+        with self._lock:
+            self._count = None
+            self._force_build = True
+
+    def ensure_fresh(self) -> None:
+        now = time.time()
+        if self._count is not None and now - self._checked_at < REFRESH_INTERVAL:
+            return
+        with self._lock:
+            if self._count is not None and now - self._checked_at < REFRESH_INTERVAL:
+                return
+            count = self._collection_getter().count()
+            if self._force_build:
+                self._build(count)
+            elif count != self._count or self._files_mtime() != self._mtime:
+                if not self._load(count):
+                    self._build(count)
+            self._checked_at = now
+
+    def _paths(self):
+        return (
+            os.path.join(self._index_path, "movies.npy"),
+            os.path.join(self._index_path, "movies_columns.npz"),
+            os.path.join(self._index_path, "movies_documents.json"),
+        )
+
+    def _files_mtime(self) -> Optional[float]:
+        try:
+            return os.path.getmtime(self._paths()[1])
+        except OSError:
+            return None
+
+    def _load(self, count: int) -> bool:
+        """Maps a previously built index from disk if it matches the collection."""
+        matrix_path, columns_path, documents_path = self._paths()
+        if not all(os.path.exists(p) for p in self._paths()):
+            return False
+        mtime = self._files_mtime()
+        with np.load(columns_path, allow_pickle=False) as columns:
+            if int(columns["count"]) != count or "fingerprint" not in columns:
+                return False
+            fingerprint = str(columns["fingerprint"])
+            if fingerprint != collection_fingerprint(self._collection_getter()):
+                logger.info("action numpy_index_stale | movies %d", count)
+                return False
+            ids = columns["ids"].astype(object)
+            genre_names = [str(g) for g in columns["genre_names"]]
+            genre_matrix = columns["genre_matrix"]
+            language_names = [str(l) for l in columns["language_names"]]
+            languages = columns["languages"]
+            years = columns["years"]
+        with open(documents_path, "r") as f:
+            documents = json.load(f)
+        self._install(
+            ids, np.load(matrix_path, mmap_mode="r"), documents,
+            genre_names, genre_matrix, language_names, languages, years, count, mtime,
+        )
+        logger.info("action numpy_index_load | movies %d", len(ids))
+        return True
+
+    def _build(self, count: int) -> None:
+        start_time = time.time()
+        collection = self._collection_getter()
+        ids, vectors, documents, metadatas = [], [], [], []
+        offset = 0
+        while True:
+            results = collection.get(
+                limit=PAGE_SIZE, offset=offset, include=["embeddings", "documents", "metadatas"]
+            )
+            if not results["ids"]:
+                break
+            ids.extend(results["ids"])
+            vectors.extend(results["embeddings"])
+            documents.extend(results["documents"])
+            metadatas.extend(results["metadatas"])
+            offset += PAGE_SIZE
+
+        records = {r.id: r for r in self._catalog.get_many(ids)}
+        genre_names = sorted({g for r in records.values() for g in r.genres})
+        genre_col = {g: i for i, g in enumerate(genre_names)}
+        language_names = sorted({r.language for r in records.values()})
+        language_code = {l: i for i, l in enumerate(language_names)}
+
+        n = len(ids)
+        genre_matrix = np.zeros((n, len(genre_names)), dtype=bool)
+        languages = np.full(n, -1, dtype=np.int16)
+        years = np.zeros(n, dtype=np.int16)
+        for row, mid in enumerate(ids):
+            record = records.get(mid)
+            if record is None:
+                continue
+            for g in record.genres:
+                genre_matrix[row, genre_col[g]] = True
+            languages[row] = language_code[record.language]
+            years[row] = record.year or 0
+
+        if n:
+            matrix = np.asarray(vectors, dtype=np.float32).reshape(n, -1)
+        else:
+            matrix = np.zeros((0, 0), dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        matrix = np.ascontiguousarray(matrix / norms)
+
+        # Write next to the Chroma store and map it back read-only
+        os.makedirs(self._index_path, exist_ok=True)
+        matrix_path, columns_path, documents_path = self._paths()
+        tmp_path = matrix_path + ".tmp.npy"
+        np.save(tmp_path, matrix)
+        os.replace(tmp_path, matrix_path)
+        tmp_path = columns_path + ".tmp.npz"
+        np.savez(
+            tmp_path,
+            count=count,
+            fingerprint=catalog_fingerprint(ids, metadatas),
+            ids=np.array(ids, dtype=str),
+            genre_names=np.array(genre_names, dtype=str),
+            genre_matrix=genre_matrix,
+            language_names=np.array(language_names, dtype=str),
+            languages=languages,
+            years=years,
+        )
+        os.replace(tmp_path, columns_path)
+        tmp_path = documents_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(documents, f)
+        os.replace(tmp_path, documents_path)
+
+        self._install(
+            np.array(ids, dtype=object), np.load(matrix_path, mmap_mode="r"), documents,
+            genre_names, genre_matrix, language_names, languages, years, count, self._files_mtime(),
+        )
+        duration = time.time() - start_time
+        logger.info("action numpy_index_build | duration %.4fs | movies %d", duration, n)
+
+    def _install(self, ids, matrix, documents, genre_names, genre_matrix,
+                 language_names, languages, years, count: int, mtime: Optional[float]) -> None:
+        self.snapshot = MatrixSnapshot(
+            ids=ids,
+            matrix=matrix,
+            documents=documents,
+            genre_names=genre_names,
+            genre_matrix=genre_matrix,
+            language_names=language_names,
+            languages=languages,
+            years=years,
+            row_of={mid: row for row, mid in enumerate(ids)},
+        )
+        self._count = count
+        self._mtime = mtime
+        self._force_build = False
+
+    @staticmethod
+    def top_k(scores: np.ndarray, mask: np.ndarray, k: int) -> np.ndarray:
+        """Row indices of the k highest-scoring rows where mask is set, best first."""
+        candidates = np.flatnonzero(mask)
+        k = min(k, len(candidates))
+        if k == 0:
+            return candidates[:0]
+        candidate_scores = scores[candidates]
+        if k < len(candidates):
+            part = np.argpartition(-candidate_scores, k - 1)[:k]
+        else:
+            part = np.arange(len(candidates))
+        order = part[np.argsort(-candidate_scores[part], kind="stable")]
+        return candidates[order]
+
+    def query(
+        self,
+        embedding,
+        n_results: int,
+        genres: Optional[Sequence[str]] = None,
+        language: Optional[str] = None,
+        min_year: Optional[int] = None,
+        exclude: Optional[AbstractSet[str]] = None,
+    ) -> SearchResult:
+        self.ensure_fresh()
+        snap = self.snapshot
+        if len(snap) == 0:
+            return [], [], []
+        query = np.asarray(embedding, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(query)
+        if norm > 0:
+            query = query / norm
+
+        # Cosine similarity of unit vectors; squared L2 is 2 - 2cos
+        scores = snap.matrix @ query
+        mask = snap.filter_mask(genres, language, min_year)
+        if exclude:
+            # Knock excluded ids out of the mask so top-k is filled from the rest
+            row_of = snap.row_of
+            mask[[row_of[mid] for mid in exclude if mid in row_of]] = False
+        rows = self.top_k(scores, mask, n_results)
+        distances = 2.0 - 2.0 * scores[rows]
+        return (
+            [snap.ids[r] for r in rows],
+            distances.tolist(),
+            [snap.documents[r] for r in rows],
+        )